@@ -3,11 +3,16 @@
 Analyze WhatsApp extraction from Chaozão property pages
 """
 
-import requests
-import re
+import argparse
 import json
 
-def analyze_whatsapp_extraction():
+from chaozao_archive import ArchiveReader, ArchiveWriter
+from chaozao_cache import PageCache
+from chaozao_extract import PageData, extract_contacts
+from chaozao_fetch import PageFetcher
+from chaozao_http import create_session
+
+def analyze_whatsapp_extraction(archive=None, replay=None):
     """Analyze how to extract WhatsApp numbers from property pages"""
     
     # Test URLs from the sample
@@ -17,9 +22,17 @@ def analyze_whatsapp_extraction():
         "https://chaozao.com.br/imovel/fazenda-em-pium-tocantins-com-area-de-50336-ha-r-13000000-cod-5wn66m/5WN66M"
     ]
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    # Reuse pages already downloaded by the scraper/image tools
+    session = create_session(pool_size=1)
+    fetcher = PageFetcher(
+        session, PageCache(), timeout=10,
+        archive=ArchiveWriter(archive) if archive else None,
+        replay=ArchiveReader(replay) if replay else None
+    )
+    
+    # Offline replay analyzes every archived property page
+    if fetcher.replay is not None:
+        test_urls = [url for url in fetcher.replay.urls() if '/imovel/' in url]
     
     results = []
     
@@ -27,36 +40,16 @@ def analyze_whatsapp_extraction():
         try:
             print(f"\n=== ANALYZING {url} ===")
             
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            html_content = response.text
+            html_content = fetcher.fetch(url).text
             
             # Extract property ID from URL
             property_id = url.split('/')[-1]
             
-            # Extract WhatsApp numbers using the pattern we found
-            whatsapp_numbers = []
-            
-            # Pattern that worked: wa.me/{number}
-            wa_me_pattern = r'wa\.me/(\d{10,15})'
-            matches = re.findall(wa_me_pattern, html_content, re.IGNORECASE)
-            
-            for match in matches:
-                # Format the number properly
-                if match.startswith('55'):  # Brazilian country code
-                    formatted_number = f"+{match}"
-                    whatsapp_numbers.append({
-                        'raw': match,
-                        'formatted': formatted_number,
-                        'country_code': '55',
-                        'area_code': match[2:4],
-                        'number': match[4:]
-                    })
-            
-            # Also look for phone numbers in telephone field
-            telephone_pattern = r'"telephone":"([^"]*)"'
-            telephone_matches = re.findall(telephone_pattern, html_content)
+            # Parse the page once and reuse the tree for every contact lookup
+            page = PageData(html_content)
+            contacts = extract_contacts(page)
+            whatsapp_numbers = contacts['whatsapp_numbers']
+            telephone_matches = contacts['telephone']
             
             # Look for structured contact data
             contact_info = {
@@ -102,4 +95,9 @@ def analyze_whatsapp_extraction():
     return results
 
 if __name__ == "__main__":
-    analyze_whatsapp_extraction()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Analyze WhatsApp extraction from Chaozão pages')
+    parser.add_argument('--archive', help='Write raw pages to this WARC archive')
+    parser.add_argument('--replay', help='Run offline from a WARC archive recorded with --archive')
+    args = parser.parse_args()
+    
+    analyze_whatsapp_extraction(archive=args.archive, replay=args.replay)
\ No newline at end of file
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Arquivo bruto das páginas do Chãozão em formato WARC
+
+Cada resposta (linha de status, cabeçalhos e corpo) vira um registro WARC
+`response`, comprimido isoladamente (membro gzip ou frame zstd) e anexado ao
+fim do arquivo. Um índice lateral em JSON Lines guarda URL, offset e tamanho
+de cada registro, então uma página é lida com um seek, sem descomprimir o
+resto. O arquivo pode ser lido por ferramentas WARC comuns (ex.: warcio).
+
+A leitura permite rodar scraper, extrator de imagens e análise de contatos
+offline (--replay), reextraindo as 7,4 mil páginas sem tocar no site.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE = 'chaozao_pages.warc.gz'
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependência opcional
+    zstandard = None
+
+
+def index_path(path: str) -> str:
+    return f"{path}.idx"
+
+
+def _compress(data: bytes, use_zstd: bool) -> bytes:
+    if use_zstd:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes) -> bytes:
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("Registro zstd requer o pacote zstandard (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def build_record(url: str, status: int, headers: Mapping[str, str], content: bytes) -> bytes:
+    """Monta um registro WARC/1.1 `response` com a resposta HTTP completa"""
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+
+    http_lines = [f"HTTP/1.1 {status} {reason}"]
+    for name, value in headers.items():
+        # O corpo é gravado já decodificado; estes cabeçalhos não valem mais
+        if name.lower() in ('content-encoding', 'transfer-encoding', 'content-length'):
+            continue
+        http_lines.append(f"{name}: {value}")
+    http_lines.append(f"Content-Length: {len(content)}")
+    http_block = ('\r\n'.join(http_lines) + '\r\n\r\n').encode('utf-8') + content
+
+    warc_headers = [
+        'WARC/1.1',
+        'WARC-Type: response',
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        f"WARC-Target-URI: {url}",
+        'Content-Type: application/http; msgtype=response',
+        f"Content-Length: {len(http_block)}",
+    ]
+    return ('\r\n'.join(warc_headers) + '\r\n\r\n').encode('utf-8') + http_block + b'\r\n\r\n'
+
+
+def parse_record(record: bytes) -> Tuple[str, int, Dict[str, str], bytes]:
+    """Separa um registro WARC em (url, status, cabeçalhos HTTP, corpo)"""
+    warc_head, _, rest = record.partition(b'\r\n\r\n')
+    warc_headers = dict(
+        line.split(': ', 1) for line in warc_head.decode('utf-8').split('\r\n')[1:] if ': ' in line
+    )
+    block = rest[:int(warc_headers['Content-Length'])]
+
+    http_head, _, body = block.partition(b'\r\n\r\n')
+    status_line, *header_lines = http_head.decode('utf-8', errors='replace').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in header_lines if ': ' in line)
+    return warc_headers['WARC-Target-URI'], int(status_line.split(' ')[1]), headers, body
+
+
+class ArchiveWriter:
+    """Grava respostas no fim do arquivo WARC e do índice (seguro entre threads)"""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE):
+        self.path = path
+        self.use_zstd = path.endswith('.zst')
+        if self.use_zstd and zstandard is None:
+            raise RuntimeError("Arquivo .zst requer o pacote zstandard (pip install zstandard)")
+
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+        self._index = open(index_path(path), 'a', encoding='utf-8')
+        self.records = 0
+
+    def write(self, url: str, status: int, headers: Mapping[str, str], content: bytes):
+        data = _compress(build_record(url, status, headers, content), self.use_zstd)
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            self._index.write(json.dumps({'url': url, 'offset': offset, 'length': len(data), 'status': status}) + '\n')
+            self._index.flush()
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._index.close()
+
+
+class ArchiveReader:
+    """Leitura aleatória (pelo índice) e sequencial do arquivo WARC"""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE):
+        if not os.path.exists(index_path(path)):
+            raise FileNotFoundError(f"Índice do arquivo não encontrado: {index_path(path)}")
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'rb')
+
+        # O registro mais recente de cada URL prevalece
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Linha truncada por uma gravação interrompida
+                    continue
+                if entry.get('status') == 200:
+                    self.offsets[entry['url']] = (entry['offset'], entry['length'])
+
+        logger.info(f"Arquivo {path}: {len(self.offsets)} páginas indexadas")
+
+    def urls(self) -> List[str]:
+        """URLs arquivadas, na ordem em que foram gravadas"""
+        return sorted(self.offsets, key=lambda url: self.offsets[url][0])
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.offsets
+
+    def get(self, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """(status, cabeçalhos, corpo) da URL, ou None se não estiver arquivada"""
+        location = self.offsets.get(url)
+        if location is None:
+            return None
+
+        offset, length = location
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(length)
+        _, status, headers, body = parse_record(_decompress(data))
+        return status, headers, body
+
+    def close(self):
+        self._file.close()
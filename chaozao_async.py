@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Motor de crawl assíncrono para o ChaozaoScraper
+
+Mantém até `concurrency` requisições em voo, respeita um orçamento de
+requisições por segundo por host e entrega cada `Property` assim que a
+página correspondente termina de ser processada. O que bloqueia (cache em
+disco, estado SQLite, parse do HTML) roda fora do event loop, em threads
+ou no pool de processos do parse.
+
+Requer aiohttp (pip install aiohttp).
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Callable, Iterable, List, Optional
+
+from chaozao_ratelimit import AsyncHostRateLimiter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - dependência opcional
+    aiohttp = None
+
+
+class AsyncCrawler:
+    """Busca páginas de propriedades em paralelo com limite de taxa por host"""
+
+    def __init__(self, scraper, concurrency: int = 16, rps: float = 4.0, timeout: float = 30,
+                 parse_workers: int = 0):
+        if aiohttp is None:
+            raise RuntimeError("O motor assíncrono requer aiohttp (pip install aiohttp)")
+
+        self.scraper = scraper
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = AsyncHostRateLimiter(rps)
+        self.timeout = timeout
+        # Com parse_workers > 0 o parse do HTML vai para processos; senão, para threads
+        self.parse_workers = parse_workers
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    async def _blocking(func: Callable, *args):
+        """Roda uma chamada bloqueante (disco, SQLite) no pool de threads padrão"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _parse(self, url: str, html: str):
+        if self._parse_pool is None:
+            return await self._blocking(self.scraper.parse_property_page, url, html)
+
+        from chaozao_scraper import parse_page
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._parse_pool, parse_page, (url, html))
+
+    async def _fetch(self, session, url: str) -> Optional[str]:
+        """Baixa o HTML de uma página respeitando o limite do host"""
+        # Fora do modo incremental, uma página recente no cache dispensa a rede
+        if self.scraper.crawl_state is None:
+            cached = await self._blocking(self.scraper.fetcher.lookup, url)
+            if cached is not None:
+                return cached.text
+
+        await self.rate_limiter.acquire(url)
+        try:
+            headers = await self._blocking(self.scraper.page_request_headers, url)
+            async with session.get(url, headers=headers) as response:
+                # Página sem mudanças desde a última busca (modo incremental)
+                if response.status == 304:
+                    self.scraper.record_page_fetch(url, None, response.headers)
+                    return None
+
+                response.raise_for_status()
+                content = await response.read()
+                # Só anota em memória; o estado é gravado depois que a saída é finalizada
+                self.scraper.record_page_fetch(url, content, response.headers)
+                await self._blocking(self.scraper.fetcher.store, url, content, response.headers)
+                return content.decode(response.get_encoding(), errors='replace')
+        except Exception as e:
+            logger.error(f"Erro ao extrair dados de {url}: {e}")
+            return None
+
+    async def _worker(self, session, queue: asyncio.Queue, results: asyncio.Queue):
+        while True:
+            url = await queue.get()
+            if url is None:
+                await results.put(None)
+                return
+
+            html = await self._fetch(session, url)
+            property_data = await self._parse(url, html) if html is not None else None
+            await results.put((url, property_data))
+
+    async def iter_properties(self, urls: Iterable[str]) -> AsyncIterator:
+        """Gera as propriedades na ordem em que terminam de ser processadas"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        headers = {'User-Agent': self.scraper.session.headers['User-Agent']}
+
+        if self.parse_workers > 0:
+            self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            workers = [
+                asyncio.create_task(self._worker(session, queue, results))
+                for _ in range(self.concurrency)
+            ]
+
+            async def feed():
+                for url in urls:
+                    await queue.put(url)
+                for _ in workers:
+                    await queue.put(None)
+
+            feeder = asyncio.create_task(feed())
+
+            try:
+                finished = 0
+                while finished < len(workers):
+                    item = await results.get()
+                    if item is None:
+                        finished += 1
+                        continue
+
+                    url, property_data = item
+                    if property_data is not None:
+                        yield property_data
+            finally:
+                feeder.cancel()
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(feeder, *workers, return_exceptions=True)
+                if self._parse_pool is not None:
+                    self._parse_pool.shutdown()
+                    self._parse_pool = None
+
+    async def crawl(self, urls: List[str], on_property: Optional[Callable] = None) -> int:
+        """
+        Processa todas as URLs, chamando `on_property` para cada resultado
+
+        Nada fica retido aqui (quem grava é o `on_property`, ex.: o sink NDJSON
+        do scraper); retorna o número de propriedades extraídas.
+        """
+        count = 0
+        total = len(urls)
+
+        async for property_data in self.iter_properties(urls):
+            count += 1
+            if on_property:
+                on_property(property_data)
+
+            if count % 100 == 0:
+                logger.info(f"Propriedades processadas: {count}/{total}")
+
+        return count
+
+
+def crawl_properties(scraper, urls: List[str], concurrency: int = 16, rps: float = 4.0,
+                     on_property: Optional[Callable] = None, parse_workers: int = 0) -> int:
+    """Ponto de entrada síncrono para o motor assíncrono; retorna o número de propriedades"""
+    crawler = AsyncCrawler(scraper, concurrency=concurrency, rps=rps, parse_workers=parse_workers)
+    return asyncio.run(crawler.crawl(urls, on_property=on_property))
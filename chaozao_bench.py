@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+"""
+Benchmarks dos componentes de extração do Chãozão
+
+Uso:
+    python chaozao_bench.py crawl --pages paginas_salvas/ --count 500 --latency 0.05
+    python chaozao_bench.py sitemap --count 200000
+    python chaozao_bench.py slug
+    python chaozao_bench.py html --pages paginas_salvas/
+    python chaozao_bench.py images --replay chaozao_pages.warc.gz
+    python chaozao_bench.py serialize --images 20
+    python chaozao_bench.py memory --count 1000000
+    python chaozao_bench.py catalog --count 200000 --state GO
+"""
+
+import argparse
+import itertools
+import logging
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+SYNTHETIC_PAGE = """<!DOCTYPE html><html><head><title>Fazenda em Cristalândia</title>
+<script type="application/ld+json">{"@type":"Product","name":"Fazenda em Cristalândia","offers":{"price":22400000}}</script>
+</head><body>""" + "<p>Lorem ipsum dolor sit amet.</p>" * 2000 + "</body></html>"
+
+
+def load_recorded_pages(pages_dir):
+    """Carrega páginas gravadas (*.html) ou usa uma página sintética"""
+    if pages_dir:
+        pages = [p.read_bytes() for p in sorted(Path(pages_dir).glob('*.html'))]
+        if pages:
+            return pages
+    return [SYNTHETIC_PAGE.encode('utf-8')]
+
+
+def start_stub_server(pages, count, latency=0.0):
+    """Sobe um servidor HTTP local que imita o sitemap e as páginas /imovel/"""
+    page_cycle = itertools.cycle(pages)
+    page_by_path = {}
+    paths = [
+        f"/imovel/fazenda-em-cidade-goias-com-area-de-{i}-ha-r-{i * 1000}-cod-p{i:05d}/P{i:05d}"
+        for i in range(count)
+    ]
+    for path in paths:
+        page_by_path[path] = next(page_cycle)
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, body, content_type):
+            etag = f'"{zlib.crc32(body):08x}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            host = f"http://{self.headers['Host']}"
+
+            if self.path == '/sitemap.xml':
+                body = (f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{SITEMAP_NS}">'
+                        f'<sitemap><loc>{host}/sitemap-0.xml</loc></sitemap></sitemapindex>')
+                return self._send(body.encode('utf-8'), 'application/xml')
+
+            if self.path == '/sitemap-0.xml':
+                entries = ''.join(f'<url><loc>{host}{path}</loc></url>' for path in paths)
+                body = f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">{entries}</urlset>'
+                return self._send(body.encode('utf-8'), 'application/xml')
+
+            page = page_by_path.get(self.path)
+            if page is None:
+                self.send_error(404)
+                return
+
+            if latency:
+                time.sleep(latency)
+            self._send(page, 'text/html; charset=utf-8')
+
+    class StubServer(ThreadingHTTPServer):
+        # O backlog padrão (5) descarta conexões quando o motor async abre dezenas de uma vez
+        request_queue_size = 256
+        daemon_threads = True
+
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def bench_crawl(args):
+    """Compara o motor síncrono (sem pausa) com o motor assíncrono"""
+    from chaozao_scraper import ChaozaoScraper
+    from chaozao_async import crawl_properties
+
+    pages = load_recorded_pages(args.pages)
+    server, base_url = start_stub_server(pages, args.count, latency=args.latency)
+
+    try:
+        # Sem cache de páginas: o motor async não pode ser servido pelo que o sync baixou
+        scraper = ChaozaoScraper(base_url=base_url, sitemap_state_file=None, cache_dir=None)
+        urls = scraper.extract_sitemap_urls()
+        print(f"Servidor stub em {base_url} com {len(urls)} páginas ({len(pages)} gravadas)")
+
+        if not args.skip_sync:
+            start = time.perf_counter()
+            total = sum(1 for url in urls if scraper.extract_property_data(url))
+            elapsed = time.perf_counter() - start
+            print(f"sync : {total} propriedades em {elapsed:.2f}s ({total / elapsed:.1f} páginas/s)")
+
+        start = time.perf_counter()
+        total = crawl_properties(ChaozaoScraper(base_url=base_url, sitemap_state_file=None, cache_dir=None), urls,
+                                 concurrency=args.concurrency, rps=args.rps)
+        elapsed = time.perf_counter() - start
+        print(f"async: {total} propriedades em {elapsed:.2f}s ({total / elapsed:.1f} páginas/s) "
+              f"[concurrency={args.concurrency}, rps={args.rps}]")
+    finally:
+        server.shutdown()
+
+
+def generate_sitemap_chunks(count, gzip_output=False, urls_per_chunk=500):
+    """Gera um sitemap sintético em blocos, sem montá-lo inteiro em memória"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip_output else None
+
+    def encode(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    yield encode(f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">')
+    for start in range(0, count, urls_per_chunk):
+        yield encode(''.join(
+            f'<url><loc>https://chaozao.com.br/imovel/fazenda-em-cidade-goias-cod-p{i:07d}/P{i:07d}</loc>'
+            f'<lastmod>2025-07-07</lastmod></url>'
+            for i in range(start, min(start + urls_per_chunk, count))
+        ))
+    yield encode('</urlset>')
+    if compressor:
+        yield compressor.flush()
+
+
+def bench_sitemap(args):
+    """Compara pico de memória de ET.fromstring com o leitor em streaming"""
+    import tracemalloc
+    import xml.etree.ElementTree as ET
+    from chaozao_sitemap import SitemapReader
+
+    ns = f"{{{SITEMAP_NS}}}"
+
+    def measure(label, func):
+        tracemalloc.start()
+        start = time.perf_counter()
+        total = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<22} {total} URLs em {elapsed:.2f}s, pico {peak / 1024 / 1024:.1f} MB")
+
+    def with_fromstring():
+        root = ET.fromstring(b''.join(generate_sitemap_chunks(args.count)))
+        return sum(1 for url in root.findall(f'.//{ns}url') if url.find(f'{ns}loc') is not None)
+
+    def with_reader(gzip_output):
+        return lambda: sum(1 for _ in SitemapReader(generate_sitemap_chunks(args.count, gzip_output)))
+
+    measure('ET.fromstring', with_fromstring)
+    measure('SitemapReader', with_reader(False))
+    measure('SitemapReader (.gz)', with_reader(True))
+
+
+def load_dataset_urls(dataset):
+    """URLs de propriedades de um dataset CSV ou JSON já extraído"""
+    if dataset.endswith('.csv'):
+        import csv
+        with open(dataset, newline='', encoding='utf-8') as f:
+            return [row['url'] for row in csv.DictReader(f)]
+
+    import json
+    with open(dataset, encoding='utf-8') as f:
+        return [prop['url'] for prop in json.load(f)['properties']]
+
+
+def bench_slug(args):
+    """Tempo do parser de slugs sobre o conjunto completo de URLs"""
+    import timeit
+    from chaozao_slug import parse_urls
+
+    urls = load_dataset_urls(args.dataset)
+    parse_urls(urls)  # aquece o cache de cidades
+
+    best = min(timeit.repeat(lambda: parse_urls(urls), number=1, repeat=args.repeat))
+    print(f"parse_urls: {len(urls)} URLs em {best * 1000:.1f} ms "
+          f"({best / len(urls) * 1e6:.2f} µs/URL, melhor de {args.repeat})")
+
+
+def bench_html(args):
+    """Páginas/s de cada backend HTML disponível sobre um corpus de páginas salvas"""
+    from chaozao_extract import PageData, extract_contacts, extract_page
+    from chaozao_html import BACKENDS
+
+    pages = [page.decode('utf-8', errors='replace') for page in load_recorded_pages(args.pages)]
+    corpus = (pages * (args.count // len(pages) + 1))[:args.count]
+    print(f"Corpus: {len(corpus)} páginas ({len(pages)} distintas)")
+
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        for html in corpus:
+            page = PageData(html, backend=backend)
+            extract_page(html, page)
+            extract_contacts(page)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:<11} {len(corpus) / elapsed:8.1f} páginas/s")
+
+
+def synthetic_gallery_page(index, photos=30):
+    """Página com galeria em JSON-LD e __NEXT_DATA__, imagens de layout e texto"""
+    import json
+    gallery = [f"https://cdn.chaozao.com.br/imoveis/P{index:05d}/foto-{i:02d}.{'webp' if i % 2 else 'jpg'}"
+               for i in range(1, photos + 1)]
+    ld = {"@context": "https://schema.org", "@graph": [
+        {"@type": "Organization", "name": "Chãozão", "image": "https://chaozao.com.br/logo.png"},
+        {"@type": "Product", "name": f"Fazenda {index}", "image": gallery, "offers": {"price": 1000000}},
+    ]}
+    next_data = {"props": {"pageProps": {"property": {"photos": [{"url": url} for url in gallery]}}}}
+    chrome = ''.join(f'<img src="/static/icon-{i}.svg"><img src="https://chaozao.com.br/logo-{i}.png">'
+                     for i in range(10))
+    thumbs = ''.join(f'<img src="{url}" loading="lazy">' for url in gallery)
+    return (f'<!DOCTYPE html><html><head><meta property="og:image" content="{gallery[0]}">'
+            f'<script type="application/ld+json">{json.dumps(ld)}</script></head><body>{chrome}{thumbs}'
+            + "<p>Lorem ipsum dolor sit amet.</p>" * 1500 +
+            f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script></body></html>')
+
+
+def legacy_downloader_images(html):
+    """Extração antiga do download_all_images (regex DOTALL sobre "image": [...])"""
+    import re
+    from urllib.parse import urlparse
+    urls = set()
+    for match in re.findall(r'"image":\s*\[(.*?)\]', html, re.DOTALL):
+        for url in re.findall(r'"(https://[^"]+\.(?:jpg|jpeg|png|webp|gif))"', match, re.IGNORECASE):
+            url = url.replace('\\"', '').strip()
+            parsed = urlparse(url)
+            if (len(url) >= 10 and parsed.scheme and parsed.netloc
+                    and any(url.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif'])
+                    and not any(p in url.lower() for p in ['placeholder', 'loading', 'icon', 'logo', 'avatar'])):
+                urls.add(url)
+    return list(urls)
+
+
+def legacy_scraper_images(page, base_url):
+    """Extração antiga do image_scraper (quatro regex sem compilar + árvore HTML)"""
+    import re
+    from urllib.parse import urljoin, urlparse
+    html = page.html
+    candidates = page.document.attr_values('img', 'src') + page.document.attr_values('*', 'data-src')
+    for pattern in [r'background-image:\s*url\(["\']?([^"\'()]+)["\']?\)',
+                    r'https://[^"\']+\.(?:jpg|jpeg|png|webp|gif)',
+                    r'"image":\s*"([^"]+)"',
+                    r'"url":\s*"([^"]+\.(?:jpg|jpeg|png|webp))"']:
+        candidates.extend(re.findall(pattern, html, re.IGNORECASE))
+
+    urls = set()
+    for match in candidates:
+        url = match.strip()
+        if url and any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
+            if url.startswith('//'):
+                url = 'https:' + url
+            elif not url.startswith('http'):
+                url = urljoin(base_url, url)
+            urls.add(url)
+
+    valid = []
+    for url in urls:
+        parsed = urlparse(url)
+        if (parsed.scheme and parsed.netloc
+                and any(parsed.path.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif'])
+                and not any(p in url.lower() for p in ['placeholder', 'loading', 'spinner', 'icon', 'logo',
+                                                       'avatar', 'profile', 'thumbnail_', 'thumb_'])):
+            valid.append(url)
+    return valid
+
+
+def bench_images(args):
+    """Corpus de regressão da galeria: extrator novo x os dois antigos (recall e CPU)"""
+    from chaozao_extract import PageData, extract_image_urls
+
+    if args.replay:
+        from chaozao_archive import ArchiveReader
+        reader = ArchiveReader(args.replay)
+        corpus = []
+        for url in reader.urls():
+            if '/imovel/' in url:
+                corpus.append((url, reader.get(url)[2].decode('utf-8', errors='replace')))
+            if len(corpus) >= args.count:
+                break
+        reader.close()
+    elif args.pages:
+        corpus = [(f"https://chaozao.com.br/imovel/{path.stem}", path.read_text(encoding='utf-8', errors='replace'))
+                  for path in sorted(Path(args.pages).glob('*.html'))][:args.count]
+    else:
+        corpus = [(f"https://chaozao.com.br/imovel/p{i:05d}", synthetic_gallery_page(i)) for i in range(args.count)]
+    print(f"Corpus: {len(corpus)} páginas")
+
+    pages = [(url, PageData(html)) for url, html in corpus]
+
+    def measure(label, extract):
+        start = time.process_time()
+        found = [extract(url, page) for url, page in pages]
+        elapsed = time.process_time() - start
+        print(f"{label:<28} {sum(map(len, found)):7d} imagens, CPU {elapsed * 1000:8.1f} ms "
+              f"({elapsed / len(pages) * 1e6:7.1f} µs/página)")
+        return found
+
+    new = measure('extract_image_urls', lambda url, page: extract_image_urls(page, url))
+    downloader = measure('antigo download_all_images', lambda url, page: legacy_downloader_images(page.html))
+    scraper = measure('antigo image_scraper', lambda url, page: legacy_scraper_images(page, url))
+
+    start = time.process_time()
+    for _, html in corpus:
+        PageData(html)
+    print(f"{'(parse HTML, compartilhado)':<28} {'':7} {'':8} CPU {(time.process_time() - start) * 1000:8.1f} ms")
+
+    regressions = 0
+    for (url, _), found, old in zip(pages, new, downloader):
+        missing = set(old) - set(found)
+        if missing:
+            regressions += 1
+            print(f"  ✗ {url}: {len(missing)} imagens do JSON-LD não encontradas (ex.: {sorted(missing)[0]})")
+    extra_old = sum(len(set(old) - set(found)) for found, old in zip(new, scraper))
+    print(f"Páginas com regressão frente ao extrator JSON-LD antigo: {regressions}")
+    print(f"URLs do regex amplo antigo fora da galeria nova: {extra_old}")
+    if regressions:
+        raise SystemExit(1)
+
+
+def load_dataset_with_images(dataset, images_per_property):
+    """Propriedades do dataset com uma lista images.files sintética (tamanho do _with_images)"""
+    if dataset.endswith('.csv'):
+        import csv
+        with open(dataset, newline='', encoding='utf-8') as f:
+            properties = list(csv.DictReader(f))
+    else:
+        from chaozao_ndjson import read_records
+        properties = list(read_records(dataset))
+
+    for prop in properties:
+        files = []
+        for i in range(1, images_per_property + 1):
+            digest = zlib.crc32(f"{prop['id']}-{i}".encode()).to_bytes(4, 'big').hex() * 8
+            files.append({
+                'original_url': f"https://chaozao.com.br/_next/image?url=/uploads/{prop['id']}/{i}.jpg",
+                'local_path': f"blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg",
+                'filename': f"{digest}.jpg",
+                'index': i,
+                'sha256': digest
+            })
+        prop['images'] = {'total_count': len(files), 'files': files}
+    return properties
+
+
+def bench_serialize(args):
+    """Dump/load do dataset _with_images inteiro por backend JSON (documento e NDJSON)"""
+    import json
+    import os
+    import tempfile
+    import chaozao_json
+    from chaozao_ndjson import dump_json_document, read_records, write_dataset
+
+    properties = load_dataset_with_images(args.dataset, args.images)
+    metadata = {'image_download': {'date': time.strftime('%Y-%m-%d %H:%M:%S')}}
+    print(f"Dataset: {len(properties)} propriedades, {args.images} imagens cada")
+
+    def best(func):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        document = os.path.join(tmp, 'dataset.json')
+        stream = os.path.join(tmp, 'dataset.ndjson')
+
+        def legacy_dump():
+            with open(document, 'w', encoding='utf-8') as f:
+                json.dump({**metadata, 'properties': properties}, f, indent=2, ensure_ascii=False)
+
+        def legacy_load():
+            with open(document, encoding='utf-8') as f:
+                json.load(f)
+
+        dump_time = best(legacy_dump)
+        size = os.path.getsize(document) / 1e6
+        print(f"{'json.dump monolítico':<22} dump {dump_time * 1000:8.1f} ms  load {best(legacy_load) * 1000:8.1f} ms  "
+              f"({size:.1f} MB)")
+
+        previous = chaozao_json.backend.name
+        try:
+            for name in chaozao_json.available_backends():
+                chaozao_json.set_backend(name)
+                document_dump = best(lambda: dump_json_document(properties, document, metadata))
+                document_load = best(lambda: list(read_records(document)))
+                stream_dump = best(lambda: write_dataset(properties, stream))
+                stream_load = best(lambda: list(read_records(stream)))
+                print(f"{name + ' (documento)':<22} dump {document_dump * 1000:8.1f} ms  "
+                      f"load {document_load * 1000:8.1f} ms  ({os.path.getsize(document) / 1e6:.1f} MB)")
+                print(f"{name + ' (NDJSON)':<22} dump {stream_dump * 1000:8.1f} ms  "
+                      f"load {stream_load * 1000:8.1f} ms  ({os.path.getsize(stream) / 1e6:.1f} MB)")
+        finally:
+            chaozao_json.set_backend(previous)
+
+
+def bench_memory(args):
+    """Memória de um catálogo grande: dicts e dataclass com __dict__ x registros compactos"""
+    import json
+    import tracemalloc
+    from dataclasses import dataclass
+    from chaozao_records import ListingBatch, ListingRecord
+    from chaozao_scraper import Property
+    from chaozao_slug import parse_url_data
+
+    # URLs reais repetidas com o código alterado até completar --count
+    base = load_dataset_urls(args.dataset)
+    urls = [base[i % len(base)] + (str(i // len(base)) if i >= len(base) else '') for i in range(args.count)]
+    print(f"Catálogo: {len(urls)} anúncios ({len(base)} URLs distintas)")
+
+    def measure(label, build):
+        tracemalloc.start()
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{label:<34} {size / 1e6:9.1f} MB  {size / len(urls):6.0f} B/anúncio")
+        return result
+
+    # Cada formato montado a partir das URLs: só o que ele retém entra na conta
+    measure('dicts de parse_url_data', lambda: [parse_url_data(url) for url in urls])
+    records = measure('ListingRecord (__slots__)',
+                      lambda: [ListingRecord.from_dict(parse_url_data(url)) for url in urls])
+    measure('ListingBatch (colunas)', lambda: ListingBatch.from_dicts(parse_url_data(url) for url in urls))
+
+    sample = records[:100000]
+    start = time.perf_counter()
+    converted = [record.to_dict() for record in sample]
+    to_dict = time.perf_counter() - start
+    start = time.perf_counter()
+    [ListingRecord.from_dict(data) for data in converted]
+    from_dict = time.perf_counter() - start
+    print(f"Conversão: to_dict {to_dict / len(sample) * 1e6:.2f} µs, from_dict {from_dict / len(sample) * 1e6:.2f} µs por registro")
+    del records, sample, converted
+
+    # Property como lida de um dataset (strings novas a cada registro, como no json.loads)
+    LegacyProperty = dataclass(type('LegacyProperty', (), {'__annotations__': dict(Property.__annotations__)}))
+    template = {
+        'title': 'Fazenda em Cristalândia', 'type': 'Fazenda', 'price': 22400000, 'price_formatted': 'R$ 22.400.000',
+        'area_hectares': 803.0, 'area_m2': None, 'area_alqueires': 331.8, 'city': 'Cristalândia', 'state': 'TO',
+        'latitude': -10.6, 'longitude': -49.2, 'features': ['Curral', 'Energia elétrica', 'Rio'],
+        'description': 'Fazenda dupla aptidão com pastagem formada.', 'reference_code': None, 'photos_count': 30
+    }
+
+    line = json.dumps({**template, 'id': '%d', 'url': '%s'}, ensure_ascii=False)
+
+    def property_dicts():
+        for i, url in enumerate(urls):
+            yield json.loads(line % (i, url))
+
+    measure('Property antigo (@dataclass)', lambda: [LegacyProperty(**data) for data in property_dicts()])
+    measure('Property (__slots__, internado)', lambda: [Property(**data) for data in property_dicts()])
+
+
+def bench_catalog(args):
+    """Filtro por estado e faixa de preço: json.load + varredura x consulta indexada no catálogo"""
+    import json
+    import os
+    import tempfile
+    from chaozao_catalog import Catalog
+    from chaozao_slug import parse_url_data
+
+    base = load_dataset_urls(args.dataset)
+    urls = [base[i % len(base)] + (str(i // len(base)) if i >= len(base) else '') for i in range(args.count)]
+    properties = [parse_url_data(url) for url in urls]
+    print(f"Catálogo: {len(properties)} anúncios; filtro state={args.state}, "
+          f"preço entre {args.min_price} e {args.max_price}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        document = os.path.join(tmp, 'dataset.json')
+        with open(document, 'w', encoding='utf-8') as f:
+            json.dump({'total_properties': len(properties), 'properties': properties}, f, indent=2, ensure_ascii=False)
+        del properties
+
+        def scan():
+            with open(document, encoding='utf-8') as f:
+                data = json.load(f)
+            return [
+                prop for prop in data['properties']
+                if prop['state'] == args.state and prop['price'] is not None
+                and args.min_price <= prop['price'] <= args.max_price
+            ]
+
+        start = time.perf_counter()
+        expected = scan()
+        scan_time = time.perf_counter() - start
+        print(f"{'json.load + varredura':<26} {scan_time * 1000:10.2f} ms  ({len(expected)} resultados)")
+
+        with Catalog(os.path.join(tmp, 'catalog.db')) as catalog:
+            start = time.perf_counter()
+            catalog.load_dataset(document)
+            print(f"{'carga do catálogo':<26} {(time.perf_counter() - start) * 1000:10.2f} ms  (uma vez)")
+
+            def query(limit=None):
+                return catalog.query(state=args.state, min_price=args.min_price, max_price=args.max_price, limit=limit)
+
+            found = query()
+            assert sorted(prop['id'] for prop in expected) == sorted(row['code'] for row in found)
+            for label, limit in (('consulta (todos)', None), ('consulta (LIMIT 20)', 20)):
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    query(limit)
+                elapsed = (time.perf_counter() - start) / args.repeat
+                print(f"{label:<26} {elapsed * 1000:10.3f} ms  ({len(query(limit))} resultados)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do scraper do Chãozão')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    crawl = subparsers.add_parser('crawl', help='Motor sync vs async contra um servidor stub local')
+    crawl.add_argument('--pages', help='Diretório com páginas gravadas (*.html)')
+    crawl.add_argument('--count', type=int, default=300, help='Número de URLs no sitemap stub')
+    crawl.add_argument('--latency', type=float, default=0.05, help='Latência simulada por página (s)')
+    crawl.add_argument('--concurrency', type=int, default=32, help='Requisições simultâneas no motor async')
+    crawl.add_argument('--rps', type=float, default=0, help='Limite por host no motor async (0 = sem limite)')
+    crawl.add_argument('--skip-sync', action='store_true', help='Não executa o motor síncrono')
+    crawl.set_defaults(func=bench_crawl)
+
+    sitemap = subparsers.add_parser('sitemap', help='Memória do parse de sitemap: fromstring vs streaming')
+    sitemap.add_argument('--count', type=int, default=200000, help='Número de URLs no sitemap sintético')
+    sitemap.set_defaults(func=bench_sitemap)
+
+    slug = subparsers.add_parser('slug', help='Micro-benchmark do parser de slugs (chaozao_slug)')
+    slug.add_argument('--dataset', default='chaozao_complete_dataset.csv', help='Dataset com as URLs')
+    slug.add_argument('--repeat', type=int, default=20, help='Repetições (usa a melhor)')
+    slug.set_defaults(func=bench_slug)
+
+    html = subparsers.add_parser('html', help='Páginas/s por backend de parse HTML')
+    html.add_argument('--pages', help='Diretório com páginas gravadas (*.html)')
+    html.add_argument('--count', type=int, default=200, help='Páginas processadas por backend')
+    html.set_defaults(func=bench_html)
+
+    images = subparsers.add_parser('images', help='Corpus de regressão da extração da galeria de imagens')
+    images.add_argument('--pages', help='Diretório com páginas gravadas (*.html)')
+    images.add_argument('--replay', help='Arquivo WARC com páginas gravadas (chaozao_archive)')
+    images.add_argument('--count', type=int, default=200, help='Máximo de páginas do corpus')
+    images.set_defaults(func=bench_images)
+
+    serialize = subparsers.add_parser('serialize', help='Dump/load do dataset com imagens por backend JSON')
+    serialize.add_argument('--dataset', default='chaozao_complete_dataset.csv', help='Dataset base (CSV, JSON ou NDJSON)')
+    serialize.add_argument('--images', type=int, default=20, help='Imagens sintéticas por propriedade')
+    serialize.add_argument('--repeat', type=int, default=3, help='Repetições (usa a melhor)')
+    serialize.set_defaults(func=bench_serialize)
+
+    memory = subparsers.add_parser('memory', help='Memória de um catálogo grande por formato de registro')
+    memory.add_argument('--dataset', default='chaozao_complete_dataset.csv', help='Dataset com as URLs')
+    memory.add_argument('--count', type=int, default=200000, help='Anúncios no catálogo sintético')
+    memory.set_defaults(func=bench_memory)
+
+    catalog = subparsers.add_parser('catalog', help='Filtro estado + preço: JSON inteiro x catálogo SQLite')
+    catalog.add_argument('--dataset', default='chaozao_complete_dataset.csv', help='Dataset com as URLs')
+    catalog.add_argument('--count', type=int, default=200000, help='Anúncios no catálogo sintético')
+    catalog.add_argument('--state', default='GO', help='Estado filtrado')
+    catalog.add_argument('--min-price', type=int, default=100000, help='Preço mínimo')
+    catalog.add_argument('--max-price', type=int, default=500000, help='Preço máximo')
+    catalog.add_argument('--repeat', type=int, default=200, help='Repetições da consulta (média)')
+    catalog.set_defaults(func=bench_catalog)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Repositório de imagens endereçado por conteúdo
+
+Cada imagem é gravada uma única vez como blobs/ab/cd/<sha256>.<ext>, não
+importa em quantas propriedades ela apareça (marcas d'água, fotos de banco
+de imagens, anúncios republicados). Um manifesto SQLite mapeia
+(property_id, índice) -> hash e URL -> hash; uma URL já conhecida não é
+baixada de novo.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+from urllib.parse import urlparse
+
+from chaozao_fetch import stream_download
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGES_DIR = 'chaozao_images'
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    property_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (property_id, idx)
+);
+CREATE INDEX IF NOT EXISTS images_hash ON images (hash);
+"""
+
+
+class Blob(NamedTuple):
+    """Imagem armazenada: hash SHA-256 e caminho relativo à raiz do repositório"""
+    digest: str
+    path: str
+
+
+def image_extension(url: str) -> str:
+    """Extensão da imagem pela URL (.jpg quando ausente ou desconhecida)"""
+    ext = Path(urlparse(url).path).suffix.lower()
+    if ext == '.jpeg':
+        return '.jpg'
+    return ext if ext in IMAGE_EXTENSIONS else '.jpg'
+
+
+class ImageStore:
+    """Blobs de imagens deduplicados por SHA-256 + manifesto (seguro entre threads)"""
+
+    def __init__(self, root: str = DEFAULT_IMAGES_DIR):
+        self.root = Path(root)
+        self.incoming_dir = self.root / 'incoming'
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.root / 'manifest.db'), timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def relative_path(digest: str, ext: str) -> str:
+        return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    def blob_path(self, blob: Blob) -> Path:
+        return self.root / blob.path
+
+    def _blob(self, digest: str) -> Optional[Blob]:
+        row = self.conn.execute('SELECT ext FROM blobs WHERE hash = ?', (digest,)).fetchone()
+        return Blob(digest, self.relative_path(digest, row[0])) if row else None
+
+    def find_url(self, url: str) -> Optional[Blob]:
+        """Blob de uma URL já baixada (e ainda presente em disco)"""
+        with self._lock:
+            row = self.conn.execute('SELECT hash FROM urls WHERE url = ?', (url,)).fetchone()
+            blob = self._blob(row[0]) if row else None
+        if blob is not None and self.blob_path(blob).exists():
+            return blob
+        return None
+
+    def add_file(self, source: Path, digest: str, ext: str) -> Blob:
+        """Move um arquivo já baixado para o repositório (descarta se já existir)"""
+        with self._lock:
+            existing = self._blob(digest)
+        blob = existing or Blob(digest, self.relative_path(digest, ext))
+        target = self.blob_path(blob)
+
+        if target.exists():
+            source.unlink()
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, target)
+
+        if existing is None:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    'INSERT OR IGNORE INTO blobs (hash, ext, size, created_at) VALUES (?, ?, ?, ?)',
+                    (digest, ext, target.stat().st_size, time.time())
+                )
+        return blob
+
+    def download(self, session, url: str, timeout: float = 30, content_type: Optional[str] = None,
+                 on_write: Optional[Callable[[int, float], None]] = None) -> Optional[Blob]:
+        """Baixa a imagem em streaming e a armazena pelo hash do conteúdo"""
+        hasher = hashlib.sha256()
+        incoming = self.incoming_dir / f"{os.getpid()}-{threading.get_ident()}-{time.monotonic_ns()}"
+        if stream_download(session, url, incoming, timeout=timeout, content_type=content_type,
+                           hasher=hasher, on_write=on_write) is None:
+            return None
+
+        blob = self.add_file(incoming, hasher.hexdigest(), image_extension(url))
+        with self._lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO urls (url, hash) VALUES (?, ?)', (url, blob.digest))
+        return blob
+
+    def record(self, property_id: str, index: int, url: str, blob: Blob):
+        """Registra no manifesto a imagem `index` da propriedade"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO images (property_id, idx, url, hash) VALUES (?, ?, ?, ?)',
+                (property_id, index, url, blob.digest)
+            )
+
+    def property_images(self, property_id: str) -> List[Blob]:
+        """Blobs da propriedade, na ordem dos índices"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT i.hash, b.ext FROM images i JOIN blobs b ON b.hash = i.hash '
+                'WHERE i.property_id = ? ORDER BY i.idx', (property_id,)
+            ).fetchall()
+        return [Blob(digest, self.relative_path(digest, ext)) for digest, ext in rows]
+
+    def blobs(self) -> List[Blob]:
+        """Todos os blobs registrados"""
+        with self._lock:
+            rows = self.conn.execute('SELECT hash, ext FROM blobs ORDER BY hash').fetchall()
+        return [Blob(digest, self.relative_path(digest, ext)) for digest, ext in rows]
+
+    def blob_owners(self) -> Dict[str, Set[str]]:
+        """hash -> propriedades que usam a imagem"""
+        owners: Dict[str, Set[str]] = {}
+        with self._lock:
+            for digest, property_id in self.conn.execute('SELECT hash, property_id FROM images'):
+                owners.setdefault(digest, set()).add(property_id)
+        return owners
+
+    def stats(self) -> dict:
+        """Referências no manifesto x blobs únicos armazenados"""
+        with self._lock:
+            references = self.conn.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+            blobs, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+        return {'references': references, 'blobs': blobs, 'bytes': size}
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Cache em disco das páginas HTML do Chãozão
+
+As páginas ficam comprimidas (gzip) em blobs endereçados pelo SHA-256 do
+conteúdo, então páginas idênticas ocupam espaço uma só vez. Um índice SQLite
+mapeia URL -> blob, com data da busca, último acesso e validadores HTTP.
+Entradas expiram pelo TTL e, quando o cache passa do tamanho máximo, as
+menos usadas recentemente (LRU) são removidas.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = 'chaozao_page_cache'
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    blob TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+CREATE INDEX IF NOT EXISTS pages_blob ON pages (blob);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+
+@dataclass
+class CacheEntry:
+    """Página armazenada no cache"""
+    url: str
+    content: bytes
+    fetched_at: float
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+
+class PageCache:
+    """Cache de páginas em disco, endereçado por conteúdo, com TTL e LRU por tamanho"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.blobs_dir = self.directory / 'blobs'
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # Compartilhado entre threads; vários processos podem usar o mesmo diretório
+        self.conn = sqlite3.connect(str(self.directory / 'index.db'), timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # Total mantido a cada inserção/remoção; o SUM só roda ao passar do limite
+        # (e ressincroniza o que outros processos gravaram no mesmo diretório)
+        self._total = self.size()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / f"{digest[2:]}.gz"
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Retorna a página armazenada (fresca ou não) ou None"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT blob, fetched_at, etag, last_modified, content_type FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+
+        digest, fetched_at, etag, last_modified, content_type = row
+        try:
+            content = gzip.decompress(self._blob_path(digest).read_bytes())
+        except (OSError, EOFError) as e:
+            logger.warning(f"Blob do cache ilegível para {url}: {e}")
+            return None
+
+        return CacheEntry(url, content, fetched_at, etag, last_modified, content_type)
+
+    def get_fresh(self, url: str) -> Optional[CacheEntry]:
+        """Retorna a página apenas se ainda estiver dentro do TTL"""
+        entry = self.get(url)
+        return entry if entry is not None and entry.is_fresh(self.ttl) else None
+
+    def put(self, url: str, content: bytes, headers: Optional[Mapping[str, str]] = None):
+        """Armazena a página e aplica a política de tamanho"""
+        headers = headers or {}
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(gzip.compress(content, compresslevel=6))
+            tmp_path.replace(path)
+
+        now = time.time()
+        size = path.stat().st_size
+        with self._lock, self.conn:
+            added = self.conn.execute(
+                'INSERT OR IGNORE INTO blobs (hash, size) VALUES (?, ?)', (digest, size)
+            ).rowcount
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO pages (url, blob, fetched_at, accessed_at, etag, last_modified, content_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (url, digest, now, now, headers.get('ETag'), headers.get('Last-Modified'), headers.get('Content-Type'))
+            )
+            if added:
+                self._total += size
+
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def touch(self, url: str):
+        """Marca a página como revalidada (resposta 304)"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+
+    def size(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def evict(self):
+        """Remove as páginas menos usadas até o cache caber em max_bytes"""
+        self._total = self.size()
+        while self._total > self.max_bytes:
+            with self._lock, self.conn:
+                urls = self.conn.execute(
+                    'SELECT url FROM pages ORDER BY accessed_at LIMIT 100'
+                ).fetchall()
+                if not urls:
+                    return
+                self.conn.executemany('DELETE FROM pages WHERE url = ?', urls)
+                orphans = self.conn.execute(
+                    'SELECT hash, size FROM blobs WHERE hash NOT IN (SELECT blob FROM pages)'
+                ).fetchall()
+                self.conn.executemany('DELETE FROM blobs WHERE hash = ?', [(digest,) for digest, _ in orphans])
+                self._total -= sum(size for _, size in orphans)
+
+            for digest, _ in orphans:
+                try:
+                    self._blob_path(digest).unlink()
+                except FileNotFoundError:
+                    pass
+            logger.info(f"Cache: {len(urls)} páginas removidas (LRU)")
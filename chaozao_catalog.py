@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Catálogo local do Chãozão (SQLite) com índices para consultas
+
+Propriedades, imagens e contatos numa base SQLite, com uma linha por
+anúncio identificada pelo código do fim da URL (ex.: TN2W4S) e índices em
+estado, cidade, tipo, preço e área. Carregar um dataset de novo atualiza as
+linhas existentes (upsert pelo código). Assim, filtrar por estado e faixa de
+preço é uma busca no índice, em vez de carregar o JSON inteiro e percorrê-lo.
+
+As colunas indexadas têm os tipos de verdade. A área é normalizada em
+hectares (area_m2 / 10000 quando o anúncio só tem m²). O registro completo
+fica em JSON numa tabela à parte (records), com as imagens e os contatos
+nas tabelas próprias.
+
+Para analisar no DuckDB, o arquivo pode ser anexado direto:
+    ATTACH 'chaozao_catalog.db' (TYPE sqlite)
+
+Uso:
+    python chaozao_catalog.py load chaozao_complete_dataset.ndjson
+    python chaozao_catalog.py load chaozao_complete_dataset_with_images.json --contacts whatsapp_extraction_analysis.json
+    python chaozao_catalog.py query --state GO --min-price 100000 --max-price 500000 --limit 20
+    python chaozao_catalog.py stats
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from chaozao_columnar import FLOAT_COLUMNS, INT_COLUMNS, LIST_COLUMNS
+from chaozao_extract import format_whatsapp
+from chaozao_json import decode, dumps
+from chaozao_state import property_code
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = 'chaozao_catalog.db'
+
+# Registros por transação na carga de um dataset
+BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS properties (
+    code TEXT PRIMARY KEY,
+    title TEXT,
+    type TEXT,
+    price INTEGER,
+    area_ha REAL,
+    city TEXT,
+    state TEXT,
+    url TEXT,
+    images_total INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS properties_state_price ON properties (state, price);
+CREATE INDEX IF NOT EXISTS properties_city_price ON properties (city, price);
+CREATE INDEX IF NOT EXISTS properties_type_price ON properties (type, price);
+CREATE INDEX IF NOT EXISTS properties_price ON properties (price);
+CREATE INDEX IF NOT EXISTS properties_area ON properties (area_ha);
+
+-- Registro completo (JSON) fora da tabela indexada: as consultas percorrem só linhas curtas
+CREATE TABLE IF NOT EXISTS records (
+    code TEXT PRIMARY KEY,
+    record TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS images (
+    code TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    image_index INTEGER,
+    original_url TEXT NOT NULL,
+    local_path TEXT,
+    filename TEXT,
+    sha256 TEXT,
+    PRIMARY KEY (code, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS images_sha256 ON images (sha256);
+
+CREATE TABLE IF NOT EXISTS contacts (
+    code TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (code, kind, value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS contacts_value ON contacts (value);
+"""
+
+# Colunas devolvidas por query(); o registro completo sai com full=True
+SUMMARY_COLUMNS = ('code', 'title', 'type', 'price', 'area_ha', 'city', 'state', 'url')
+
+ORDER_COLUMNS = ('price', 'area_ha', 'code', 'city', 'state', 'type', 'updated_at')
+
+GROUP_COLUMNS = ('type', 'state', 'city')
+
+# Campos dos registros gravados nas tabelas próprias, fora do JSON
+CONTACT_KINDS = {'whatsapp_numbers': 'whatsapp', 'telephone': 'telephone'}
+
+
+def _int_or_none(value) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    try:
+        return int(float(value)) if isinstance(value, str) else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float_or_none(value) -> Optional[float]:
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _area_hectares(record: Dict) -> Optional[float]:
+    hectares = _float_or_none(record.get('area_hectares'))
+    if hectares is not None:
+        return hectares
+    m2 = _float_or_none(record.get('area_m2'))
+    return m2 / 10000 if m2 is not None else None
+
+
+def _typed_row(row: Dict) -> Dict:
+    """Linha de CSV com os tipos do JSON: números, listas e None no lugar de ''"""
+    record = {}
+    for key, value in row.items():
+        if value == '':
+            value = None
+        elif key in INT_COLUMNS:
+            value = _int_or_none(value)
+        elif key in FLOAT_COLUMNS:
+            value = _float_or_none(value)
+        elif key in LIST_COLUMNS:
+            # CSV grava as características unidas por "; "
+            value = [item for item in value.split('; ') if item]
+        record[key] = value
+    return record
+
+
+def record_code(record: Dict) -> str:
+    """Código do anúncio: campo id (ou property_id) ou o fim da URL"""
+    code = record.get('id') or record.get('property_id')
+    return str(code).upper() if code else property_code(record['url'])
+
+
+def _contact_rows(code: str, contacts: Dict) -> List[Tuple[str, str, str]]:
+    """Linhas (code, kind, value) a partir do formato de extract_contacts"""
+    rows = []
+    for key, kind in CONTACT_KINDS.items():
+        for item in contacts.get(key) or []:
+            value = item.get('raw') if isinstance(item, dict) else item
+            if value:
+                rows.append((code, kind, str(value)))
+    return rows
+
+
+class Catalog:
+    """Catálogo SQLite de propriedades, imagens e contatos (seguro entre threads)"""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self) -> 'Catalog':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Escrita
+
+    def upsert(self, record: Dict):
+        self.upsert_many([record])
+
+    def upsert_many(self, records: Iterable[Dict]) -> int:
+        """
+        Insere ou atualiza propriedades pelo código, numa transação
+
+        Registros com 'images' (formato _with_images) substituem as imagens da
+        propriedade e registros com 'whatsapp_numbers'/'telephone' substituem
+        os contatos. Sem esses campos, o que já está no catálogo é mantido.
+        """
+        now = time.time()
+        rows, stored, images, image_codes, contacts, contact_codes = [], [], [], [], [], []
+
+        for record in records:
+            code = record_code(record)
+            manifest = record.get('images')
+            files = manifest.get('files', []) if isinstance(manifest, dict) else None
+            fields = {key: value for key, value in record.items() if key != 'images' and key not in CONTACT_KINDS}
+            stored.append((code, dumps(fields).decode('utf-8')))
+            rows.append((
+                code, record.get('title'), record.get('type') or None, _int_or_none(record.get('price')),
+                _area_hectares(record), record.get('city') or None, record.get('state') or None,
+                record.get('url'), manifest.get('total_count', len(files)) if files is not None else None, now
+            ))
+            if files is not None:
+                image_codes.append((code,))
+                images.extend(
+                    (code, position, image.get('index'), image['original_url'], image.get('local_path'),
+                     image.get('filename'), image.get('sha256'))
+                    for position, image in enumerate(files)
+                )
+            if any(key in record for key in CONTACT_KINDS):
+                contact_codes.append((code,))
+                contacts.extend(_contact_rows(code, record))
+
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO properties (code, title, type, price, area_ha, city, state, url, images_total, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (code) DO UPDATE SET title = excluded.title, type = excluded.type, '
+                'price = excluded.price, area_ha = excluded.area_ha, city = excluded.city, state = excluded.state, '
+                'url = excluded.url, images_total = COALESCE(excluded.images_total, images_total), '
+                'updated_at = excluded.updated_at', rows
+            )
+            self.conn.executemany('INSERT OR REPLACE INTO records VALUES (?, ?)', stored)
+            self.conn.executemany('DELETE FROM images WHERE code = ?', image_codes)
+            self.conn.executemany('INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)', images)
+            self.conn.executemany('DELETE FROM contacts WHERE code = ?', contact_codes)
+            self.conn.executemany('INSERT OR IGNORE INTO contacts VALUES (?, ?, ?)', contacts)
+        return len(rows)
+
+    def upsert_contacts(self, code: str, contacts: Dict):
+        """Substitui os contatos de uma propriedade (formato de extract_contacts)"""
+        code = code.upper()
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM contacts WHERE code = ?', (code,))
+            self.conn.executemany('INSERT OR IGNORE INTO contacts VALUES (?, ?, ?)', _contact_rows(code, contacts))
+
+    def load_dataset(self, path: str, batch_size: int = BATCH_SIZE) -> int:
+        """Carrega (upsert) um dataset NDJSON, JSON ou CSV em lotes; retorna o número de registros"""
+        if path.endswith('.csv'):
+            import csv
+            f = open(path, newline='', encoding='utf-8')
+            records: Iterator[Dict] = map(_typed_row, csv.DictReader(f))
+        else:
+            from chaozao_ndjson import read_records
+            f = None
+            records = read_records(path)
+
+        total = 0
+        try:
+            while True:
+                batch = list(itertools.islice(records, batch_size))
+                if not batch:
+                    break
+                total += self.upsert_many(batch)
+        finally:
+            if f is not None:
+                f.close()
+        logger.info(f"{total} propriedades carregadas de {path} em {self.path}")
+        return total
+
+    def load_contacts(self, path: str) -> int:
+        """Carrega os contatos de um relatório como whatsapp_extraction_analysis.json ({'results': [...]})"""
+        with open(path, 'rb') as f:
+            data = decode(f.read())
+        entries = data.get('results', []) if isinstance(data, dict) else data
+        count = 0
+        for entry in entries:
+            if entry.get('property_id') or entry.get('url'):
+                self.upsert_contacts(record_code(entry), entry)
+                count += 1
+        logger.info(f"Contatos de {count} propriedades carregados de {path}")
+        return count
+
+    def delete(self, code: str):
+        code = code.upper()
+        with self._lock, self.conn:
+            for table in ('properties', 'records', 'images', 'contacts'):
+                self.conn.execute(f'DELETE FROM {table} WHERE code = ?', (code,))
+
+    # Consulta
+
+    @staticmethod
+    def _where(state: Optional[str] = None, city: Optional[str] = None, type: Optional[str] = None,
+               min_price: Optional[int] = None, max_price: Optional[int] = None,
+               min_area: Optional[float] = None, max_area: Optional[float] = None) -> Tuple[str, List]:
+        clauses, params = [], []
+        for column, value in (('state', state), ('city', city), ('type', type)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        for column, operator, value in (('price', '>=', min_price), ('price', '<=', max_price),
+                                        ('area_ha', '>=', min_area), ('area_ha', '<=', max_area)):
+            if value is not None:
+                clauses.append(f'{column} {operator} ?')
+                params.append(value)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, order_by: str = 'price', descending: bool = False, limit: Optional[int] = None,
+              offset: int = 0, full: bool = False, **filters) -> List[Dict]:
+        """
+        Propriedades que atendem aos filtros, ordenadas por `order_by`
+
+        Filtros: state, city, type (igualdade), min_price/max_price e
+        min_area/max_area (hectares). Devolve as colunas de SUMMARY_COLUMNS;
+        com full=True, o registro completo com imagens e contatos.
+        """
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Ordenação inválida: {order_by} (opções: {', '.join(ORDER_COLUMNS)})")
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM properties{where} ORDER BY {order_by}"
+        sql += ' DESC' if descending else ''
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [-1 if limit is None else limit, offset]
+
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        if full:
+            return [self.get(row[0]) for row in rows]
+        return [dict(zip(SUMMARY_COLUMNS, row)) for row in rows]
+
+    def count(self, **filters) -> int:
+        where, params = self._where(**filters)
+        with self._lock:
+            return self.conn.execute(f'SELECT COUNT(*) FROM properties{where}', params).fetchone()[0]
+
+    def price_stats(self, **filters) -> Dict:
+        """Quantidade, menor, maior e média dos preços informados"""
+        where, params = self._where(**filters)
+        where += (' AND' if where else ' WHERE') + ' price IS NOT NULL'
+        with self._lock:
+            count, low, high, average = self.conn.execute(
+                f'SELECT COUNT(*), MIN(price), MAX(price), AVG(price) FROM properties{where}', params
+            ).fetchone()
+        return {'count': count, 'min': low, 'max': high, 'avg': average}
+
+    def group_counts(self, column: str, **filters) -> Dict[str, int]:
+        """Propriedades por tipo, estado ou cidade, da maior contagem para a menor"""
+        if column not in GROUP_COLUMNS:
+            raise ValueError(f"Agrupamento inválido: {column} (opções: {', '.join(GROUP_COLUMNS)})")
+        where, params = self._where(**filters)
+        with self._lock:
+            rows = self.conn.execute(
+                f'SELECT {column}, COUNT(*) AS total FROM properties{where} GROUP BY {column} ORDER BY total DESC',
+                params
+            ).fetchall()
+        return dict(rows)
+
+    def images(self, code: str) -> Dict:
+        """Manifesto de imagens ({'total_count', 'files'}) como no dataset _with_images"""
+        code = code.upper()
+        with self._lock:
+            total = self.conn.execute('SELECT images_total FROM properties WHERE code = ?', (code,)).fetchone()
+            rows = self.conn.execute(
+                'SELECT image_index, original_url, local_path, filename, sha256 FROM images '
+                'WHERE code = ? ORDER BY position', (code,)
+            ).fetchall()
+        files = []
+        for index, original_url, local_path, filename, sha256 in rows:
+            image = {'original_url': original_url, 'local_path': local_path, 'filename': filename}
+            if index is not None:
+                image['index'] = index
+            if sha256 is not None:
+                image['sha256'] = sha256
+            files.append(image)
+        return {'total_count': total[0] if total and total[0] is not None else len(files), 'files': files}
+
+    def contacts(self, code: str) -> Dict[str, List]:
+        """Contatos no formato de extract_contacts"""
+        with self._lock:
+            rows = self.conn.execute('SELECT kind, value FROM contacts WHERE code = ?', (code.upper(),)).fetchall()
+        return {
+            'whatsapp_numbers': [format_whatsapp(value) for kind, value in rows if kind == 'whatsapp'],
+            'telephone': [value for kind, value in rows if kind == 'telephone'],
+        }
+
+    def get(self, code: str) -> Optional[Dict]:
+        """Registro completo da propriedade, com 'images' e contatos quando houver"""
+        code = code.upper()
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT record, images_total FROM records JOIN properties USING (code) WHERE code = ?', (code,)
+            ).fetchone()
+            has_contacts = self.conn.execute('SELECT 1 FROM contacts WHERE code = ? LIMIT 1', (code,)).fetchone()
+        if row is None:
+            return None
+        record = decode(row[0])
+        if row[1] is not None:
+            record['images'] = self.images(code)
+        if has_contacts:
+            record.update(self.contacts(code))
+        return record
+
+    def summary(self) -> Dict[str, int]:
+        """Propriedades, imagens e contatos no catálogo"""
+        with self._lock:
+            return {
+                table: self.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('properties', 'images', 'contacts')
+            }
+
+
+def _add_filters(parser: argparse.ArgumentParser):
+    parser.add_argument('--state', help='Estado (como no dataset, ex.: GO)')
+    parser.add_argument('--city', help='Cidade')
+    parser.add_argument('--type', help='Tipo (ex.: Fazenda)')
+    parser.add_argument('--min-price', type=int, help='Preço mínimo (R$)')
+    parser.add_argument('--max-price', type=int, help='Preço máximo (R$)')
+    parser.add_argument('--min-area', type=float, help='Área mínima (ha)')
+    parser.add_argument('--max-area', type=float, help='Área máxima (ha)')
+
+
+def _filters(args) -> Dict:
+    return {
+        'state': args.state, 'city': args.city, 'type': args.type,
+        'min_price': args.min_price, 'max_price': args.max_price,
+        'min_area': args.min_area, 'max_area': args.max_area,
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Catálogo SQLite do Chãozão')
+    parser.add_argument('--catalog', default=DEFAULT_DB, help=f'Arquivo do catálogo (padrão: {DEFAULT_DB})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    load = subparsers.add_parser('load', help='Carrega (upsert) datasets NDJSON, JSON ou CSV')
+    load.add_argument('datasets', nargs='*', help='Datasets a carregar')
+    load.add_argument('--contacts', help='Relatório de contatos ({"results": [...]}, ex.: whatsapp_extraction_analysis.json)')
+
+    query = subparsers.add_parser('query', help='Lista propriedades pelos filtros')
+    _add_filters(query)
+    query.add_argument('--order-by', default='price', choices=ORDER_COLUMNS, help='Coluna de ordenação')
+    query.add_argument('--desc', action='store_true', help='Ordem decrescente')
+    query.add_argument('--limit', type=int, default=20, help='Máximo de resultados (padrão: 20)')
+    query.add_argument('--full', action='store_true', help='Registro completo (JSON) em vez do resumo')
+
+    stats = subparsers.add_parser('stats', help='Contagens e preços pelos filtros')
+    _add_filters(stats)
+
+    args = parser.parse_args()
+
+    with Catalog(args.catalog) as catalog:
+        if args.command == 'load':
+            for dataset in args.datasets:
+                catalog.load_dataset(dataset)
+            if args.contacts:
+                catalog.load_contacts(args.contacts)
+            print(f"Catálogo {args.catalog}: {catalog.summary()}")
+
+        elif args.command == 'query':
+            start = time.perf_counter()
+            results = catalog.query(order_by=args.order_by, descending=args.desc, limit=args.limit,
+                                    full=args.full, **_filters(args))
+            elapsed = time.perf_counter() - start
+            for result in results:
+                if args.full:
+                    print(json.dumps(result, ensure_ascii=False))
+                else:
+                    price = f"R$ {result['price']:,.2f}" if result['price'] is not None else 'Consulte'
+                    area = f"{result['area_ha']:,.2f} ha" if result['area_ha'] is not None else '-'
+                    print(f"{result['code']:<8} {result['type'] or '-':<12} {price:>20} {area:>14}  "
+                          f"{result['city'] or '-'}/{result['state'] or '-'}")
+            print(f"{len(results)} resultados em {elapsed * 1000:.2f} ms")
+
+        elif args.command == 'stats':
+            filters = _filters(args)
+            prices = catalog.price_stats(**filters)
+            print(f"Propriedades: {catalog.count(**filters)}")
+            for column in GROUP_COLUMNS[:2]:
+                print(f"\nPor {column}:")
+                for value, total in list(catalog.group_counts(column, **filters).items())[:10]:
+                    print(f"   - {value or 'N/A'}: {total}")
+            if prices['count']:
+                print(f"\nPreços ({prices['count']} com preço):")
+                print(f"   Menor: R$ {prices['min']:,.2f}")
+                print(f"   Maior: R$ {prices['max']:,.2f}")
+                print(f"   Média: R$ {prices['avg']:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Saída colunar (Parquet / Arrow IPC) dos datasets do Chãozão
+
+Grava as propriedades com tipos de verdade (preço int64, áreas e coordenadas
+float64, estado/cidade/tipo como dicionário) em vez de texto, com
+compressão e codificação por dicionário. A leitura usa memory-map e carrega
+só as colunas pedidas: um script de análise que precisa de preço e estado não
+lê descrições nem URLs.
+
+Parquet (.parquet) comprime melhor e é o padrão (zstd); Arrow IPC/Feather
+(.arrow, .feather) sai sem compressão por padrão e é lido sem nenhuma cópia
+direto do memory-map.
+
+Requer pyarrow (pip install pyarrow).
+
+Uso:
+    python chaozao_columnar.py chaozao_complete_dataset.json
+    python chaozao_columnar.py chaozao_complete_dataset.csv --output dataset.arrow
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+from chaozao_ndjson import derived_path, read_records
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = ipc = pq = None
+
+# Padrão por formato: Parquet comprime, IPC fica mapeável sem decodificar
+DEFAULT_COMPRESSION = 'zstd'
+DEFAULT_IPC_COMPRESSION = 'uncompressed'
+
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+# Tipo de cada coluna conhecida (dos dois formatos: Property do scraper e dataset das URLs)
+INT_COLUMNS = {'price': 'int64', 'photos_count': 'int32'}
+FLOAT_COLUMNS = {'area_hectares', 'area_m2', 'area_alqueires', 'latitude', 'longitude'}
+CATEGORICAL_COLUMNS = {'type', 'state', 'city'}
+LIST_COLUMNS = {'features'}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("A saída colunar requer pyarrow (pip install pyarrow)")
+
+
+def _number(value, cast):
+    if value is None or value == '':
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _features(value) -> Optional[List[str]]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        # CSV grava as características unidas por "; "
+        return [item for item in value.split('; ') if item]
+    return [str(item) for item in value]
+
+
+def column_type(name: str):
+    """Tipo Arrow da coluna (texto para colunas desconhecidas)"""
+    if name in INT_COLUMNS:
+        return pa.int64() if INT_COLUMNS[name] == 'int64' else pa.int32()
+    if name in FLOAT_COLUMNS:
+        return pa.float64()
+    if name in CATEGORICAL_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if name in LIST_COLUMNS:
+        return pa.list_(pa.string())
+    return pa.string()
+
+
+def to_table(records: Iterable[Dict], columns: Optional[List[str]] = None):
+    """Monta a tabela Arrow a partir dos registros (dicts do JSON/CSV)"""
+    _require_pyarrow()
+    records = list(records)
+    if columns is None:
+        columns = list(dict.fromkeys(key for record in records for key in record))
+
+    arrays = []
+    for name in columns:
+        values = [record.get(name) for record in records]
+        if name in INT_COLUMNS:
+            values = [_number(value, lambda v: int(float(v))) for value in values]
+        elif name in FLOAT_COLUMNS:
+            values = [_number(value, float) for value in values]
+        elif name in LIST_COLUMNS:
+            values = [_features(value) for value in values]
+        elif name in CATEGORICAL_COLUMNS or not any(isinstance(value, (dict, list)) for value in values):
+            values = [None if value is None or value == '' else str(value) for value in values]
+        else:
+            # Campos aninhados (ex.: images) vão como JSON em texto
+            values = [None if value is None else json.dumps(value, ensure_ascii=False) for value in values]
+        arrays.append(pa.array(values, type=column_type(name)))
+
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+def write_table(records: Iterable[Dict], path: str, compression: Optional[str] = None,
+                columns: Optional[List[str]] = None) -> str:
+    """Grava Parquet ou Arrow IPC (pela extensão) de forma atômica"""
+    table = to_table(records, columns)
+    tmp_path = f"{path}.tmp"
+
+    if path.endswith(ARROW_EXTENSIONS):
+        compression = compression or DEFAULT_IPC_COMPRESSION
+        options = ipc.IpcWriteOptions(compression=None if compression == 'uncompressed' else compression)
+        with pa.OSFile(tmp_path, 'wb') as sink, ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    else:
+        compression = compression or DEFAULT_COMPRESSION
+        # Parquet chama a ausência de compressão de 'none'
+        pq.write_table(table, tmp_path, compression='none' if compression == 'uncompressed' else compression,
+                       use_dictionary=True)
+
+    os.replace(tmp_path, path)
+    logger.info(f"{table.num_rows} propriedades salvas em {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    return path
+
+
+def read_table(path: str, columns: Optional[List[str]] = None):
+    """Lê via memory-map apenas as `columns` pedidas (todas se None)"""
+    _require_pyarrow()
+    if path.endswith(ARROW_EXTENSIONS):
+        # Arrow IPC sem compressão: os buffers apontam direto para o arquivo mapeado;
+        # included_fields faz cada record batch decodificar só as colunas pedidas
+        source = pa.memory_map(path, 'r')
+        options = None
+        if columns:
+            schema = ipc.open_file(source).schema
+            options = ipc.IpcReadOptions(included_fields=[schema.get_field_index(name) for name in columns])
+        table = ipc.open_file(source, options=options).read_all()
+        return table.select(columns) if columns else table
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def load_records(path: str) -> List[Dict]:
+    """Propriedades de um dataset NDJSON, JSON ({'properties': [...]}) ou CSV"""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    return list(read_records(path))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Converte um dataset do Chãozão para Parquet/Arrow')
+    parser.add_argument('dataset', help='Dataset NDJSON, JSON ou CSV')
+    parser.add_argument('--output', help='Arquivo de saída (.parquet, .arrow ou .feather; padrão: <dataset>.parquet)')
+    parser.add_argument('--compression',
+                        help=f'zstd, lz4, snappy, gzip ou uncompressed (padrão: {DEFAULT_COMPRESSION} '
+                             f'para Parquet, {DEFAULT_IPC_COMPRESSION} para Arrow IPC)')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(derived_path(args.dataset, ''))[0] + '.parquet'
+    write_table(load_records(args.dataset), output, compression=args.compression)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Derivados das imagens do Chãozão para o frontend (miniaturas WebP/AVIF)
+
+Lê os originais já baixados (repositório de blobs) e gera, em um pool de
+processos, versões reduzidas em WebP e, se o Pillow tiver suporte, AVIF.
+Os derivados são nomeados pelo hash do original, então uma imagem cujo hash
+não mudou (e que já tem todos os derivados com as mesmas configurações) não
+é reprocessada. O manifesto fica ao lado do dataset `_with_images.json`.
+
+Requer Pillow (pip install pillow).
+
+Uso:
+    python chaozao_derivatives.py
+    python chaozao_derivatives.py --sizes 400 800 --formats webp avif --workers 8
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from chaozao_blobs import DEFAULT_IMAGES_DIR
+from chaozao_json import dumps_pretty, loads
+from chaozao_ndjson import derived_path, read_records, with_images_path
+from chaozao_pipeline import ParseStage
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover - dependência opcional
+    Image = features = None
+
+# Cards do frontend usam ~400px; 800px cobre telas de alta densidade
+DEFAULT_SIZES = (400, 800)
+DEFAULT_QUALITY = 75
+
+PIL_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+
+
+def available_formats() -> List[str]:
+    """Formatos de saída suportados pelo Pillow instalado"""
+    if Image is None:
+        return []
+    return [fmt for fmt in PIL_FORMATS if features.check(fmt)]
+
+
+def manifest_path(dataset_file: str) -> str:
+    return derived_path(dataset_file, '_derivatives.json')
+
+
+def derivative_path(digest: str, size: int, fmt: str) -> str:
+    """Caminho relativo ao diretório de imagens"""
+    return f"derived/{digest[:2]}/{digest[2:4]}/{digest}-{size}.{fmt}"
+
+
+def render_variants(item: Tuple[str, str, str, Tuple[int, ...], Tuple[str, ...], int]) -> Tuple[str, Optional[Dict[str, str]]]:
+    """Gera os derivados de um original; roda nos processos do pool"""
+    digest, source, images_dir, sizes, formats, quality = item
+    variants = {}
+    try:
+        with Image.open(source) as original:
+            # JPEG: decodifica já reduzido para o maior tamanho pedido
+            original.draft('RGB', (max(sizes), max(sizes)))
+            has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+            original = original.convert('RGBA' if has_alpha else 'RGB')
+
+            for size in sorted(sizes, reverse=True):
+                resized = original.copy()
+                resized.thumbnail((size, size), Image.LANCZOS)
+                for fmt in formats:
+                    relative = derivative_path(digest, size, fmt)
+                    target = Path(images_dir) / relative
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+                    resized.save(tmp_path, PIL_FORMATS[fmt], quality=quality)
+                    os.replace(tmp_path, target)
+                    variants[f"{size}.{fmt}"] = relative
+    except Exception as e:
+        logger.warning(f"Erro ao gerar derivados de {source}: {e}")
+        return digest, None
+
+    return digest, variants
+
+
+def _file_digest(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def generate_derivatives(dataset_file: str = 'chaozao_complete_dataset.json',
+                         images_dir: str = DEFAULT_IMAGES_DIR, sizes=DEFAULT_SIZES,
+                         formats: Optional[List[str]] = None, quality: int = DEFAULT_QUALITY,
+                         workers: Optional[int] = None) -> Dict:
+    """Gera os derivados pendentes e grava o manifesto ao lado do dataset"""
+    if Image is None:
+        raise RuntimeError("Os derivados requerem Pillow (pip install pillow)")
+
+    supported = available_formats()
+    formats = [fmt for fmt in (formats or supported) if fmt in supported]
+    if not formats:
+        raise RuntimeError(f"Nenhum formato de saída suportado (disponíveis: {supported})")
+    settings = {'sizes': sorted(sizes), 'formats': formats, 'quality': quality}
+
+    properties = read_records(with_images_path(dataset_file))
+
+    output_file = manifest_path(dataset_file)
+    previous_sources = {}
+    if os.path.exists(output_file):
+        with open(output_file, 'rb') as f:
+            previous = loads(f.read())
+        if previous.get('settings') == settings:
+            previous_sources = previous.get('sources', {})
+
+    root = Path(images_dir)
+    sources: Dict[str, Dict] = {}
+    property_images: Dict[str, List[Dict]] = {}
+    pending = []
+    queued = set()
+
+    for prop in properties:
+        entries = []
+        for position, image in enumerate(prop.get('images', {}).get('files', []), 1):
+            source = root / image['local_path']
+            if not source.exists():
+                continue
+            # Imagens do layout antigo (pasta por propriedade) não trazem o hash
+            digest = image.get('sha256') or _file_digest(source)
+            entries.append({'index': image.get('index', position), 'sha256': digest})
+
+            # Um mesmo original pode aparecer em várias propriedades
+            if digest in sources or digest in queued:
+                continue
+            done = previous_sources.get(digest)
+            if done and all((root / path).exists() for path in done.values()):
+                sources[digest] = done
+            else:
+                queued.add(digest)
+                pending.append((digest, str(source), str(root), tuple(settings['sizes']), tuple(formats), quality))
+        if entries:
+            property_images[prop['id']] = entries
+
+    logger.info(f"Derivados: {len(pending)} originais para processar, {len(sources)} sem mudanças")
+
+    start = time.time()
+    failed = 0
+    for digest, variants in ParseStage(render_variants, workers=workers, chunk_size=8).map(pending):
+        if variants is None:
+            failed += 1
+        else:
+            sources[digest] = variants
+    logger.info(f"Derivados gerados em {time.time() - start:.1f}s ({failed} falhas)")
+
+    for entries in property_images.values():
+        for entry in entries:
+            entry['variants'] = sources.get(entry['sha256'], {})
+
+    manifest = {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'settings': settings,
+        'images_dir': str(images_dir),
+        'total_sources': len(sources),
+        'sources': sources,
+        'properties': property_images
+    }
+
+    tmp_path = f"{output_file}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps_pretty(manifest))
+    os.replace(tmp_path, output_file)
+    logger.info(f"Manifesto de derivados salvo em {output_file}")
+
+    return manifest
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Miniaturas WebP/AVIF das imagens do Chãozão')
+    parser.add_argument('--dataset', default='chaozao_complete_dataset.json', help='Dataset base (usa o _with_images.json)')
+    parser.add_argument('--images-dir', default=DEFAULT_IMAGES_DIR, help='Diretório das imagens')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='Lados máximos em pixels')
+    parser.add_argument('--formats', nargs='+', choices=sorted(PIL_FORMATS), help='Formatos (padrão: todos os suportados)')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY, help=f'Qualidade de compressão (padrão: {DEFAULT_QUALITY})')
+    parser.add_argument('--workers', type=int, help='Processos do pool (padrão: nº de CPUs)')
+    args = parser.parse_args()
+
+    manifest = generate_derivatives(args.dataset, args.images_dir, sizes=args.sizes, formats=args.formats,
+                                    quality=args.quality, workers=args.workers)
+    print(f"🖼️  {manifest['total_sources']} originais com derivados {manifest['settings']['formats']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Extrator de dados estruturados das páginas de propriedades do Chãozão
+
+Localiza uma única vez os blocos JSON-LD e o __NEXT_DATA__ do Next.js,
+decodifica cada um uma única vez e preenche todos os campos de `Property` a
+partir desses objetos. Metatags e regex só são usadas para os campos que não
+vierem nos dados estruturados. Também extrai os contatos (WhatsApp/telefone)
+e a galeria de imagens da mesma página já parseada.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urljoin
+
+from chaozao_html import parse_html
+
+logger = logging.getLogger(__name__)
+
+# Fallbacks para campos ausentes nos dados estruturados
+PRICE_RE = re.compile(r'R\$\s*(\d{1,3}(?:\.\d{3})+|\d+)(?:,\d{2})?')
+LATITUDE_RE = re.compile(r'"lat(?:itude)?"\s*:\s*"?(-?\d{1,2}\.\d+)')
+LONGITUDE_RE = re.compile(r'"(?:lng|lon|longitude)"\s*:\s*"?(-?\d{1,3}\.\d+)')
+REFERENCE_RE = re.compile(r'C[óo]d(?:igo)?\.?\s*(?:de\s+refer[êe]ncia)?\s*:?\s*([A-Z0-9]{5,8})\b')
+WHATSAPP_RE = re.compile(r'(?:wa\.me/|api\.whatsapp\.com/send\?phone=)(\d{10,15})', re.IGNORECASE)
+TELEPHONE_RE = re.compile(r'"telephone"\s*:\s*"([^"]+)"')
+AREA_TEXT_RE = re.compile(r'(\d[\d.]*(?:,\d+)?)\s*(hectares|ha|alqueires|m²|m2)\b', re.IGNORECASE)
+
+# Galeria de imagens: extensão aceita (no caminho, antes de ?/#) e elementos de layout descartados
+# Testes de substring no URL em minúsculas: bem mais baratos que regex com IGNORECASE
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+EXCLUDED_IMAGE_WORDS = ('placeholder', 'loading', 'spinner', 'icon', 'logo', 'avatar', 'profile',
+                        'thumbnail_', 'thumb_')
+QUERY_RE = re.compile(r'[?#]')
+IMAGE_URL_RE = re.compile(r'https?:(?://|\\/\\/)[^\s"\'<>()]+?\.(?:jpe?g|png|webp|gif)\b', re.IGNORECASE)
+BACKGROUND_RE = re.compile(r'background(?:-image)?\s*:[^;]*url\(\s*["\']?([^"\'()]+)', re.IGNORECASE)
+
+LISTING_TYPES = {
+    'Product', 'Offer', 'RealEstateListing', 'Place', 'Residence', 'Accommodation',
+    'LandmarksOrHistoricalBuildings', 'SingleFamilyResidence', 'House',
+}
+
+AREA_UNITS = {
+    'ha': 'area_hectares', 'hectares': 'area_hectares', 'har': 'area_hectares',
+    'm2': 'area_m2', 'm²': 'area_m2', 'mtk': 'area_m2',
+    'alqueires': 'area_alqueires', 'alqueire': 'area_alqueires',
+}
+
+# Chaves de pageProps que costumam trazer o objeto do anúncio
+NEXT_LISTING_KEYS = ('property', 'listing', 'imovel', 'anuncio')
+# Objetos aninhados no anúncio que ainda descrevem o anúncio (endereço, coordenadas)
+NEXT_NESTED_KEYS = ('address', 'location', 'endereco', 'localizacao', 'geo', 'coordinates')
+# Campos de texto: números/booleanos nesses campos são descartados
+TEXT_FIELDS = ('title', 'city', 'state', 'description')
+
+# Chaves das props do Next.js que costumam trazer a galeria
+GALLERY_KEYS = ('images', 'photos', 'gallery', 'fotos', 'imagens', 'pictures', 'image', 'photo')
+IMAGE_OBJECT_KEYS = ('url', 'contentUrl', 'src', 'original', 'large')
+
+FIELDS = (
+    'title', 'price', 'city', 'state', 'latitude', 'longitude',
+    'area_hectares', 'area_m2', 'area_alqueires',
+    'features', 'description', 'reference_code', 'photos_count',
+)
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """Converte 1.234,56 / 1234.56 / 1234 para float"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = str(value).strip().replace('R$', '').replace(' ', '')
+    if not text:
+        return None
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    elif text.count('.') > 1 or re.fullmatch(r'\d{1,3}(?:\.\d{3})+', text):
+        text = text.replace('.', '')
+
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _iter_objects(data: Any) -> Iterator[Dict]:
+    """Percorre todos os dicionários aninhados (inclui @graph e listas), na ordem do documento"""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+
+
+def _first(value: Any) -> Any:
+    return value[0] if isinstance(value, list) and value else value
+
+
+class PageData:
+    """Página já parseada: árvore HTML e blocos estruturados decodificados uma única vez
+
+    É o objeto compartilhado entre o scraper e os extratores de imagens e
+    contatos, para que cada página seja parseada uma só vez.
+    """
+
+    def __init__(self, html: str, document=None, backend: Optional[str] = None):
+        self.html = html
+        self.document = document if document is not None else parse_html(html, backend)
+        self.json_ld: List[Any] = []
+        self.next_data: Optional[Dict] = None
+        self._text: Optional[str] = None
+
+        for attrs, body in self.document.scripts():
+            script_type = attrs.get('type', '').lower()
+            if script_type == 'application/ld+json':
+                data = self._decode(body)
+                if data is not None:
+                    self.json_ld.append(data)
+            elif self.next_data is None and attrs.get('id') == '__NEXT_DATA__':
+                self.next_data = self._decode(body)
+
+    @property
+    def text(self) -> str:
+        """Texto visível da página (sem scripts/estilos)"""
+        if self._text is None:
+            self._text = self.document.text()
+        return self._text
+
+    @staticmethod
+    def _decode(body: str) -> Any:
+        try:
+            return json.loads(body.strip())
+        except ValueError as e:
+            logger.debug(f"Bloco JSON inválido ignorado: {e}")
+            return None
+
+    def ld_objects(self) -> Iterator[Dict]:
+        """Todos os objetos schema.org dos blocos JSON-LD"""
+        for data in self.json_ld:
+            yield from _iter_objects(data)
+
+    def next_props(self) -> Dict:
+        if not isinstance(self.next_data, dict):
+            return {}
+        props = self.next_data.get('props', {}).get('pageProps', self.next_data)
+        return props if isinstance(props, dict) else {}
+
+    def next_objects(self) -> Iterator[Dict]:
+        """Todos os objetos das props da página Next.js"""
+        yield from _iter_objects(self.next_props())
+
+    def next_listing(self, code: Optional[str] = None) -> Optional[Dict]:
+        """
+        Objeto do anúncio nas props do Next.js
+
+        pageProps.property/listing/...; senão o objeto que traz o código do
+        anúncio (`code`, o fim da URL); senão o próprio pageProps, se tiver
+        campos de anúncio. Objetos vizinhos (corretor, usuário, anúncios
+        relacionados) nunca são usados.
+        """
+        props = self.next_props()
+        for key in NEXT_LISTING_KEYS:
+            if isinstance(props.get(key), dict):
+                return props[key]
+        if code:
+            code = code.upper()
+            for obj in _iter_objects(props):
+                if any(isinstance(obj.get(key), (str, int)) and str(obj[key]).upper() == code
+                       for key in ('id', 'code', 'codigo', 'slug')):
+                    return obj
+        if any(key in props for key in ('price', 'title', 'preco', 'valor')):
+            return props
+        return None
+
+
+def _is_listing(obj: Dict) -> bool:
+    types = obj.get('@type')
+    types = types if isinstance(types, list) else [types]
+    return 'offers' in obj or any(t in LISTING_TYPES for t in types)
+
+
+def _fields_from_json_ld(page: PageData) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {}
+    objects = list(page.ld_objects())
+
+    # Título e descrição vêm do objeto do anúncio, não da organização/site
+    listing = next((obj for obj in objects if _is_listing(obj)), None)
+    if listing:
+        if isinstance(listing.get('name'), str):
+            fields['title'] = listing['name']
+        if isinstance(listing.get('description'), str):
+            fields['description'] = listing['description']
+
+    for obj in objects:
+        offers = _first(obj.get('offers'))
+        if isinstance(offers, dict) and 'price' not in fields:
+            price = parse_number(offers.get('price') or offers.get('lowPrice'))
+            if price:
+                fields['price'] = int(price)
+
+        geo = obj.get('geo')
+        if isinstance(geo, dict) and 'latitude' not in fields:
+            latitude, longitude = parse_number(geo.get('latitude')), parse_number(geo.get('longitude'))
+            if latitude is not None and longitude is not None:
+                fields['latitude'], fields['longitude'] = latitude, longitude
+
+        address = obj.get('address')
+        if isinstance(address, dict) and 'city' not in fields and isinstance(address.get('addressLocality'), str):
+            fields['city'] = address['addressLocality']
+            region = address.get('addressRegion')
+            fields['state'] = region if isinstance(region, str) else ''
+
+        for key in ('sku', 'productID', 'identifier'):
+            if key in obj and 'reference_code' not in fields and isinstance(obj[key], (str, int)):
+                fields['reference_code'] = str(obj[key])
+
+        images = obj.get('image')
+        if isinstance(images, list) and len(images) > fields.get('photos_count', 0):
+            fields['photos_count'] = len(images)
+
+        amenities = obj.get('amenityFeature')
+        if isinstance(amenities, list) and 'features' not in fields:
+            names = (item.get('name') if isinstance(item, dict) else item for item in amenities)
+            fields['features'] = [str(name) for name in names if name]
+
+        size = obj.get('floorSize') or obj.get('lotSize')
+        if isinstance(size, dict):
+            _set_area(fields, size.get('value'), size.get('unitCode') or size.get('unitText'))
+
+        for prop in obj.get('additionalProperty') or []:
+            if isinstance(prop, dict):
+                _set_area(fields, prop.get('value'), prop.get('unitCode') or prop.get('unitText') or prop.get('name'))
+
+    return fields
+
+
+def _fields_from_next_data(page: PageData, fields: Dict[str, Any], code: Optional[str] = None):
+    """Completa com o anúncio das props do Next.js os campos que o JSON-LD não trouxe"""
+    keys = {
+        'title': ('title', 'name'),
+        'price': ('price', 'valor', 'preco'),
+        'latitude': ('latitude', 'lat'),
+        'longitude': ('longitude', 'lng', 'lon'),
+        'city': ('city', 'cidade'),
+        'state': ('state', 'uf', 'estado'),
+        'description': ('description', 'descricao'),
+        'reference_code': ('code', 'codigo', 'reference'),
+    }
+    missing = {field: names for field, names in keys.items() if fields.get(field) in (None, '')}
+    if not missing:
+        return
+
+    listing = page.next_listing(code)
+    if listing is None:
+        return
+
+    # Campos do próprio anúncio primeiro, depois endereço/coordenadas aninhados
+    objects = [listing] + [listing[key] for key in NEXT_NESTED_KEYS if isinstance(listing.get(key), dict)]
+    for obj in objects:
+        for field, names in list(missing.items()):
+            for name in names:
+                value = obj.get(name)
+                if value in (None, '') or isinstance(value, (dict, list, bool)):
+                    continue
+                if field in TEXT_FIELDS and not isinstance(value, str):
+                    continue
+                if field == 'reference_code':
+                    value = str(value)
+                elif field in ('price', 'latitude', 'longitude'):
+                    value = parse_number(value)
+                    if value is None:
+                        continue
+                    if field == 'price':
+                        value = int(value)
+                fields[field] = value
+                del missing[field]
+                break
+        if not missing:
+            return
+
+
+def _set_area(fields: Dict[str, Any], value: Any, unit: Any):
+    if unit is None:
+        return
+    field = AREA_UNITS.get(str(unit).strip().lower())
+    number = parse_number(value)
+    if field and number is not None and fields.get(field) is None:
+        fields[field] = number
+
+
+def _fields_from_document(page: PageData, fields: Dict[str, Any]):
+    """Último recurso: metatags e regex apenas para os campos ainda ausentes"""
+    document, html = page.document, page.html
+
+    if not fields.get('title'):
+        fields['title'] = document.meta('og:title') or document.title()
+
+    if not fields.get('description'):
+        fields['description'] = document.meta('description') or document.meta('og:description')
+
+    if fields.get('price') is None:
+        match = PRICE_RE.search(page.text)
+        if match:
+            fields['price'] = int(match.group(1).replace('.', ''))
+
+    if fields.get('latitude') is None:
+        lat, lng = LATITUDE_RE.search(html), LONGITUDE_RE.search(html)
+        if lat and lng:
+            fields['latitude'], fields['longitude'] = float(lat.group(1)), float(lng.group(1))
+
+    if not fields.get('reference_code'):
+        match = REFERENCE_RE.search(page.text)
+        if match:
+            fields['reference_code'] = match.group(1)
+
+    if all(fields.get(f) is None for f in ('area_hectares', 'area_m2', 'area_alqueires')):
+        for value, unit in AREA_TEXT_RE.findall(page.text):
+            _set_area(fields, value, unit)
+
+
+def extract_page(html: str, page: Optional[PageData] = None,
+                 defaults: Optional[Dict[str, Any]] = None, code: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extrai todos os campos de uma página de propriedade em uma passada
+
+    `defaults` (ex.: preço, área, cidade e estado do slug da URL) só perdem
+    para o JSON-LD e o __NEXT_DATA__: entram antes das metatags e das regex
+    no texto da página, que pegariam o primeiro "R$" ou área de qualquer
+    lugar (barra lateral, anúncios relacionados). `code` (fim da URL) ajuda
+    a achar o objeto do anúncio nas props do Next.js.
+    """
+    page = page or PageData(html)
+
+    fields = _fields_from_json_ld(page)
+    _fields_from_next_data(page, fields, code)
+    for field, value in (defaults or {}).items():
+        if fields.get(field) in (None, '') and value not in (None, ''):
+            fields[field] = value
+    _fields_from_document(page, fields)
+
+    result = {field: fields.get(field) for field in FIELDS}
+    result['features'] = result['features'] or []
+    result['description'] = result['description'] or ''
+    result['photos_count'] = result['photos_count'] or 0
+    return result
+
+
+def format_whatsapp(raw: str) -> Dict[str, str]:
+    return {
+        'raw': raw,
+        'formatted': f"+{raw}",
+        'country_code': '55',
+        'area_code': raw[2:4],
+        'number': raw[4:]
+    }
+
+
+def extract_contacts(page: PageData) -> Dict[str, List]:
+    """Números de WhatsApp (links wa.me) e telefones (JSON-LD) da página"""
+    numbers: List[str] = []
+
+    for href in page.document.attr_values('a', 'href'):
+        match = WHATSAPP_RE.search(href)
+        if match and match.group(1) not in numbers:
+            numbers.append(match.group(1))
+
+    # Links montados por JavaScript não aparecem como <a href>
+    if not numbers:
+        for raw in WHATSAPP_RE.findall(page.html):
+            if raw not in numbers:
+                numbers.append(raw)
+
+    telephones = []
+    for obj in page.ld_objects():
+        telephone = obj.get('telephone')
+        if isinstance(telephone, str) and telephone not in telephones:
+            telephones.append(telephone)
+
+    if not telephones:
+        telephones = list(dict.fromkeys(TELEPHONE_RE.findall(page.html)))
+
+    return {
+        'whatsapp_numbers': [format_whatsapp(raw) for raw in numbers if raw.startswith('55')],
+        'telephone': telephones,
+    }
+
+
+def _image_values(value: Any) -> Iterator[str]:
+    """URLs de um campo de imagem: string, ImageObject ou lista deles, na ordem"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key in IMAGE_OBJECT_KEYS:
+            if isinstance(value.get(key), str):
+                yield value[key]
+                break
+    elif isinstance(value, list):
+        for item in value:
+            yield from _image_values(item)
+
+
+def _normalize_image_url(url: str, base_url: str) -> str:
+    url = url.strip().replace('\\/', '/')
+    if url.startswith('//'):
+        return 'https:' + url
+    if not url.startswith(('http://', 'https://')):
+        return urljoin(base_url, url)
+    return url
+
+
+def _filter_images(candidates: Iterable[str], base_url: str) -> List[str]:
+    """Normaliza e descarta o que não é foto do anúncio (extensão, logo, avatar, ...), sem repetir"""
+    urls: Dict[str, None] = {}
+    for candidate in candidates:
+        if not candidate or candidate.startswith('data:'):
+            continue
+        url = _normalize_image_url(candidate, base_url)
+        lower = url.lower()
+        if not QUERY_RE.split(lower, 1)[0].endswith(IMAGE_EXTENSIONS):
+            continue
+        if any(word in lower for word in EXCLUDED_IMAGE_WORDS):
+            continue
+        urls.setdefault(url)
+    return list(urls)
+
+
+def extract_image_urls(page: PageData, base_url: str) -> List[str]:
+    """
+    URLs da galeria da propriedade, na ordem em que a página as apresenta
+
+    A galeria sai dos dados estruturados já decodificados (JSON-LD `image`/
+    `photo` e as props do Next.js). A lista de imagens do próprio anúncio,
+    quando existe, encerra a busca; senão todos os objetos estruturados são
+    percorridos, e só quando eles não trazem nenhuma imagem a árvore HTML
+    (<img>, data-src, background-image, og:image) e o HTML bruto são
+    varridos. Os filtros de extensão e de layout (logo, avatar, ...) valem
+    para todas as origens.
+    """
+    candidates: List[str] = []
+    for obj in page.ld_objects():
+        # Imagem avulsa fora do anúncio costuma ser o logo do site/organização
+        listing = _is_listing(obj)
+        for key in ('image', 'photo'):
+            if key in obj and (listing or isinstance(obj[key], list)):
+                if listing and isinstance(obj[key], list):
+                    urls = _filter_images(_image_values(obj[key]), base_url)
+                    if urls:
+                        return urls
+                candidates.extend(_image_values(obj[key]))
+
+    listing = page.next_listing()
+    if listing is not None:
+        for key in GALLERY_KEYS:
+            if isinstance(listing.get(key), list):
+                urls = _filter_images(_image_values(listing[key]), base_url)
+                if urls:
+                    return urls
+
+    for obj in page.next_objects():
+        for key in GALLERY_KEYS:
+            if key in obj:
+                candidates.extend(_image_values(obj[key]))
+
+    urls = _filter_images(candidates, base_url)
+    if urls:
+        return urls
+
+    document = page.document
+    candidates = document.attr_values('img', 'src') + document.attr_values('*', 'data-src')
+    for style in document.attr_values('*', 'style'):
+        candidates.extend(BACKGROUND_RE.findall(style))
+    og_image = document.meta('og:image')
+    if og_image:
+        candidates.append(og_image)
+    candidates.extend(IMAGE_URL_RE.findall(page.html))
+    return _filter_images(candidates, base_url)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Busca de páginas do Chãozão com leitura através do cache em disco
+
+Todas as ferramentas (scraper, imagens, contatos) pedem o HTML por aqui, de
+modo que uma página baixada por uma delas serve às outras enquanto estiver
+dentro do TTL. Páginas vencidas são revalidadas com ETag/Last-Modified.
+
+Opcionalmente cada página servida é gravada em um arquivo WARC (archive) e,
+no modo replay, as páginas vêm apenas desse arquivo, sem acesso à rede.
+
+Também traz o download em streaming usado pelas ferramentas de imagens.
+"""
+
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Mapping, Optional
+
+from chaozao_archive import ArchiveReader, ArchiveWriter
+from chaozao_cache import PageCache
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class Page:
+    """Resposta de uma página, vinda da rede ou do cache"""
+    url: str
+    content: bytes
+    status: int = 200
+    headers: Mapping[str, str] = field(default_factory=dict)
+    from_cache: bool = False
+
+    @property
+    def text(self) -> str:
+        content_type = self.headers.get('Content-Type') or ''
+        _, _, charset = content_type.partition('charset=')
+        try:
+            return self.content.decode(charset.strip() or 'utf-8', errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+
+def _cached_headers(entry) -> Dict[str, str]:
+    headers = {}
+    if entry.etag:
+        headers['ETag'] = entry.etag
+    if entry.last_modified:
+        headers['Last-Modified'] = entry.last_modified
+    if entry.content_type:
+        headers['Content-Type'] = entry.content_type
+    return headers
+
+
+class PageFetcher:
+    """GET de páginas HTML com leitura através do PageCache (cache=None desativa)"""
+
+    def __init__(self, session, cache: Optional[PageCache] = None, timeout: float = 30,
+                 archive: Optional[ArchiveWriter] = None, replay: Optional[ArchiveReader] = None,
+                 rate_limiter=None):
+        self.session = session
+        self.cache = cache
+        self.timeout = timeout
+        self.archive = archive
+        self.replay = replay
+        # HostRateLimiter aplicado só às idas à rede (acertos de cache não contam)
+        self.rate_limiter = rate_limiter
+
+    def _record(self, page: Page) -> Page:
+        # Só respostas vindas da rede: reler do cache não duplica registros no WARC
+        if self.archive is not None and page.status == 200:
+            self.archive.write(page.url, page.status, page.headers, page.content)
+        return page
+
+    def _replayed(self, url: str) -> Page:
+        record = self.replay.get(url)
+        if record is None:
+            raise LookupError(f"Página ausente do arquivo {self.replay.path}: {url}")
+        status, headers, content = record
+        return Page(url, content, status, headers, from_cache=True)
+
+    def lookup(self, url: str) -> Optional[Page]:
+        """Página do cache, se ainda estiver dentro do TTL (ou do arquivo, no replay)"""
+        if self.replay is not None:
+            return self._replayed(url) if url in self.replay else None
+        if self.cache is None:
+            return None
+        entry = self.cache.get_fresh(url)
+        if entry is None:
+            return None
+        return Page(url, entry.content, headers=_cached_headers(entry), from_cache=True)
+
+    def store(self, url: str, content: bytes, headers: Mapping[str, str]):
+        """Guarda uma página baixada por outro caminho (ex.: aiohttp)"""
+        if self.cache is not None:
+            self.cache.put(url, content, headers)
+        self._record(Page(url, content, headers=headers))
+
+    def fetch(self, url: str, headers: Optional[Mapping[str, str]] = None, refresh: bool = False) -> Page:
+        """
+        Retorna a página do cache ou da rede
+
+        Com refresh=True o cache fresco é ignorado (ex.: <lastmod> mudou).
+        `headers` condicionais do chamador têm precedência sobre os do cache;
+        se o servidor responder 304 a eles, a página volta com status 304.
+        No modo replay a página vem do arquivo (LookupError se ausente).
+        """
+        if self.replay is not None:
+            return self._replayed(url)
+
+        if not refresh:
+            page = self.lookup(url)
+            if page is not None:
+                return page
+
+        entry = self.cache.get(url) if self.cache is not None else None
+        request_headers = dict(headers or {})
+        if entry is not None and not request_headers:
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(url)
+        response = self.session.get(url, headers=request_headers, timeout=self.timeout)
+
+        if response.status_code == 304:
+            if entry is not None:
+                self.cache.touch(url)
+            if headers:
+                return Page(url, entry.content if entry else b'', 304, response.headers)
+            if entry is not None:
+                return Page(url, entry.content, headers=_cached_headers(entry), from_cache=True)
+
+        response.raise_for_status()
+        if self.cache is not None:
+            self.cache.put(url, response.content, response.headers)
+        return self._record(Page(url, response.content, response.status_code, response.headers))
+
+
+def stream_download(session, url: str, path, timeout: float = 30, content_type: Optional[str] = None,
+                    chunk_size: int = DOWNLOAD_CHUNK_SIZE, hasher=None,
+                    on_write: Optional[Callable[[int, float], None]] = None) -> Optional[int]:
+    """
+    Baixa `url` para `path` em blocos de tamanho fixo, sem bufferizar o corpo
+
+    O corpo vai para um arquivo temporário no mesmo diretório, é conferido
+    com o Content-Length e só então renomeado (atômico) para `path`; um
+    download interrompido nunca deixa `path` truncado. Retorna os bytes
+    recebidos, ou None se o Content-Type não começar com `content_type`.
+    Um `hasher` (ex.: hashlib.sha256()) recebe cada bloco gravado e
+    `on_write(bytes, segundos)` recebe o tempo gasto gravando em disco.
+    """
+    path = Path(path)
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        if content_type and not response.headers.get('Content-Type', '').startswith(content_type):
+            return None
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.part')
+        written, write_seconds = 0, 0.0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size):
+                    started = time.perf_counter()
+                    f.write(chunk)
+                    write_seconds += time.perf_counter() - started
+                    written += len(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+
+            # Bytes lidos da rede (antes de descomprimir), comparáveis ao Content-Length
+            received = response.raw.tell()
+            expected = response.headers.get('Content-Length')
+            if expected is not None and received != int(expected):
+                raise IOError(f"Download incompleto: {received} de {expected} bytes")
+
+            started = time.perf_counter()
+            os.replace(tmp_path, path)
+            write_seconds += time.perf_counter() - started
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    if on_write is not None:
+        on_write(written, write_seconds)
+    return received
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Camada de parse de HTML com backends intercambiáveis
+
+Ordem de preferência: selectolax (Lexbor/Modest, em C), lxml, BeautifulSoup
+e, se nada disso estiver instalado, o html.parser da biblioteca padrão.
+A variável de ambiente CHAOZAO_HTML_BACKEND força um backend específico.
+
+Todos os backends expõem a mesma interface mínima usada pelo scraper e pelos
+extratores de imagens e contatos: scripts(), attr_values(), meta(), title()
+e text().
+"""
+
+import logging
+import os
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Script = Tuple[Dict[str, str], str]
+
+
+class SelectolaxDocument:
+    """Backend selectolax (pip install selectolax)"""
+
+    name = 'selectolax'
+
+    def __init__(self, html: str):
+        self.tree = _selectolax_parser(html)
+
+    def scripts(self) -> List[Script]:
+        return [
+            ({k: v or '' for k, v in node.attributes.items()}, node.text(deep=True))
+            for node in self.tree.css('script')
+        ]
+
+    def attr_values(self, tag: str, attr: str) -> List[str]:
+        return [node.attributes[attr] for node in self.tree.css(f'{tag}[{attr}]') if node.attributes.get(attr)]
+
+    def meta(self, key: str) -> Optional[str]:
+        node = self.tree.css_first(f'meta[name="{key}"], meta[property="{key}"]')
+        return node.attributes.get('content') if node else None
+
+    def title(self) -> Optional[str]:
+        node = self.tree.css_first('title')
+        return node.text(strip=True) if node else None
+
+    def text(self) -> str:
+        # Sem o conteúdo de <script>/<style>, como nos demais backends
+        body = self.tree.body
+        if body is None:
+            return ''
+        return ' '.join(
+            node.text(deep=False) for node in body.traverse(include_text=True)
+            if node.tag == '-text' and node.parent.tag not in ('script', 'style')
+        )
+
+
+class LxmlDocument:
+    """Backend lxml (pip install lxml)"""
+
+    name = 'lxml'
+
+    def __init__(self, html: str):
+        try:
+            self.root = _lxml_html.document_fromstring(html)
+        except _lxml_etree.ParserError:
+            # Documento vazio: os demais backends devolvem um documento sem conteúdo
+            self.root = _lxml_html.document_fromstring('<html><body></body></html>')
+
+    def scripts(self) -> List[Script]:
+        return [(dict(el.attrib), el.text or '') for el in self.root.iter('script')]
+
+    def attr_values(self, tag: str, attr: str) -> List[str]:
+        return [value for value in self.root.xpath(f'//{tag}[@{attr}]/@{attr}') if value]
+
+    def meta(self, key: str) -> Optional[str]:
+        values = self.root.xpath(f'//meta[@name="{key}" or @property="{key}"]/@content')
+        return values[0] if values else None
+
+    def title(self) -> Optional[str]:
+        title = self.root.findtext('.//title')
+        return title.strip() if title else None
+
+    def text(self) -> str:
+        body = self.root.find('body')
+        if body is None:
+            return ''
+        parts = []
+        for el in body.iter():
+            # Comentários têm tag não textual; o tail (texto depois do elemento) sempre conta
+            if isinstance(el.tag, str) and el.tag not in ('script', 'style') and el.text:
+                parts.append(el.text)
+            if el is not body and el.tail:
+                parts.append(el.tail)
+        return ' '.join(parts)
+
+
+class SoupDocument:
+    """Backend BeautifulSoup (fallback lento, pip install beautifulsoup4)"""
+
+    name = 'bs4'
+
+    def __init__(self, html: str):
+        self.soup = _BeautifulSoup(html, 'html.parser')
+
+    def scripts(self) -> List[Script]:
+        return [
+            ({k: ' '.join(v) if isinstance(v, list) else v for k, v in tag.attrs.items()}, tag.string or '')
+            for tag in self.soup.find_all('script')
+        ]
+
+    def attr_values(self, tag: str, attr: str) -> List[str]:
+        name = True if tag == '*' else tag
+        return [el[attr] for el in self.soup.find_all(name, attrs={attr: True}) if el[attr]]
+
+    def meta(self, key: str) -> Optional[str]:
+        tag = self.soup.find('meta', attrs={'name': key}) or self.soup.find('meta', attrs={'property': key})
+        return tag.get('content') if tag else None
+
+    def title(self) -> Optional[str]:
+        return self.soup.title.string.strip() if self.soup.title and self.soup.title.string else None
+
+    def text(self) -> str:
+        # Só o <body>, sem <script>/<style> e sem alterar a árvore (scripts() continua valendo)
+        body = self.soup.body
+        if body is None:
+            return ''
+        return ' '.join(
+            text for text in body.find_all(string=True)
+            if text.parent.name not in ('script', 'style') and not isinstance(text, _Comment)
+        )
+
+
+class _CollectingParser(HTMLParser):
+    """Coleta em uma passada o que a interface precisa (backend stdlib)"""
+
+    SKIP_TEXT = ('script', 'style')
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.elements: List[Tuple[str, Dict[str, str]]] = []
+        self.scripts: List[Script] = []
+        self.title: Optional[str] = None
+        self.text_parts: List[str] = []
+        self._current: Optional[str] = None
+        self._buffer: List[str] = []
+        self._script_attrs: Dict[str, str] = {}
+
+    def handle_starttag(self, tag, attrs):
+        attributes = {k: v or '' for k, v in attrs}
+        self.elements.append((tag, attributes))
+        if tag in ('script', 'style', 'title'):
+            self._current, self._buffer, self._script_attrs = tag, [], attributes
+
+    def handle_endtag(self, tag):
+        if tag == self._current:
+            content = ''.join(self._buffer)
+            if tag == 'script':
+                self.scripts.append((self._script_attrs, content))
+            elif tag == 'title' and self.title is None:
+                self.title = content.strip()
+            self._current = None
+
+    def handle_data(self, data):
+        if self._current:
+            self._buffer.append(data)
+        else:
+            self.text_parts.append(data)
+
+
+class StdlibDocument:
+    """Backend html.parser da biblioteca padrão (sempre disponível)"""
+
+    name = 'stdlib'
+
+    def __init__(self, html: str):
+        self.parser = _CollectingParser()
+        self.parser.feed(html)
+        self.parser.close()
+
+    def scripts(self) -> List[Script]:
+        return self.parser.scripts
+
+    def attr_values(self, tag: str, attr: str) -> List[str]:
+        return [
+            attrs[attr] for name, attrs in self.parser.elements
+            if (tag == '*' or name == tag) and attrs.get(attr)
+        ]
+
+    def meta(self, key: str) -> Optional[str]:
+        for name, attrs in self.parser.elements:
+            if name == 'meta' and key in (attrs.get('name'), attrs.get('property')):
+                return attrs.get('content')
+        return None
+
+    def title(self) -> Optional[str]:
+        return self.parser.title
+
+    def text(self) -> str:
+        return ' '.join(self.parser.text_parts)
+
+
+BACKENDS: Dict[str, Callable[[str], object]] = {}
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _selectolax_parser
+except ImportError:  # pragma: no cover - dependência opcional
+    try:
+        from selectolax.parser import HTMLParser as _selectolax_parser
+    except ImportError:
+        _selectolax_parser = None
+if _selectolax_parser is not None:
+    BACKENDS['selectolax'] = SelectolaxDocument
+
+try:
+    import lxml.etree as _lxml_etree
+    import lxml.html as _lxml_html
+    BACKENDS['lxml'] = LxmlDocument
+except ImportError:  # pragma: no cover - dependência opcional
+    _lxml_etree = _lxml_html = None
+
+try:
+    from bs4 import BeautifulSoup as _BeautifulSoup
+    from bs4 import Comment as _Comment
+    BACKENDS['bs4'] = SoupDocument
+except ImportError:  # pragma: no cover - dependência opcional
+    _BeautifulSoup = _Comment = None
+
+BACKENDS['stdlib'] = StdlibDocument
+
+
+def default_backend() -> str:
+    """Backend configurado em CHAOZAO_HTML_BACKEND ou o mais rápido instalado"""
+    requested = os.environ.get('CHAOZAO_HTML_BACKEND')
+    if requested:
+        if requested in BACKENDS:
+            return requested
+        logger.warning(f"Backend HTML '{requested}' indisponível, usando o padrão")
+    return next(iter(BACKENDS))
+
+
+def parse_html(html: str, backend: Optional[str] = None):
+    """Faz o parse do HTML com o backend escolhido (ou o padrão)"""
+    return BACKENDS[backend or default_backend()](html)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Cliente HTTP compartilhado pelas ferramentas Python do Chãozão
+
+Uma única fábrica de sessões: o pool de conexões por host é dimensionado
+pela concorrência de quem usa a sessão (workers de páginas + imagens), as
+conexões keep-alive são reaproveitadas entre threads e 429/5xx são
+repetidos com backoff. Opcionalmente (--http2) usa httpx com HTTP/2, que
+multiplexa as requisições de um host numa só conexão.
+
+As respostas 429/5xx consumidas pela própria repetição do urllib3 não
+chegam ao hook de resposta do requests; create_session(on_status=...) as
+repassa a quem mede (ex.: ImageJobMetrics.observe_status).
+
+`pool_stats(sessão)` conta requisições x conexões novas, ou seja, quantas
+requisições reaproveitaram uma conexão do pool (acertos) e quantas tiveram
+que abrir uma (faltas).
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Mapping, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - dependência opcional
+    httpx = None
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class StatusRetry(Retry):
+    """
+    Retry que chama `on_status(status)` para cada resposta que ele consome
+
+    Uma resposta 429/5xx repetida é descartada pelo urllib3 e, quando as
+    tentativas se esgotam, o requests levanta RetryError sem resposta: em
+    nenhum dos dois casos o hook de resposta da sessão vê o status.
+    """
+
+    def __init__(self, *args, on_status: Optional[Callable[[int], None]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_status = on_status
+
+    def new(self, **kw) -> 'StatusRetry':
+        retry = super().new(**kw)
+        retry.on_status = self.on_status
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and self.on_status is not None:
+            self.on_status(response.status)
+        return super().increment(method, url, response=response, error=error, _pool=_pool, _stacktrace=_stacktrace)
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES,
+                   backoff_factor: float = 0.3, http2: bool = False, user_agent: str = USER_AGENT,
+                   on_status: Optional[Callable[[int], None]] = None):
+    """
+    Sessão com pool de `pool_size` conexões por host
+
+    Use pool_size = número de threads que fazem requisições ao mesmo tempo;
+    com um pool menor, as conexões excedentes são abertas e descartadas a
+    cada requisição. Com http2=True retorna uma Http2Session (httpx).
+    `on_status` recebe o status das respostas repetidas pelo urllib3 (o
+    hook de resposta só vê a resposta final).
+    """
+    if http2:
+        return Http2Session(pool_size=pool_size, retries=retries, user_agent=user_agent)
+
+    session = requests.Session()
+    retry_strategy = StatusRetry(total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+                                 on_status=on_status)
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=max(1, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({'User-Agent': user_agent})
+    return session
+
+
+class _Http2Response:
+    """Resposta do httpx com a parte da API do requests usada pelas ferramentas"""
+
+    def __init__(self, response):
+        self._response = response
+        # stream_download confere os bytes recebidos com response.raw.tell()
+        self.raw = self
+
+    @property
+    def status_code(self) -> int:
+        return self._response.status_code
+
+    @property
+    def headers(self):
+        return self._response.headers
+
+    @property
+    def url(self) -> str:
+        return str(self._response.url)
+
+    @property
+    def content(self) -> bytes:
+        return self._response.read()
+
+    @property
+    def text(self) -> str:
+        self._response.read()
+        return self._response.text
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} para {self.url}", response=self)
+
+    def iter_content(self, chunk_size: Optional[int] = None):
+        return self._response.iter_bytes(chunk_size)
+
+    def tell(self) -> int:
+        return self._response.num_bytes_downloaded
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Http2Session:
+    """
+    Subconjunto do requests.Session (get, headers, hooks) sobre httpx com HTTP/2
+
+    O transporte do httpx só repete falhas de conexão; 429/5xx ficam a cargo
+    do limitador de taxa e do tratamento de erros de quem chama. O pool deve
+    ter pelo menos uma conexão por thread: com threads disputando um pool
+    menor, o cliente síncrono do httpx falha com erros de leitura.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES,
+                 user_agent: str = USER_AGENT):
+        if httpx is None:
+            raise RuntimeError("HTTP/2 requer httpx (pip install 'httpx[http2]')")
+
+        limits = httpx.Limits(max_connections=max(1, pool_size), max_keepalive_connections=max(1, pool_size))
+        try:
+            transport = httpx.HTTPTransport(http2=True, limits=limits, retries=retries)
+        except ImportError as e:
+            raise RuntimeError("HTTP/2 requer o pacote h2 (pip install 'httpx[http2]')") from e
+        self.client = httpx.Client(transport=transport, follow_redirects=True)
+        self.headers: Dict[str, str] = {'User-Agent': user_agent}
+        self.hooks = {'response': []}
+
+        self._requests = 0
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    def _trace(self, event_name: str, info):
+        if event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self._connections += 1
+
+    def get(self, url: str, headers: Optional[Mapping[str, str]] = None, timeout: Optional[float] = None,
+            stream: bool = False) -> _Http2Response:
+        request = self.client.build_request(
+            'GET', url, headers={**self.headers, **(headers or {})},
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            extensions={'trace': self._trace}
+        )
+        response = _Http2Response(self.client.send(request, stream=stream))
+        with self._lock:
+            self._requests += 1
+        for hook in self.hooks['response']:
+            hook(response)
+        return response
+
+    def pool_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'requests': self._requests, 'connections': self._connections}
+
+    def close(self):
+        self.client.close()
+
+
+def pool_stats(session) -> Dict[str, float]:
+    """Requisições, conexões abertas, reaproveitamentos e taxa de acerto do pool"""
+    if isinstance(session, Http2Session):
+        counts = session.pool_stats()
+    else:
+        counts = {'requests': 0, 'connections': 0}
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            manager = getattr(adapter, 'poolmanager', None)
+            if manager is None:
+                continue
+            for key in manager.pools.keys():
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    counts['requests'] += pool.num_requests
+                    counts['connections'] += pool.num_connections
+
+    reused = max(counts['requests'] - counts['connections'], 0)
+    counts['reused'] = reused
+    counts['reuse_rate'] = reused / counts['requests'] if counts['requests'] else 0.0
+    return counts
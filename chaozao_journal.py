@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Diário de checkpoints dos downloads de imagens do Chãozão (SQLite)
+
+Cada propriedade concluída é gravada no diário assim que suas imagens
+terminam, em vez de ficar em memória até o fim do lote. Se a execução cair
+no meio, `--resume` pula as propriedades já registradas e o dataset
+`_with_images.json` é montado a partir do diário, não da lista em memória.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from chaozao_json import ImageResult, decode, dumps
+from chaozao_ndjson import derived_path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job TEXT NOT NULL,
+    property_id TEXT NOT NULL,
+    total_images INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (job, property_id)
+);
+"""
+
+
+def journal_path(dataset_file: str) -> str:
+    """Diário ao lado do dataset (ex.: chaozao_complete_dataset_images_journal.db)"""
+    return derived_path(dataset_file, '_images_journal.db')
+
+
+class CheckpointJournal:
+    """Resultados por propriedade de um job de imagens (seguro entre threads)"""
+
+    def __init__(self, path: str, job: str):
+        self.path = path
+        self.job = job
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        # Com WAL, NORMAL ainda sobrevive a uma queda do processo
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def reset(self):
+        """Descarta os checkpoints do job (execução nova, sem --resume)"""
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM checkpoints WHERE job = ?', (self.job,))
+
+    def record(self, result: Dict):
+        """Grava o resultado de uma propriedade ({'property_id', 'total_images', 'images'})"""
+        self.record_many([result])
+
+    def record_many(self, results: Iterable[Dict]):
+        rows = [
+            (self.job, result['property_id'], result['total_images'],
+             dumps(result).decode('utf-8'), time.time())
+            for result in results
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO checkpoints (job, property_id, total_images, result, completed_at) '
+                'VALUES (?, ?, ?, ?, ?)', rows
+            )
+
+    def done_ids(self) -> Set[str]:
+        """Propriedades já concluídas pelo job"""
+        with self._lock:
+            return {
+                row[0] for row in
+                self.conn.execute('SELECT property_id FROM checkpoints WHERE job = ?', (self.job,))
+            }
+
+    def get(self, property_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT result FROM checkpoints WHERE job = ? AND property_id = ?', (self.job, property_id)
+            ).fetchone()
+        return decode(row[0], ImageResult) if row else None
+
+    def results(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Resultados na ordem de gravação, lidos em lotes (memória constante)"""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    'SELECT rowid, result FROM checkpoints WHERE job = ? AND rowid > ? ORDER BY rowid LIMIT ?',
+                    (self.job, last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, result in rows:
+                yield decode(result, ImageResult)
+            last = rows[-1][0]
+
+    def summary(self) -> Dict[str, int]:
+        """Propriedades e imagens registradas no job"""
+        with self._lock:
+            properties, images = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(total_images), 0) FROM checkpoints WHERE job = ?', (self.job,)
+            ).fetchone()
+        return {'properties': properties, 'images': images}
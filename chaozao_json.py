@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Serialização JSON dos datasets e manifestos de imagens do Chãozão
+
+Backend plugável: msgspec ou orjson quando instalados (bem mais rápidos nas
+listas grandes como images.files), json da stdlib como fallback. O backend
+é escolhido na importação, na ordem msgspec > orjson > stdlib; a variável
+CHAOZAO_JSON (msgspec, orjson ou stdlib) força um deles. Compare com
+`python chaozao_bench.py serialize`.
+
+Os esquemas tipados (PropertyRecord, ImageFile, ImageManifest, ImageResult)
+são TypedDicts: com msgspec, decode(dados, esquema) valida e converte os
+tipos na própria decodificação e devolve dicts, como os demais backends.
+Campos fora do esquema são descartados nesse caso, então só use um esquema
+onde ele descreve o registro inteiro.
+
+Saída: dumps() compacto (NDJSON, diário) e dumps_pretty() com indent=2
+(documentos JSON), ambos em bytes UTF-8 sem escapar acentos. Os backends
+geram o mesmo conteúdo, mas não os mesmos bytes: a formatação de floats
+muda (1e+16 no stdlib, 1e16 no orjson/msgspec); compare decodificando.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, TypedDict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - dependência opcional
+    msgspec = None
+
+
+class _ImageFileBase(TypedDict):
+    original_url: str
+    local_path: str
+    filename: str
+
+
+class ImageFile(_ImageFileBase, total=False):
+    """Uma imagem baixada (entrada de images.files); datasets antigos não têm index/sha256"""
+    index: int
+    sha256: str
+
+
+class ImageManifest(TypedDict):
+    """Campo 'images' de uma propriedade no dataset _with_images"""
+    total_count: int
+    files: List[ImageFile]
+
+
+class ImageResult(TypedDict):
+    """Resultado de uma propriedade no diário de checkpoints"""
+    property_id: str
+    total_images: int
+    images: List[ImageFile]
+
+
+class PropertyRecord(TypedDict):
+    """Propriedade como gravada pelo chaozao_scraper (campos do dataclass Property)"""
+    id: str
+    title: str
+    type: str
+    price: Optional[int]
+    price_formatted: str
+    area_hectares: Optional[float]
+    area_m2: Optional[float]
+    area_alqueires: Optional[float]
+    city: str
+    state: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    features: List[str]
+    description: str
+    reference_code: Optional[str]
+    photos_count: int
+    url: str
+
+
+class StdlibBackend:
+    name = 'stdlib'
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def dumps_pretty(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+    def loads(self, data) -> Any:
+        return json.loads(data)
+
+    def decoder(self, schema) -> Callable[[bytes], Any]:
+        return self.loads
+
+
+class OrjsonBackend(StdlibBackend):
+    name = 'orjson'
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def dumps_pretty(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def loads(self, data) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecBackend(StdlibBackend):
+    name = 'msgspec'
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._typed: Dict[Any, Any] = {}
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def dumps_pretty(self, obj: Any) -> bytes:
+        return msgspec.json.format(self._encoder.encode(obj), indent=2)
+
+    def loads(self, data) -> Any:
+        return self._decoder.decode(data)
+
+    def decoder(self, schema) -> Callable[[bytes], Any]:
+        if schema not in self._typed:
+            self._typed[schema] = msgspec.json.Decoder(schema)
+        return self._typed[schema].decode
+
+
+BACKENDS = {'msgspec': MsgspecBackend, 'orjson': OrjsonBackend, 'stdlib': StdlibBackend}
+
+
+def available_backends() -> List[str]:
+    """Backends instalados, do mais rápido ao fallback"""
+    installed = {'msgspec': msgspec is not None, 'orjson': orjson is not None, 'stdlib': True}
+    return [name for name in BACKENDS if installed[name]]
+
+
+def get_backend(name: Optional[str] = None):
+    """Instância do backend `name` (None: o primeiro disponível)"""
+    if name is None:
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Backend JSON desconhecido: {name} (opções: {', '.join(BACKENDS)})")
+    if name not in available_backends():
+        raise RuntimeError(f"Backend JSON {name} não instalado (pip install {name})")
+    return BACKENDS[name]()
+
+
+backend = get_backend(os.environ.get('CHAOZAO_JSON') or None)
+
+
+def set_backend(name: Optional[str] = None):
+    """Troca o backend do processo (ex.: benchmark); retorna o nome do anterior"""
+    global backend
+    previous, backend = backend, get_backend(name)
+    return previous.name
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON compacto em uma linha (NDJSON, diário)"""
+    return backend.dumps(obj)
+
+
+def dumps_pretty(obj: Any) -> bytes:
+    """JSON com indent=2 (documentos legíveis)"""
+    return backend.dumps_pretty(obj)
+
+
+def loads(data) -> Any:
+    return backend.loads(data)
+
+
+def decode(data, schema=None) -> Any:
+    """loads(), validado contra `schema` (TypedDict) quando o backend é msgspec"""
+    if schema is None:
+        return backend.loads(data)
+    return backend.decoder(schema)(data)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Métricas dos downloaders do Chãozão
+
+Contadores e histogramas de latência protegidos por lock (os downloads
+rodam em dezenas de threads), expostos em formato texto do Prometheus num
+endpoint HTTP local e resumidos numa linha de console periódica. Servem para
+ajustar --workers/--rps com números reais em vez de palpites.
+
+Uso:
+    python download_all_images.py --metrics-port 9108 --report-interval 10
+    curl http://127.0.0.1:9108/metrics
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from requests.exceptions import RetryError
+
+from chaozao_http import pool_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_PORT = 9108
+
+# Segundos: de acertos de cache (ms) a downloads lentos de imagens grandes
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Counter:
+    """Contador monotônico, opcionalmente separado por labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Valor de uma série; sem labels, a soma de todas"""
+        with self._lock:
+            if not labels:
+                return sum(self._values.values())
+            return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values:
+            values = [((), 0)]
+        return [f"{self.name}{_format_labels(labels)} {value:g}" for labels, value in values]
+
+
+class FunctionCounter:
+    """Contador lido de outra fonte na hora da coleta (ex.: contadores do urllib3)"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Dict[str, float]], label: str):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        self.label = label
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(((self.label, key),))} {value:g}"
+            for key, value in sorted(self.read().items())
+        ]
+
+
+class Histogram:
+    """Histograma de buckets cumulativos (latências em segundos)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantil aproximado (interpolação linear dentro do bucket)"""
+        counts, _, total = self.snapshot()
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        counts, total_sum, total = self.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {total}')
+        lines.append(f"{self.name}_sum {total_sum:.6f}")
+        lines.append(f"{self.name}_count {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas de um processo, renderizado no formato do Prometheus"""
+
+    def __init__(self, prefix: str = 'chaozao_'):
+        self.prefix = prefix
+        self._metrics: List = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(self.prefix + name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def function_counter(self, name: str, help_text: str, read: Callable[[], Dict[str, float]],
+                         label: str) -> FunctionCounter:
+        metric = FunctionCounter(self.prefix + name, help_text, read, label)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(self.prefix + name, help_text, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(registry: MetricsRegistry, port: int = DEFAULT_METRICS_PORT,
+                  host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Sobe o endpoint /metrics numa thread daemon (só localhost por padrão)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Métricas em http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+class ConsoleReporter:
+    """Registra `line()` no log a cada `interval` segundos, até stop()"""
+
+    def __init__(self, line: Callable[[], str], interval: float = 10.0):
+        self.line = line
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-report', daemon=True)
+
+    def start(self) -> 'ConsoleReporter':
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                logger.info(self.line())
+            except Exception as e:
+                logger.warning(f"Erro no resumo de métricas: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def _status_class(status: int) -> str:
+    # 429 separado dos demais 4xx: é o sinal de que o --rps está alto demais
+    if status == 429:
+        return '429'
+    return f"{status // 100}xx"
+
+
+class ImageJobMetrics:
+    """Métricas padrão das ferramentas de imagens (páginas, imagens, disco, HTTP)"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.properties = r.counter('properties_total', 'Propriedades concluídas')
+        self.images = r.counter('images_total', 'Imagens por resultado (downloaded, reused, skipped)')
+        self.errors = r.counter('errors_total', 'Erros ao processar páginas ou imagens')
+        self.bytes = r.counter('image_bytes_total', 'Bytes de imagens gravados em disco')
+        self.responses = r.counter('http_responses_total', 'Respostas HTTP por classe de status')
+        self.retries_exhausted = r.counter('http_retries_exhausted_total',
+                                           'Requisições que esgotaram as tentativas (RetryError)')
+        self.pages_cached = r.counter('pages_cached_total', 'Páginas servidas pelo cache/arquivo')
+        self.page_fetch = r.histogram('page_fetch_seconds', 'Latência da busca de páginas')
+        self.image_fetch = r.histogram('image_fetch_seconds', 'Latência do download de uma imagem')
+        self.disk_write = r.histogram('disk_write_seconds', 'Tempo gravando uma imagem em disco')
+
+        self._pool_stats: Optional[Callable[[], Dict[str, float]]] = None
+        self._last_time = time.monotonic()
+        self._last: Dict[str, float] = {}
+
+    def observe_status(self, status: int):
+        """Conta uma resposta HTTP; também é o `on_status` de create_session"""
+        self.responses.inc(status=_status_class(status))
+
+    def response_hook(self, response, *args, **kwargs):
+        """Hook de resposta do requests.Session: conta a resposta final de cada requisição"""
+        self.observe_status(response.status_code)
+
+    def observe_error(self, error: Exception):
+        """Erro de página/imagem: RetryError indica 429/5xx até esgotar as tentativas"""
+        if isinstance(error, RetryError):
+            self.retries_exhausted.inc()
+
+    def track_pool(self, session):
+        """Publica acertos/faltas do pool de conexões da sessão (chaozao_http)"""
+        self._pool_stats = lambda: pool_stats(session)
+
+        def read():
+            counts = pool_stats(session)
+            return {'hit': counts['reused'], 'miss': counts['connections']}
+
+        self.registry.function_counter(
+            'http_pool_requests_total', 'Requisições que reaproveitaram (hit) ou abriram (miss) uma conexão',
+            read, label='result'
+        )
+
+    def observe_write(self, size: int, seconds: float):
+        """Callback `on_write` do stream_download"""
+        self.bytes.inc(size)
+        self.disk_write.observe(seconds)
+
+    def count(self) -> Dict[str, int]:
+        """Totais no formato do antigo dicionário de estatísticas"""
+        return {
+            'properties_processed': int(self.properties.value()),
+            'images_downloaded': int(self.images.value(outcome='downloaded')),
+            'images_skipped': int(self.images.value(outcome='skipped')),
+            'images_reused': int(self.images.value(outcome='reused')),
+            'errors': int(self.errors.value()),
+            'bytes_downloaded': int(self.bytes.value())
+        }
+
+    def summary_line(self) -> str:
+        """Taxas desde a última linha + latências p50/p95 acumuladas"""
+        now = time.monotonic()
+        current = {
+            'properties': self.properties.value(),
+            'images': self.images.value(),
+            'bytes': self.bytes.value(),
+            'responses': self.responses.value(),
+            '429': self.responses.value(status='429'),
+            '5xx': self.responses.value(status='5xx'),
+            'exhausted': self.retries_exhausted.value()
+        }
+        delta = {key: value - self._last.get(key, 0) for key, value in current.items()}
+        elapsed = max(now - self._last_time, 1e-9)
+        self._last, self._last_time = current, now
+        responses = max(delta['responses'], 1)
+
+        def latency(histogram: Histogram) -> str:
+            p50, p95 = histogram.quantile(0.5), histogram.quantile(0.95)
+            if p50 is None:
+                return '-'
+            return f"{p50:.2f}/{p95:.2f}s"
+
+        pool = ''
+        if self._pool_stats is not None:
+            pool = f" | pool {self._pool_stats()['reuse_rate'] * 100:.0f}% reuso"
+
+        return (
+            f"📈 {delta['properties'] / elapsed:.1f} prop/s | {delta['images'] / elapsed:.1f} img/s | "
+            f"{delta['bytes'] / elapsed / 1e6:.2f} MB/s | "
+            f"429 {delta['429'] / responses * 100:.1f}% 5xx {delta['5xx'] / responses * 100:.1f}% "
+            f"esgotadas {delta['exhausted']:.0f} | "
+            f"p50/p95 página {latency(self.page_fetch)} imagem {latency(self.image_fetch)} "
+            f"disco {latency(self.disk_write)}{pool}"
+        )
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Saída em streaming (NDJSON) dos datasets do Chãozão
+
+Um registro por linha, gravado assim que é produzido, em vez de um documento
+JSON montado em memória no fim da execução. O arquivo é escrito como
+`<arquivo>.part` e só ganha o nome final em finalize(): quem lê nunca vê um
+arquivo pela metade e, se o processo cair, o `.part` guarda tudo o que já
+foi produzido até o último flush.
+
+Compressão pela extensão: .ndjson.gz (gzip) ou .ndjson.zst (zstandard).
+
+read_records() lê um registro por vez de NDJSON (comprimido ou não, inclusive
+um `.part` com a última linha truncada) e também dos datasets JSON antigos
+({'properties': [...]}), que ainda precisam ser carregados inteiros.
+
+A serialização passa pelo backend de chaozao_json (orjson/msgspec/stdlib).
+"""
+
+import gzip
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from chaozao_json import decode, dumps, dumps_pretty, loads
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependência opcional
+    zstandard = None
+
+NDJSON_EXTENSIONS = ('.ndjson.gz', '.ndjson.zst', '.ndjson', '.jsonl')
+DATASET_EXTENSIONS = NDJSON_EXTENSIONS + ('.json',)
+
+TRUNCATED_ERRORS = (EOFError, OSError) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+READ_SIZE = 64 * 1024
+
+# Registros entre flushes: o que pode se perder numa queda do processo
+DEFAULT_FLUSH_EVERY = 100
+
+
+def dataset_extension(path: str) -> str:
+    """Extensão de dataset do arquivo ('.ndjson.gz', '.json', ...) ou ''"""
+    for extension in DATASET_EXTENSIONS:
+        if path.endswith(extension):
+            return extension
+    return ''
+
+
+def derived_path(dataset_file: str, suffix: str) -> str:
+    """Arquivo ao lado do dataset: derived_path('x.ndjson', '_images_journal.db') -> 'x_images_journal.db'"""
+    extension = dataset_extension(dataset_file)
+    stem = dataset_file[:-len(extension)] if extension else dataset_file
+    return stem + suffix
+
+
+def with_images_path(dataset_file: str) -> str:
+    """Dataset com imagens no mesmo formato do original (x.json -> x_with_images.json)"""
+    return derived_path(dataset_file, '_with_images' + (dataset_extension(dataset_file) or '.json'))
+
+
+def is_ndjson(path: str) -> bool:
+    return path.endswith(NDJSON_EXTENSIONS)
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise RuntimeError("Arquivo .zst requer o pacote zstandard (pip install zstandard)")
+
+
+class NdjsonWriter:
+    """
+    Grava registros um por linha em `<path>.part`; finalize() renomeia para `path`
+
+    Use como gerenciador de contexto: sem exceção o arquivo é finalizado; com
+    exceção o `.part` é fechado e mantido com os registros já gravados.
+    """
+
+    def __init__(self, path: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        self.path = path
+        self.tmp_path = f"{path}.part"
+        self.flush_every = flush_every
+        self.count = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._raw = open(self.tmp_path, 'wb')
+        if path.endswith('.gz'):
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb', mtime=0)
+        elif path.endswith('.zst'):
+            _require_zstd()
+            self._stream = zstandard.ZstdCompressor(level=10).stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+
+    def write(self, record: Dict):
+        line = dumps(record) + b'\n'
+        with self._lock:
+            self._stream.write(line)
+            self.count += 1
+            if self.count % self.flush_every == 0:
+                self._flush()
+
+    def write_many(self, records: Iterable[Dict]):
+        for record in records:
+            self.write(record)
+
+    def _flush(self):
+        # Fecha o bloco comprimido atual: o .part fica legível até aqui
+        if self._stream is not self._raw:
+            if zstandard is not None and isinstance(self._stream, zstandard.ZstdCompressionWriter):
+                self._stream.flush(zstandard.FLUSH_BLOCK)
+            else:
+                self._stream.flush()
+        self._raw.flush()
+
+    def _close(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._closed = True
+
+    def finalize(self) -> str:
+        """Fecha e renomeia (atômico) o `.part` para o nome final"""
+        with self._lock:
+            if not self._closed:
+                self._close()
+            os.replace(self.tmp_path, self.path)
+        logger.info(f"{self.count} registros salvos em {self.path}")
+        return self.path
+
+    def close(self):
+        """Fecha sem finalizar: o `.part` fica com os registros parciais"""
+        with self._lock:
+            if not self._closed:
+                self._close()
+                logger.warning(f"Saída incompleta mantida em {self.tmp_path} ({self.count} registros)")
+
+    def __enter__(self) -> 'NdjsonWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finalize()
+        else:
+            self.close()
+
+
+def _lines(path: str) -> Iterator[bytes]:
+    source = path[:-len('.part')] if path.endswith('.part') else path
+    if source.endswith('.zst'):
+        _require_zstd()
+        # Linhas separadas aqui: o stream_reader do zstandard não funciona bem sob io.BufferedReader
+        with open(path, 'rb') as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            pending = b''
+            while True:
+                chunk = reader.read(READ_SIZE)
+                if not chunk:
+                    break
+                *lines, pending = (pending + chunk).split(b'\n')
+                for line in lines:
+                    yield line + b'\n'
+            if pending:
+                yield pending
+        return
+
+    with (gzip.open(path, 'rb') if source.endswith('.gz') else open(path, 'rb')) as f:
+        yield from f
+
+
+def _ndjson_records(path: str, schema=None) -> Iterator[Dict]:
+    try:
+        for line in _lines(path):
+            if not line.strip():
+                continue
+            try:
+                record = decode(line, schema)
+            except ValueError:
+                # Erro de decodificação (todos os backends derivam de ValueError):
+                # só a última linha de uma saída interrompida pode estar cortada
+                if line.endswith(b'\n'):
+                    raise
+                logger.warning(f"Última linha truncada ignorada em {path}")
+                continue
+            yield record
+    except TRUNCATED_ERRORS as e:
+        # Bloco comprimido cortado no fim de um .part: vale o que foi lido
+        if not path.endswith('.part'):
+            raise
+        logger.warning(f"Fim do arquivo parcial {path}: {e}")
+
+
+def open_dataset(path: str, schema=None) -> Tuple[Dict, Iterator[Dict]]:
+    """
+    (metadados, registros) do dataset
+
+    NDJSON é lido linha a linha e não tem metadados; cada linha é validada
+    contra `schema` (TypedDict de chaozao_json) quando o backend permite. O
+    JSON antigo ({'total_properties': ..., 'properties': [...]}) é carregado
+    uma vez só, sem validação.
+    """
+    if is_ndjson(path[:-len('.part')] if path.endswith('.part') else path):
+        return {}, _ndjson_records(path, schema)
+
+    with open(path, 'rb') as f:
+        data = loads(f.read())
+    if not isinstance(data, dict):
+        return {}, iter(data)
+    metadata = {key: value for key, value in data.items() if key != 'properties'}
+    return metadata, iter(data.get('properties', []))
+
+
+def read_records(path: str, schema=None) -> Iterator[Dict]:
+    """Registros do dataset, um por vez (NDJSON) ou da lista 'properties' (JSON antigo)"""
+    return open_dataset(path, schema)[1]
+
+
+def dump_json_document(records: Iterable[Dict], path: str, metadata: Optional[Dict] = None,
+                       count_key: str = 'total_properties') -> int:
+    """
+    Grava {metadata..., 'properties': [...], count_key: N} registro a registro
+
+    Mesmo formato (indent=2) do json.dump dos datasets, sem montar a lista em
+    memória; a contagem vai no fim porque só é conhecida depois da lista.
+    Escrita atômica (temporário + rename). Retorna o número de registros.
+    """
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, 'wb') as f:
+        f.write(b'{\n')
+        for key, value in (metadata or {}).items():
+            if key in ('properties', count_key):
+                continue
+            f.write(b'  ' + dumps(key) + b': ' + dumps_pretty(value).replace(b'\n', b'\n  ') + b',\n')
+        f.write(b'  "properties": [')
+        for record in records:
+            f.write(b',\n    ' if count else b'\n    ')
+            f.write(dumps_pretty(record).replace(b'\n', b'\n    '))
+            count += 1
+        f.write(b'\n  ]' if count else b']')
+        f.write(b',\n  ' + dumps(count_key) + b': ' + str(count).encode() + b'\n}\n')
+    os.replace(tmp_path, path)
+    return count
+
+
+def write_dataset(records: Iterable[Dict], path: str, metadata: Optional[Dict] = None) -> int:
+    """Grava o dataset no formato da extensão: NDJSON (streaming) ou documento JSON"""
+    if is_ndjson(path):
+        with NdjsonWriter(path) as writer:
+            writer.write_many(records)
+        return writer.count
+    count = dump_json_document(records, path, metadata)
+    logger.info(f"{count} registros salvos em {path}")
+    return count
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Fotos quase idênticas entre anúncios do Chãozão (hash perceptual)
+
+Etapa posterior ao download das imagens: calcula um hash perceptual de 64
+bits (dHash ou pHash) por blob do repositório de imagens, guarda os hashes
+em um índice compacto (array uint64 em .npz, incremental) e encontra os
+pares a distância de Hamming <= limite com busca multi-índice: o hash é
+dividido em 4 blocos de 16 bits e, pelo princípio da casa dos pombos, um
+par dentro do limite coincide (ou difere em 1 bit) em pelo menos um bloco.
+Só esses candidatos têm a distância calculada, de forma vetorizada.
+
+O resultado lista os pares de propriedades que compartilham fotos, para
+identificar anúncios duplicados antes de irem para a tabela `properties`.
+
+Requer numpy e Pillow (pip install numpy pillow).
+
+Uso:
+    python chaozao_phash.py
+    python chaozao_phash.py --method phash --threshold 4 --workers 8
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from functools import partial
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from chaozao_blobs import DEFAULT_IMAGES_DIR, ImageStore
+from chaozao_pipeline import ParseStage
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependência opcional
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - dependência opcional
+    Image = None
+
+CHUNKS = 4
+CHUNK_BITS = 16
+# Cada bloco tolera no máximo 1 bit diferente: 4 blocos x (1 + 1) - 1
+MAX_THRESHOLD = 2 * CHUNKS - 1
+DEFAULT_THRESHOLD = 6
+DEFAULT_OUTPUT = 'chaozao_duplicate_listings.json'
+
+# Imagens presentes em muitos anúncios são marca d'água/logo, não duplicação
+DEFAULT_MAX_OWNERS = 50
+
+# Pares candidatos gerados por vez, para limitar a memória
+SEARCH_BLOCK = 65536
+
+_dct_matrix = None
+_popcount8 = None
+
+
+def _require():
+    if np is None or Image is None:
+        raise RuntimeError("O hash perceptual requer numpy e Pillow (pip install numpy pillow)")
+
+
+def _load_gray(path: str, size: Tuple[int, int]):
+    with Image.open(path) as image:
+        # JPEG: decodifica já reduzido pela escala da DCT, bem mais rápido
+        image.draft('L', (size[0] * 8, size[1] * 8))
+        return np.asarray(image.convert('L').resize(size, Image.LANCZOS), dtype=np.float32)
+
+
+def _pack(bits) -> int:
+    return int(np.packbits(bits.ravel()).view('>u8')[0])
+
+
+def dhash(path: str) -> int:
+    """Hash de diferença: gradiente horizontal de uma miniatura 9x8"""
+    pixels = _load_gray(path, (9, 8))
+    return _pack(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(path: str) -> int:
+    """Hash por DCT: frequências baixas 8x8 de uma miniatura 32x32 contra a mediana"""
+    global _dct_matrix
+    if _dct_matrix is None:
+        k = np.arange(32)[:, None]
+        n = np.arange(32)[None, :]
+        matrix = np.cos(np.pi * (2 * n + 1) * k / 64) * np.sqrt(2 / 32)
+        matrix[0] /= np.sqrt(2)
+        _dct_matrix = matrix.astype(np.float32)
+
+    pixels = _load_gray(path, (32, 32))
+    low = (_dct_matrix @ pixels @ _dct_matrix.T)[:8, :8]
+    # O termo DC (média) fica fora da mediana
+    return _pack(low > np.median(low.ravel()[1:]))
+
+
+HASHERS = {'dhash': dhash, 'phash': phash}
+
+
+def hash_image(item: Tuple[str, str], method: str = 'dhash') -> Tuple[str, Optional[int]]:
+    """(hash do blob, caminho) -> (hash do blob, hash perceptual ou None)"""
+    digest, path = item
+    try:
+        return digest, HASHERS[method](path)
+    except Exception as e:
+        logger.warning(f"Imagem ilegível {path}: {e}")
+        return digest, None
+
+
+def popcount64(values):
+    """Bits ligados de cada elemento de um array uint64"""
+    global _popcount8
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(np.int64)
+    if _popcount8 is None:
+        _popcount8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return _popcount8[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class PerceptualIndex:
+    """Hashes perceptuais em um array uint64, alinhados à lista de blobs"""
+
+    def __init__(self, method: str = 'dhash', digests: Optional[List[str]] = None, hashes=None):
+        _require()
+        self.method = method
+        self.digests: List[str] = list(digests or [])
+        self.hashes = hashes if hashes is not None else np.zeros(0, dtype=np.uint64)
+        self._known: Set[str] = set(self.digests)
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._known
+
+    @classmethod
+    def load(cls, path: str, method: str = 'dhash') -> 'PerceptualIndex':
+        _require()
+        if not os.path.exists(path):
+            return cls(method)
+        with np.load(path) as data:
+            if str(data['method']) != method:
+                logger.info(f"Índice {path} usa outro método; será recalculado")
+                return cls(method)
+            return cls(method, data['digests'].tolist(), data['hashes'].astype(np.uint64))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, method=np.array(self.method), digests=np.array(self.digests), hashes=self.hashes)
+        os.replace(tmp_path, path)
+
+    def extend(self, items: Iterable[Tuple[str, Optional[int]]]):
+        digests, hashes = [], []
+        for digest, value in items:
+            if value is not None and digest not in self._known:
+                digests.append(digest)
+                hashes.append(value)
+                self._known.add(digest)
+        if digests:
+            self.digests.extend(digests)
+            self.hashes = np.concatenate([self.hashes, np.array(hashes, dtype=np.uint64)])
+
+    def near_pairs(self, threshold: int = DEFAULT_THRESHOLD):
+        """Pares (i, j, distância) com i < j e distância de Hamming <= threshold"""
+        if not 0 <= threshold <= MAX_THRESHOLD:
+            raise ValueError(f"threshold deve estar entre 0 e {MAX_THRESHOLD}")
+
+        n = len(self.hashes)
+        empty = np.zeros(0, dtype=np.int64)
+        if n < 2:
+            return empty, empty, empty
+
+        # Diferença tolerada em cada bloco de 16 bits: 0 ou 1 bit
+        flips = [0] + ([1 << bit for bit in range(CHUNK_BITS)] if threshold // CHUNKS else [])
+        hashes = self.hashes
+        found = []
+
+        for chunk in range(CHUNKS):
+            keys = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(0xFFFF)).astype(np.int64)
+            order = np.argsort(keys, kind='stable')
+            # Início de cada um dos 65536 buckets em `order` (tabela no lugar de busca binária)
+            starts = np.zeros((1 << CHUNK_BITS) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(keys, minlength=1 << CHUNK_BITS), out=starts[1:])
+
+            for flip in flips:
+                # Com 1 bit trocado, basta partir dos itens com o bit desligado
+                candidates = np.flatnonzero((keys & flip) == 0) if flip else np.arange(n)
+                for start in range(0, len(candidates), SEARCH_BLOCK):
+                    src_ids = candidates[start:start + SEARCH_BLOCK]
+                    targets = keys[src_ids] ^ flip
+                    lo = starts[targets]
+                    counts = starts[targets + 1] - lo
+                    total = int(counts.sum())
+                    if not total:
+                        continue
+
+                    # Expande cada item nos itens do bucket correspondente
+                    first = np.cumsum(counts) - counts
+                    offsets = np.arange(total) - np.repeat(first, counts)
+                    src = np.repeat(src_ids, counts)
+                    dst = order[np.repeat(lo, counts) + offsets]
+
+                    if not flip:
+                        keep = src < dst
+                        src, dst = src[keep], dst[keep]
+                    distance = popcount64(hashes[src] ^ hashes[dst])
+                    close = distance <= threshold
+                    if close.any():
+                        found.append((src[close], dst[close], distance[close]))
+
+        if not found:
+            return empty, empty, empty
+
+        src = np.concatenate([f[0] for f in found])
+        dst = np.concatenate([f[1] for f in found])
+        distance = np.concatenate([f[2] for f in found])
+        # O mesmo par pode aparecer em mais de um bloco, em qualquer ordem
+        src, dst = np.minimum(src, dst), np.maximum(src, dst)
+        _, unique = np.unique(src * n + dst, return_index=True)
+        return src[unique], dst[unique], distance[unique]
+
+
+def duplicate_listings(index: PerceptualIndex, owners: Dict[str, Set[str]],
+                       threshold: int = DEFAULT_THRESHOLD, min_shared: int = 2,
+                       max_owners: int = DEFAULT_MAX_OWNERS) -> List[Dict]:
+    """Pares de propriedades que compartilham fotos iguais ou quase iguais"""
+    photos_per_property: Dict[str, int] = defaultdict(int)
+    for props in owners.values():
+        for property_id in props:
+            photos_per_property[property_id] += 1
+
+    shared: Dict[Tuple[str, str], Dict] = {}
+
+    def add(digest_a: str, digest_b: str, distance: int):
+        owners_a, owners_b = owners.get(digest_a, ()), owners.get(digest_b, ())
+        if len(owners_a) > max_owners or len(owners_b) > max_owners:
+            return
+        if digest_a == digest_b:
+            keys = combinations(sorted(owners_a), 2)
+        else:
+            keys = {(a, b) if a < b else (b, a) for a in owners_a for b in owners_b if a != b}
+        for key in keys:
+            entry = shared.setdefault(key, {'shared_photos': 0, 'min_distance': distance})
+            entry['shared_photos'] += 1
+            entry['min_distance'] = min(entry['min_distance'], distance)
+
+    # Mesmo arquivo (byte a byte) em mais de uma propriedade
+    for digest, props in owners.items():
+        if len(props) > 1:
+            add(digest, digest, 0)
+
+    src, dst, distance = index.near_pairs(threshold)
+    for i, j, d in zip(src.tolist(), dst.tolist(), distance.tolist()):
+        add(index.digests[i], index.digests[j], d)
+
+    pairs = []
+    for (a, b), entry in shared.items():
+        if entry['shared_photos'] < min_shared:
+            continue
+        smallest = min(photos_per_property[a], photos_per_property[b]) or 1
+        pairs.append({
+            'property_a': a,
+            'property_b': b,
+            'shared_photos': entry['shared_photos'],
+            'min_distance': entry['min_distance'],
+            'similarity': round(min(1.0, entry['shared_photos'] / smallest), 3),
+        })
+
+    pairs.sort(key=lambda p: (-p['similarity'], -p['shared_photos'], p['property_a'], p['property_b']))
+    return pairs
+
+
+def find_duplicate_listings(images_dir: str = DEFAULT_IMAGES_DIR, method: str = 'dhash',
+                            threshold: int = DEFAULT_THRESHOLD, workers: Optional[int] = None,
+                            min_shared: int = 2, output: str = DEFAULT_OUTPUT) -> List[Dict]:
+    """Atualiza o índice perceptual do repositório e grava o relatório de duplicados"""
+    _require()
+    store = ImageStore(images_dir)
+    index_file = str(Path(images_dir) / f"phash_{method}.npz")
+    index = PerceptualIndex.load(index_file, method)
+
+    # Só blobs ainda sem hash; o repositório é endereçado por conteúdo
+    pending = [(blob.digest, str(store.blob_path(blob))) for blob in store.blobs() if blob.digest not in index]
+    logger.info(f"Hash perceptual ({method}): {len(pending)} imagens novas, {len(index)} já indexadas")
+
+    start = time.time()
+    index.extend(ParseStage(partial(hash_image, method=method), workers=workers, chunk_size=64).map(pending))
+    index.save(index_file)
+    logger.info(f"Índice com {len(index)} hashes salvo em {index_file} ({time.time() - start:.1f}s)")
+
+    start = time.time()
+    pairs = duplicate_listings(index, store.blob_owners(), threshold=threshold, min_shared=min_shared)
+    logger.info(f"Busca de Hamming <= {threshold}: {len(pairs)} pares de propriedades ({time.time() - start:.1f}s)")
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'method': method,
+            'threshold': threshold,
+            'images_indexed': len(index),
+            'total_pairs': len(pairs),
+            'pairs': pairs
+        }, f, indent=2, ensure_ascii=False)
+    logger.info(f"Relatório salvo em {output}")
+
+    return pairs
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Anúncios com fotos quase idênticas (hash perceptual)')
+    parser.add_argument('--images-dir', default=DEFAULT_IMAGES_DIR, help='Repositório de imagens')
+    parser.add_argument('--method', choices=sorted(HASHERS), default='dhash', help='Hash perceptual (padrão: dhash)')
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f'Distância de Hamming máxima, até {MAX_THRESHOLD} (padrão: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--workers', type=int, help='Processos para decodificar as imagens (padrão: nº de CPUs)')
+    parser.add_argument('--min-shared', type=int, default=2, help='Fotos em comum para reportar um par (padrão: 2)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f'Relatório (padrão: {DEFAULT_OUTPUT})')
+    args = parser.parse_args()
+
+    pairs = find_duplicate_listings(args.images_dir, method=args.method, threshold=args.threshold,
+                                    workers=args.workers, min_shared=args.min_shared, output=args.output)
+
+    print(f"\n🔁 {len(pairs)} pares de propriedades com fotos em comum")
+    for pair in pairs[:10]:
+        print(f"  {pair['property_a']} x {pair['property_b']}: {pair['shared_photos']} fotos "
+              f"(similaridade {pair['similarity']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
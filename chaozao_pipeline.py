@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Etapa de parse CPU-bound do pipeline do Chãozão
+
+A etapa de rede (threads/asyncio) só baixa; o parse roda aqui, em um
+ProcessPoolExecutor, com os itens agrupados em lotes para diluir o custo de
+pickle entre processos. Os resultados saem na mesma ordem da entrada, então
+os arquivos gerados são determinísticos.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+
+
+def iter_chunks(items: Iterable, size: int) -> Iterator[List]:
+    """Agrupa um iterável em listas de até `size` itens"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _run_chunk(func: Callable, chunk: List) -> List:
+    return [func(item) for item in chunk]
+
+
+class ParseStage:
+    """Aplica `func` a cada item em processos separados, preservando a ordem
+
+    `func` precisa ser uma função de nível de módulo (serializável por pickle).
+    Com workers <= 1 roda no próprio processo, o que é mais rápido para
+    funções baratas como o parser de slugs.
+    """
+
+    def __init__(self, func: Callable, workers: Optional[int] = None, chunk_size: int = 256,
+                 max_pending_chunks: Optional[int] = None):
+        self.func = func
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = max(1, chunk_size)
+        # Limita os lotes em voo para não carregar toda a entrada na memória
+        self.max_pending_chunks = max_pending_chunks or self.workers * 4
+
+    def map(self, items: Iterable) -> Iterator:
+        """Gera func(item) para cada item, na ordem de entrada"""
+        if self.workers <= 1:
+            for item in items:
+                yield self.func(item)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for chunk in iter_chunks(items, self.chunk_size):
+                pending.append(executor.submit(_run_chunk, self.func, chunk))
+                if len(pending) >= self.max_pending_chunks:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
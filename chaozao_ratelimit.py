@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Limitadores de taxa por host para os crawlers do Chãozão
+
+Substituem o `time.sleep` fixo entre requisições por um orçamento de
+requisições por segundo (rps) aplicado a cada host separadamente.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class AsyncHostRateLimiter:
+    """Distribui as requisições de cada host em intervalos de 1/rps segundos"""
+
+    def __init__(self, rps: float):
+        self.rps = rps
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def acquire(self, url: str):
+        """Aguarda até que o host da URL tenha orçamento para mais uma requisição"""
+        if not self.interval:
+            return
+
+        host = urlparse(url).netloc
+        lock = self._locks.setdefault(host, asyncio.Lock())
+
+        # Reserva o próximo horário livre sob o lock e dorme fora dele,
+        # para que outras tarefas possam reservar os horários seguintes
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class HostRateLimiter:
+    """Versão para threads do AsyncHostRateLimiter (mesmo orçamento por host)"""
+
+    def __init__(self, rps: float):
+        self.rps = rps
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str):
+        """Bloqueia a thread até que o host da URL tenha orçamento para mais uma requisição"""
+        if not self.interval:
+            return
+
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
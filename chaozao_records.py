@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Registros compactos de propriedades para catálogos grandes em memória
+
+O dict de 12 chaves que parse_url_data devolve repete informação: id e
+reference_code são o código do fim da URL, description_raw é o slug da URL,
+title e price_formatted saem do slug e do preço. ListingRecord guarda só o
+que não dá para derivar (url, tipo, preço, áreas, cidade, estado) em
+__slots__, com tipo/cidade/estado internados (uma cópia de cada string no
+processo), e recalcula o resto sob demanda.
+
+ListingBatch guarda um catálogo inteiro em colunas: códigos de categoria
+em array para tipo/cidade/estado, preço e áreas em arrays numéricos e só a
+URL como objeto por linha.
+
+Ambos convertem de e para o formato dict/CSV atual (LISTING_FIELDS):
+    batch = ListingBatch.from_dicts(parse_urls(urls))
+    write_csv(batch, 'catalogo.csv')
+    for record in read_csv('catalogo.csv'): ...
+
+`python chaozao_bench.py memory` compara a memória dos formatos.
+"""
+
+import csv
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import unquote
+
+from chaozao_slug import format_price
+
+# Colunas do dict/CSV de parse_url_data, na mesma ordem
+LISTING_FIELDS = (
+    'id', 'title', 'type', 'price', 'price_formatted', 'area_hectares', 'area_m2',
+    'city', 'state', 'reference_code', 'url', 'description_raw'
+)
+
+CATEGORICAL_FIELDS = ('type', 'city', 'state')
+
+# Sentinela de preço ausente na coluna int64 (preços são sempre positivos)
+NO_PRICE = -1
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Só strings; outros valores ficam como vieram
+    return sys.intern(value) if isinstance(value, str) and value else value
+
+
+def _int_or_none(value) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    return int(float(value)) if isinstance(value, str) else int(value)
+
+
+def _float_or_none(value) -> Optional[float]:
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+class ListingRecord:
+    """Uma propriedade do dataset de URLs, sem __dict__ e sem campos derivados"""
+
+    __slots__ = ('url', 'type', 'price', 'area_hectares', 'area_m2', 'city', 'state')
+
+    def __init__(self, url: str, type: str, price: Optional[int], area_hectares: Optional[float],
+                 area_m2: Optional[float], city: str, state: str):
+        self.url = url
+        self.type = _intern(type)
+        self.price = price
+        self.area_hectares = area_hectares
+        self.area_m2 = area_m2
+        self.city = _intern(city)
+        self.state = _intern(state)
+
+    @property
+    def id(self) -> str:
+        return self.url.rpartition('/')[2]
+
+    reference_code = id
+
+    @property
+    def description_raw(self) -> str:
+        description = self.url.rpartition('/')[0].rpartition('/')[2]
+        return unquote(description) if '%' in description else description
+
+    @property
+    def title(self) -> str:
+        return self.description_raw.replace('-', ' ').title()
+
+    @property
+    def price_formatted(self) -> str:
+        return format_price(self.price) if self.price is not None else 'Consulte'
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ListingRecord':
+        """Do dict de parse_url_data (ou linha do CSV); os campos derivados vêm da URL"""
+        return cls(data['url'], data['type'], _int_or_none(data['price']),
+                   _float_or_none(data['area_hectares']), _float_or_none(data['area_m2']),
+                   data['city'], data['state'])
+
+    def to_dict(self) -> Dict:
+        """Dict no formato de parse_url_data"""
+        head, _, code = self.url.rpartition('/')
+        description = head.rpartition('/')[2]
+        if '%' in description:
+            description = unquote(description)
+        return {
+            'id': code,
+            'title': description.replace('-', ' ').title(),
+            'type': self.type,
+            'price': self.price,
+            'price_formatted': self.price_formatted,
+            'area_hectares': self.area_hectares,
+            'area_m2': self.area_m2,
+            'city': self.city,
+            'state': self.state,
+            'reference_code': code,
+            'url': self.url,
+            'description_raw': description
+        }
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ListingRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"ListingRecord(id={self.id!r}, type={self.type!r}, price={self.price!r}, city={self.city!r}, state={self.state!r})"
+
+
+class Categorical:
+    """Coluna de categorias: cada valor distinto uma vez, códigos por linha num array"""
+
+    __slots__ = ('values', 'codes', '_index')
+
+    def __init__(self, typecode: str = 'I'):
+        self.values: List[str] = []
+        self.codes = array(typecode)
+        self._index: Dict[str, int] = {}
+
+    def append(self, value: str):
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(_intern(value))
+        self.codes.append(code)
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def counts(self) -> Dict[str, int]:
+        """Linhas por categoria (ex.: propriedades por estado)"""
+        totals = [0] * len(self.values)
+        for code in self.codes:
+            totals[code] += 1
+        return dict(zip(self.values, totals))
+
+
+class ListingBatch:
+    """Catálogo em colunas; linhas saem como ListingRecord ou dict"""
+
+    def __init__(self):
+        self.urls: List[str] = []
+        self.type = Categorical('H')
+        self.city = Categorical('I')
+        self.state = Categorical('H')
+        self.price = array('q')
+        # NaN marca área ausente
+        self.area_hectares = array('d')
+        self.area_m2 = array('d')
+
+    def append(self, record: Union[ListingRecord, Dict]):
+        if isinstance(record, dict):
+            record = ListingRecord.from_dict(record)
+        self.urls.append(record.url)
+        self.type.append(record.type)
+        self.city.append(record.city)
+        self.state.append(record.state)
+        self.price.append(NO_PRICE if record.price is None else record.price)
+        self.area_hectares.append(math.nan if record.area_hectares is None else record.area_hectares)
+        self.area_m2.append(math.nan if record.area_m2 is None else record.area_m2)
+
+    def extend(self, records: Iterable[Union[ListingRecord, Dict]]):
+        for record in records:
+            self.append(record)
+
+    @classmethod
+    def from_dicts(cls, records: Iterable[Union[ListingRecord, Dict]]) -> 'ListingBatch':
+        batch = cls()
+        batch.extend(records)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __getitem__(self, row: int) -> ListingRecord:
+        price = self.price[row]
+        area_hectares, area_m2 = self.area_hectares[row], self.area_m2[row]
+        return ListingRecord(
+            self.urls[row], self.type[row], None if price == NO_PRICE else price,
+            None if math.isnan(area_hectares) else area_hectares,
+            None if math.isnan(area_m2) else area_m2,
+            self.city[row], self.state[row]
+        )
+
+    def __iter__(self) -> Iterator[ListingRecord]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def to_dicts(self) -> Iterator[Dict]:
+        for record in self:
+            yield record.to_dict()
+
+    def column(self, name: str) -> List:
+        """Valores de uma coluna, com None nos ausentes"""
+        if name in CATEGORICAL_FIELDS:
+            column = getattr(self, name)
+            return [column.values[code] for code in column.codes]
+        if name == 'price':
+            return [None if price == NO_PRICE else price for price in self.price]
+        if name in ('area_hectares', 'area_m2'):
+            return [None if math.isnan(area) else area for area in getattr(self, name)]
+        return [getattr(record, name) for record in self]
+
+
+def write_csv(records: Iterable[Union[ListingRecord, Dict]], path: str) -> int:
+    """Grava no formato do chaozao_complete_dataset.csv; retorna o número de linhas"""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=LISTING_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record.to_dict() if isinstance(record, ListingRecord) else record)
+            count += 1
+    return count
+
+
+def read_csv(path: str) -> Iterator[ListingRecord]:
+    """Linhas do CSV como ListingRecord (preço e áreas já numéricos)"""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield ListingRecord.from_dict(row)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Escalonador em dois níveis para os downloads de imagens do Chãozão
+
+Nível 1: busca das páginas das propriedades (descobre as imagens).
+Nível 2: download das imagens, em uma fila própria com seus próprios workers.
+
+Como as imagens de todas as propriedades dividem a mesma fila, um anúncio com
+50 fotos não prende um worker enquanto os outros ficam ociosos no fim do
+lote. O número de propriedades em andamento é limitado (janela com
+contrapressão): um item só sai da janela quando o consumidor recebe seu
+resultado, então nem a fila de imagens nem a de resultados crescem sem
+limite, e a entrada pode ser um gerador lido aos poucos. A cortesia com o site fica a cargo de um
+limitador de taxa por host, usado pelas próprias funções de busca.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingItem:
+    """Propriedade com downloads em andamento"""
+
+    def __init__(self, item: Any, context: Any, tasks: List):
+        self.item = item
+        self.context = context
+        self.tasks = tasks
+        self.outcomes: List[Any] = [None] * len(tasks)
+        self.remaining = len(tasks)
+        self.lock = threading.Lock()
+
+
+class TwoLevelScheduler:
+    """
+    Executa `expand` em workers de página e cada tarefa gerada em workers de imagem
+
+    - expand(item) -> (contexto, [tarefas])
+    - download(tarefa) -> resultado da tarefa (None em caso de falha)
+    - collect(item, contexto, tarefas, resultados) -> resultado final do item
+    """
+
+    def __init__(self, page_workers: int = 4, image_workers: int = 16,
+                 max_pending_items: Optional[int] = None):
+        self.page_workers = max(1, page_workers)
+        self.image_workers = max(1, image_workers)
+        self.max_pending_items = max_pending_items or self.image_workers * 2
+
+    def run(self, items: Iterable, expand: Callable[[Any], Tuple[Any, List]],
+            download: Callable[[Any], Any], collect: Callable) -> Iterator:
+        """Gera o resultado de `collect` de cada item, na ordem em que terminam"""
+        done: queue.Queue = queue.Queue()
+
+        with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix='pages') as pages, \
+                ThreadPoolExecutor(max_workers=self.image_workers, thread_name_prefix='images') as images:
+
+            def finish(pending: _PendingItem):
+                try:
+                    done.put(collect(pending.item, pending.context, pending.tasks, pending.outcomes))
+                except Exception as e:
+                    logger.error(f"Erro ao consolidar item: {e}")
+                    done.put(None)
+
+            def run_task(pending: _PendingItem, index: int):
+                try:
+                    pending.outcomes[index] = download(pending.tasks[index])
+                except Exception as e:
+                    logger.error(f"Erro na tarefa de download: {e}")
+                with pending.lock:
+                    pending.remaining -= 1
+                    last = pending.remaining == 0
+                if last:
+                    finish(pending)
+
+            def run_item(item):
+                try:
+                    context, tasks = expand(item)
+                    tasks = list(tasks)
+                except Exception as e:
+                    logger.error(f"Erro ao buscar página: {e}")
+                    context, tasks = None, []
+
+                pending = _PendingItem(item, context, tasks)
+                if not tasks:
+                    finish(pending)
+                    return
+                for index in range(len(tasks)):
+                    images.submit(run_task, pending, index)
+
+            submitted = received = 0
+            for item in items:
+                # Janela cheia: espera o consumidor receber um resultado antes de
+                # ler o próximo item (consumidor lento segura a entrada)
+                while submitted - received >= self.max_pending_items:
+                    result = done.get()
+                    received += 1
+                    if result is not None:
+                        yield result
+
+                pages.submit(run_item, item)
+                submitted += 1
+
+                # Entrega o que já terminou sem esperar o fim da entrada
+                while True:
+                    try:
+                        result = done.get_nowait()
+                    except queue.Empty:
+                        break
+                    received += 1
+                    if result is not None:
+                        yield result
+
+            while received < submitted:
+                result = done.get()
+                received += 1
+                if result is not None:
+                    yield result
@@ -7,27 +7,53 @@ Uso:
     python chaozao_scraper.py --full     # Extrai todas as propriedades
     python chaozao_scraper.py --sample   # Extrai uma amostra
     python chaozao_scraper.py --sitemap  # Apenas extrai URLs do sitemap
+    python chaozao_scraper.py --full --engine async --concurrency 16 --rps 4
+    python chaozao_scraper.py --full --incremental  # Apenas novas/alteradas
+    python chaozao_scraper.py --full --archive chaozao_pages.warc.gz  # Grava as páginas brutas
+    python chaozao_scraper.py --full --replay chaozao_pages.warc.gz   # Reextrai offline
+    python chaozao_scraper.py --full --compress zstd  # Fluxo em chaozao_data.ndjson.zst
 """
 
-import requests
-import xml.etree.ElementTree as ET
-import json
 import csv
-import re
+import itertools
 import time
-from urllib.parse import urljoin
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
 import argparse
 import logging
+import os
+import sys
+
+from chaozao_archive import ArchiveReader, ArchiveWriter
+from chaozao_cache import PageCache, DEFAULT_CACHE_DIR
+from chaozao_fetch import PageFetcher
+from chaozao_http import create_session
+from chaozao_json import PropertyRecord
+from chaozao_ndjson import NdjsonWriter, dump_json_document, read_records
+from chaozao_sitemap import SitemapDiscovery, DEFAULT_WORKERS as SITEMAP_WORKERS
+from chaozao_extract import extract_page
+from chaozao_pipeline import ParseStage
+from chaozao_slug import parse_url_data, property_type
+from chaozao_state import CrawlStateStore, DEFAULT_DB as DEFAULT_STATE_DB, fetch_hash, property_code
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) and value else value
+
+
 @dataclass
 class Property:
-    """Classe para representar uma propriedade"""
+    """Classe para representar uma propriedade (sem __dict__; categorias internadas)"""
+    __slots__ = (
+        'id', 'title', 'type', 'price', 'price_formatted', 'area_hectares', 'area_m2', 'area_alqueires',
+        'city', 'state', 'latitude', 'longitude', 'features', 'description', 'reference_code',
+        'photos_count', 'url'
+    )
+    
     id: str
     title: str
     type: str
@@ -45,110 +71,159 @@ class Property:
     reference_code: Optional[str]
     photos_count: int
     url: str
+    
+    def __post_init__(self):
+        # Tipo, cidade, estado e características se repetem em milhares de anúncios: uma cópia de cada
+        # (só strings: outro tipo fica como veio, em vez de derrubar o registro)
+        self.type = _intern(self.type)
+        self.city = _intern(self.city)
+        self.state = _intern(self.state)
+        self.features = [_intern(feature) for feature in self.features]
 
 class ChaozaoScraper:
     """Scraper para extrair dados do Chaozão.com.br"""
     
-    def __init__(self):
-        self.base_url = "https://chaozao.com.br"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, base_url: str = "https://chaozao.com.br",
+                 sitemap_state_file: Optional[str] = 'chaozao_sitemap_state.json',
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 archive: Optional[str] = None, replay: Optional[str] = None):
+        self.base_url = base_url.rstrip('/')
+        self.sitemap_state_file = sitemap_state_file
+        self.sitemap_complete = True
+        self.crawl_state: Optional[CrawlStateStore] = None
+        # Pool dimensionado para os downloads paralelos de sub-sitemaps
+        self.session = create_session(pool_size=SITEMAP_WORKERS)
+        # HTML compartilhado com os extratores de imagens e contatos (None desativa)
+        self.fetcher = PageFetcher(
+            self.session, PageCache(cache_dir) if cache_dir else None,
+            archive=ArchiveWriter(archive) if archive else None,
+            replay=ArchiveReader(replay) if replay else None
+        )
+        self.last_page_from_cache = False
         self.properties = []
+        # Com um sink (NdjsonWriter) cada propriedade vai direto para o disco
+        # em vez de se acumular em self.properties
+        self.sink: Optional[NdjsonWriter] = None
+        self.scraped_ids = set()
+        # Buscas de página só entram no estado de crawl depois que a propriedade
+        # foi gravada e a saída finalizada (ver commit_page_fetches)
+        self.fetched_pages: Dict[str, Tuple] = {}
+        self.pending_fetches: List[Tuple] = []
         
-    def extract_sitemap_urls(self) -> List[str]:
-        """Extrai todas as URLs do sitemap"""
-        urls = []
+    def emit(self, property_data: Property):
+        """Entrega uma propriedade extraída ao sink (ou à lista em memória)"""
+        self.scraped_ids.add(property_data.id)
+        if self.sink is not None:
+            self.sink.write(asdict(property_data))
+        else:
+            self.properties.append(property_data)
+        
+        fetch = self.fetched_pages.pop(property_data.url, None)
+        if fetch is not None:
+            self.pending_fetches.append(fetch)
+        
+    def extract_sitemap_entries(self) -> List[Tuple[str, Optional[str]]]:
+        """Extrai (url, lastmod) de todas as propriedades do sitemap"""
+        discovery = SitemapDiscovery(
+            base_url=self.base_url,
+            session=self.session,
+            state_file=self.sitemap_state_file
+        )
         
-        # Primeiro, pega o sitemap principal
-        try:
-            response = self.session.get(f"{self.base_url}/sitemap.xml")
-            response.raise_for_status()
-            
-            root = ET.fromstring(response.content)
-            
-            # Extrai URLs dos sub-sitemaps
-            for sitemap in root.findall(".//{http://www.sitemaps.org/schemas/sitemap/0.9}sitemap"):
-                loc = sitemap.find("{http://www.sitemaps.org/schemas/sitemap/0.9}loc")
-                if loc is not None:
-                    sitemap_url = loc.text
-                    logger.info(f"Processando sitemap: {sitemap_url}")
-                    urls.extend(self._extract_urls_from_sitemap(sitemap_url))
-                    
-        except Exception as e:
-            logger.error(f"Erro ao processar sitemap principal: {e}")
-            
         # Filtra apenas URLs de propriedades
-        property_urls = [url for url in urls if "/imovel/" in url]
-        logger.info(f"Total de propriedades encontradas: {len(property_urls)}")
+        entries = [(loc, lastmod) for loc, lastmod in discovery.discover() if "/imovel/" in loc]
+        self.sitemap_complete = discovery.stats['errors'] == 0
+        logger.info(f"Total de propriedades encontradas: {len(entries)}")
         
-        return property_urls
+        return entries
     
-    def _extract_urls_from_sitemap(self, sitemap_url: str) -> List[str]:
-        """Extrai URLs de um sitemap específico"""
-        urls = []
-        
+    def extract_sitemap_urls(self) -> List[str]:
+        """Extrai todas as URLs do sitemap"""
+        return [url for url, _ in self.extract_sitemap_entries()]
+    
+    def page_request_headers(self, url: str) -> Dict[str, str]:
+        """Cabeçalhos condicionais da última busca da página (modo incremental)"""
+        if self.crawl_state is None:
+            return {}
+        return self.crawl_state.conditional_headers('page', property_code(url))
+    
+    def record_page_fetch(self, url: str, content: Optional[bytes], headers):
+        """Anota a busca da página (content=None para 304) até a propriedade ser emitida"""
+        if self.crawl_state is None:
+            return
+        fetch = (property_code(url), fetch_hash(content),
+                 headers.get('ETag'), headers.get('Last-Modified'))
+        if content is None:
+            # 304: nada a emitir, a versão anterior vem do merge_previous
+            self.pending_fetches.append(fetch)
+        else:
+            self.fetched_pages[url] = fetch
+    
+    def commit_page_fetches(self):
+        """Grava no estado de crawl as buscas cujas propriedades já estão na saída"""
+        if self.crawl_state is not None and self.pending_fetches:
+            self.crawl_state.record_fetches('page', self.pending_fetches)
+            logger.info(f"Estado de crawl: {len(self.pending_fetches)} páginas registradas")
+        self.pending_fetches = []
+        self.fetched_pages = {}
+    
+    def extract_property_data(self, url: str) -> Optional[Property]:
+        """Extrai dados de uma propriedade específica"""
+        self.last_page_from_cache = False
         try:
-            response = self.session.get(sitemap_url)
-            response.raise_for_status()
+            # No modo incremental a página está pendente porque mudou: ignora o cache
+            page = self.fetcher.fetch(url, headers=self.page_request_headers(url),
+                                      refresh=self.crawl_state is not None)
             
-            root = ET.fromstring(response.content)
+            # Página sem mudanças desde a última busca
+            if page.status == 304:
+                self.record_page_fetch(url, None, page.headers)
+                return None
+            
+            self.last_page_from_cache = page.from_cache
+            if not page.from_cache:
+                self.record_page_fetch(url, page.content, page.headers)
             
-            for url in root.findall(".//{http://www.sitemaps.org/schemas/sitemap/0.9}url"):
-                loc = url.find("{http://www.sitemaps.org/schemas/sitemap/0.9}loc")
-                if loc is not None:
-                    urls.append(loc.text)
-                    
         except Exception as e:
-            logger.error(f"Erro ao processar {sitemap_url}: {e}")
+            logger.error(f"Erro ao extrair dados de {url}: {e}")
+            return None
             
-        return urls
+        return self.parse_property_page(url, page.text)
     
-    def extract_property_data(self, url: str) -> Optional[Property]:
-        """Extrai dados de uma propriedade específica"""
+    def parse_property_page(self, url: str, html: str) -> Optional[Property]:
+        """Monta a propriedade a partir do HTML já baixado"""
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            
-            html = response.text
-            
             # Extrai dados básicos da URL
-            url_pattern = r'/imovel/([^/]+)/([^/]+)$'
-            match = re.search(url_pattern, url)
-            if not match:
+            url_data = parse_url_data(url)
+            if not url_data:
                 logger.warning(f"URL não segue padrão esperado: {url}")
                 return None
                 
-            description_slug = match.group(1)
-            property_id = match.group(2)
+            # Uma única passada pelo HTML: JSON-LD/Next.js, depois o slug da URL
+            # e só então regex no texto para o que ainda faltar
+            fields = extract_page(html, code=url_data['id'], defaults={
+                key: url_data[key] for key in ('price', 'area_hectares', 'area_m2', 'city', 'state')
+            })
             
-            # Extrai dados do HTML (implementação simplificada)
-            # Aqui você implementaria a lógica para extrair todos os dados
-            # usando BeautifulSoup ou regex
-            
-            # Exemplo básico de extração
-            title = self._extract_title(html)
-            price = self._extract_price(html)
-            location = self._extract_location(html)
+            price = fields['price']
             
             property_data = Property(
-                id=property_id,
-                title=title or "Título não encontrado",
-                type=self._extract_type(description_slug),
+                id=url_data['id'],
+                title=fields['title'] or "Título não encontrado",
+                type=self._extract_type(url_data['description_raw']),
                 price=price,
                 price_formatted=self._format_price(price),
-                area_hectares=self._extract_area_hectares(html),
-                area_m2=self._extract_area_m2(html),
-                area_alqueires=self._extract_area_alqueires(html),
-                city=location.get('city', ''),
-                state=location.get('state', ''),
-                latitude=self._extract_latitude(html),
-                longitude=self._extract_longitude(html),
-                features=self._extract_features(html),
-                description=self._extract_description(html),
-                reference_code=self._extract_reference_code(html),
-                photos_count=self._extract_photos_count(html),
+                area_hectares=fields['area_hectares'],
+                area_m2=fields['area_m2'],
+                area_alqueires=fields['area_alqueires'],
+                city=fields['city'] or '',
+                state=fields['state'] or '',
+                latitude=fields['latitude'],
+                longitude=fields['longitude'],
+                features=fields['features'],
+                description=fields['description'],
+                reference_code=fields['reference_code'] or url_data['reference_code'],
+                photos_count=fields['photos_count'],
                 url=url
             )
             
@@ -158,78 +233,9 @@ class ChaozaoScraper:
             logger.error(f"Erro ao extrair dados de {url}: {e}")
             return None
     
-    def _extract_title(self, html: str) -> Optional[str]:
-        """Extrai o título da propriedade"""
-        # Implementar lógica de extração do título
-        pass
-    
-    def _extract_price(self, html: str) -> Optional[int]:
-        """Extrai o preço da propriedade"""
-        # Implementar lógica de extração do preço
-        pass
-    
-    def _extract_location(self, html: str) -> Dict[str, str]:
-        """Extrai localização da propriedade"""
-        # Implementar lógica de extração da localização
-        return {'city': '', 'state': ''}
-    
     def _extract_type(self, description_slug: str) -> str:
         """Extrai tipo da propriedade da URL"""
-        if 'fazenda' in description_slug:
-            return 'Fazenda'
-        elif 'chacara' in description_slug:
-            return 'Chácara'
-        elif 'sitio' in description_slug:
-            return 'Sítio'
-        elif 'rancho' in description_slug:
-            return 'Rancho'
-        else:
-            return 'Propriedade Rural'
-    
-    def _extract_area_hectares(self, html: str) -> Optional[float]:
-        """Extrai área em hectares"""
-        # Implementar lógica de extração da área
-        pass
-    
-    def _extract_area_m2(self, html: str) -> Optional[float]:
-        """Extrai área em m²"""
-        # Implementar lógica de extração da área
-        pass
-    
-    def _extract_area_alqueires(self, html: str) -> Optional[float]:
-        """Extrai área em alqueires"""
-        # Implementar lógica de extração da área
-        pass
-    
-    def _extract_latitude(self, html: str) -> Optional[float]:
-        """Extrai latitude"""
-        # Implementar lógica de extração das coordenadas
-        pass
-    
-    def _extract_longitude(self, html: str) -> Optional[float]:
-        """Extrai longitude"""
-        # Implementar lógica de extração das coordenadas
-        pass
-    
-    def _extract_features(self, html: str) -> List[str]:
-        """Extrai características da propriedade"""
-        # Implementar lógica de extração das características
-        return []
-    
-    def _extract_description(self, html: str) -> str:
-        """Extrai descrição da propriedade"""
-        # Implementar lógica de extração da descrição
-        return ""
-    
-    def _extract_reference_code(self, html: str) -> Optional[str]:
-        """Extrai código de referência"""
-        # Implementar lógica de extração do código
-        pass
-    
-    def _extract_photos_count(self, html: str) -> int:
-        """Extrai número de fotos"""
-        # Implementar lógica de extração do número de fotos
-        return 0
+        return property_type(description_slug, default='Propriedade Rural')
     
     def _format_price(self, price: Optional[int]) -> str:
         """Formata preço em reais"""
@@ -237,44 +243,100 @@ class ChaozaoScraper:
             return "Consulte"
         return f"R$ {price:,.0f}".replace(',', '.')
     
-    def scrape_all_properties(self, limit: Optional[int] = None) -> List[Property]:
-        """Faz scraping de todas as propriedades"""
-        urls = self.extract_sitemap_urls()
+    def scrape_all_properties(self, limit: Optional[int] = None, engine: str = 'sync',
+                              concurrency: int = 16, rps: float = 4.0,
+                              incremental: bool = False, state_db: str = DEFAULT_STATE_DB,
+                              parse_workers: int = 0) -> List[Property]:
+        """Faz scraping de todas as propriedades (para o sink, se houver)"""
+        if self.fetcher.replay is not None:
+            return self.replay_properties(limit=limit, parse_workers=parse_workers)
+            
+        if incremental:
+            # Busca apenas anúncios novos ou com <lastmod> diferente da última busca
+            self.crawl_state = CrawlStateStore(state_db)
+            self.crawl_state.sync_sitemap(self.extract_sitemap_entries(), mark_delisted=self.sitemap_complete)
+            urls = [url for _, url in self.crawl_state.pending('page')]
+            logger.info(f"Modo incremental: {len(urls)} propriedades para buscar")
+        else:
+            urls = self.extract_sitemap_urls()
         
         if limit:
             urls = urls[:limit]
             
+        if engine == 'async':
+            from chaozao_async import crawl_properties
+            
+            logger.info(f"Motor assíncrono: {concurrency} requisições simultâneas, {rps} req/s por host")
+            crawl_properties(self, urls, concurrency=concurrency, rps=rps,
+                             on_property=self.emit, parse_workers=parse_workers)
+            if self.sink is None:
+                self.commit_page_fetches()
+            return self.properties
+            
         for i, url in enumerate(urls, 1):
             logger.info(f"Processando propriedade {i}/{len(urls)}: {url}")
             
             property_data = self.extract_property_data(url)
             if property_data:
-                self.properties.append(property_data)
+                self.emit(property_data)
                 
             # Pausa entre requisições para ser respeitoso
-            time.sleep(1)
-            
+            if not self.last_page_from_cache:
+                time.sleep(1)
+        
+        # Sem sink a saída está em memória; com sink, o main grava após o finalize()
+        if self.sink is None:
+            self.commit_page_fetches()
         return self.properties
     
-    def save_to_json(self, filename: str):
-        """Salva dados em JSON"""
-        data = {
-            'total_properties': len(self.properties),
-            'extraction_date': time.strftime('%Y-%m-%d %H:%M:%S'),
-            'properties': [property.__dict__ for property in self.properties]
-        }
+    def replay_properties(self, limit: Optional[int] = None, parse_workers: int = 0) -> List[Property]:
+        """Reextrai offline as propriedades do arquivo WARC (parse em processos com parse_workers > 1)"""
+        urls = [url for url in self.fetcher.replay.urls() if "/imovel/" in url]
+        if limit:
+            urls = urls[:limit]
+        logger.info(f"Modo replay: {len(urls)} páginas de {self.fetcher.replay.path}")
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-            
-        logger.info(f"Dados salvos em {filename}")
+        pages = ((url, self.fetcher.fetch(url).text) for url in urls)
+        stage = ParseStage(parse_page, workers=parse_workers, chunk_size=64)
+        for property_data in stage.map(pages):
+            if property_data:
+                self.emit(property_data)
+                
+        return self.properties
     
-    def save_to_csv(self, filename: str):
-        """Salva dados em CSV"""
-        if not self.properties:
-            logger.warning("Nenhuma propriedade para salvar")
+    def merge_previous(self, filename: str):
+        """Mantém as propriedades da execução anterior que não foram rebuscadas nem removidas"""
+        if not os.path.exists(filename):
             return
             
+        delisted = self.crawl_state.delisted_codes() if self.crawl_state else set()
+        
+        kept = 0
+        kept_properties = []
+        for data in read_records(filename, schema=PropertyRecord):
+            if data['id'] in self.scraped_ids or property_code(data['url']) in delisted:
+                continue
+            kept += 1
+            if self.sink is not None:
+                self.sink.write(data)
+            else:
+                kept_properties.append(Property(**data))
+        logger.info(f"Modo incremental: {kept} propriedades mantidas de {filename}")
+        self.properties = kept_properties + self.properties
+    
+    def _records(self, records: Optional[Iterable[Dict]]) -> Iterable[Dict]:
+        if records is not None:
+            return records
+        return (asdict(property) for property in self.properties)
+    
+    def save_to_json(self, filename: str, records: Optional[Iterable[Dict]] = None):
+        """Salva dados em JSON (de `records`, ex.: read_records do NDJSON, ou de self.properties)"""
+        dump_json_document(self._records(records), filename,
+                           metadata={'extraction_date': time.strftime('%Y-%m-%d %H:%M:%S')})
+        logger.info(f"Dados salvos em {filename}")
+    
+    def save_to_csv(self, filename: str, records: Optional[Iterable[Dict]] = None):
+        """Salva dados em CSV, uma linha por registro"""
         fieldnames = [
             'id', 'title', 'type', 'price', 'price_formatted',
             'area_hectares', 'area_m2', 'area_alqueires',
@@ -283,16 +345,43 @@ class ChaozaoScraper:
             'photos_count', 'url'
         ]
         
+        rows = iter(self._records(records))
+        first = next(rows, None)
+        if first is None:
+            logger.warning("Nenhuma propriedade para salvar")
+            return
+            
         with open(filename, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             
-            for property in self.properties:
-                row = property.__dict__.copy()
+            for row in itertools.chain([first], rows):
+                row = dict(row)
                 row['features'] = '; '.join(row['features'])
                 writer.writerow(row)
                 
         logger.info(f"Dados salvos em {filename}")
+    
+    def save_to_columnar(self, filename: str, compression: Optional[str] = None, records: Optional[Iterable[Dict]] = None):
+        """Salva dados em Parquet ou Arrow IPC (pela extensão), com tipos por coluna"""
+        from chaozao_columnar import write_table
+        
+        records = list(self._records(records))
+        if not records:
+            logger.warning("Nenhuma propriedade para salvar")
+            return
+        
+        write_table(records, filename, compression=compression, columns=list(Property.__dataclass_fields__))
+
+_page_parser: Optional[ChaozaoScraper] = None
+
+def parse_page(item: Tuple[str, str]) -> Optional[Property]:
+    """Parse de (url, html) para uso na etapa de parse em processos separados"""
+    global _page_parser
+    if _page_parser is None:
+        _page_parser = ChaozaoScraper(sitemap_state_file=None, cache_dir=None)
+    url, html = item
+    return _page_parser.parse_property_page(url, html)
 
 def main():
     """Função principal"""
@@ -301,10 +390,27 @@ def main():
     parser.add_argument('--sample', type=int, default=10, help='Extrai uma amostra (padrão: 10)')
     parser.add_argument('--sitemap', action='store_true', help='Apenas extrai URLs do sitemap')
     parser.add_argument('--output', default='chaozao_data', help='Prefixo dos arquivos de saída')
+    parser.add_argument('--engine', choices=['sync', 'async'], default='sync', help='Motor de crawl (padrão: sync)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requisições simultâneas no motor async (padrão: 16)')
+    parser.add_argument('--rps', type=float, default=4.0, help='Requisições por segundo por host no motor async (padrão: 4)')
+    parser.add_argument('--base-url', default='https://chaozao.com.br', help='URL base do site (ex.: servidor stub local)')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Processos para o parse do HTML no motor async e no --replay (padrão: 0, no próprio processo)')
+    parser.add_argument('--incremental', action='store_true', help='Busca apenas propriedades novas ou alteradas')
+    parser.add_argument('--state-db', default=DEFAULT_STATE_DB, help=f'Banco do estado de crawl (padrão: {DEFAULT_STATE_DB})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Cache de páginas HTML (padrão: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Não lê nem grava o cache de páginas')
+    parser.add_argument('--archive', help='Grava as páginas brutas neste arquivo WARC (.warc.gz ou .warc.zst)')
+    parser.add_argument('--replay', help='Roda offline a partir de um arquivo WARC gravado com --archive')
+    parser.add_argument('--columnar', choices=['parquet', 'arrow'], help='Também salva em Parquet ou Arrow IPC (requer pyarrow)')
+    parser.add_argument('--compress', choices=['gzip', 'zstd'], help='Comprime o fluxo NDJSON (.ndjson.gz ou .ndjson.zst)')
     
     args = parser.parse_args()
     
-    scraper = ChaozaoScraper()
+    if args.replay and args.incremental:
+        parser.error('--replay não pode ser combinado com --incremental')
+    
+    scraper = ChaozaoScraper(base_url=args.base_url, cache_dir=None if args.no_cache else args.cache_dir,
+                             archive=args.archive, replay=args.replay)
     
     if args.sitemap:
         urls = scraper.extract_sitemap_urls()
@@ -314,16 +420,41 @@ def main():
         logger.info(f"URLs salvas em {args.output}_urls.txt")
         return
     
-    if args.full:
-        scraper.scrape_all_properties()
-    else:
-        scraper.scrape_all_properties(limit=args.sample)
+    crawl_options = {
+        'engine': args.engine, 'concurrency': args.concurrency, 'rps': args.rps,
+        'incremental': args.incremental, 'state_db': args.state_db,
+        'parse_workers': args.parse_workers
+    }
+    
+    # Cada propriedade vai para o NDJSON assim que extraída; se o processo
+    # cair, o .part guarda o que já foi feito
+    stream_file = f"{args.output}.ndjson" + {None: '', 'gzip': '.gz', 'zstd': '.zst'}[args.compress]
+    previous_file = next(
+        (path for path in (f"{args.output}.ndjson", f"{args.output}.ndjson.gz", f"{args.output}.ndjson.zst",
+                           f"{args.output}.json") if os.path.exists(path)),
+        f"{args.output}.json"
+    )
+    
+    with NdjsonWriter(stream_file) as sink:
+        scraper.sink = sink
+        if args.full:
+            scraper.scrape_all_properties(**crawl_options)
+        else:
+            scraper.scrape_all_properties(limit=args.sample, **crawl_options)
+        
+        if args.incremental:
+            scraper.merge_previous(previous_file)
+    scraper.sink = None
+    # Só depois do finalize(): uma queda antes disso rebusca as páginas na próxima execução
+    scraper.commit_page_fetches()
     
-    # Salva os dados
-    scraper.save_to_json(f"{args.output}.json")
-    scraper.save_to_csv(f"{args.output}.csv")
+    # JSON/CSV derivados do fluxo, um registro por vez
+    scraper.save_to_json(f"{args.output}.json", records=read_records(stream_file))
+    scraper.save_to_csv(f"{args.output}.csv", records=read_records(stream_file))
+    if args.columnar:
+        scraper.save_to_columnar(f"{args.output}.{args.columnar}", records=read_records(stream_file))
     
-    logger.info(f"Extração concluída. Total de propriedades: {len(scraper.properties)}")
+    logger.info(f"Extração concluída. Total de propriedades: {sink.count}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Descoberta de URLs pelos sitemaps do Chãozão
+
+Segue o sitemap índice (sem número fixo de sub-sitemaps), baixa os
+sub-sitemaps em paralelo e guarda ETag/Last-Modified/<lastmod> de cada um
+em um arquivo de estado. Nas execuções seguintes um sub-sitemap cujo
+<lastmod> no índice não mudou nem é buscado, e os demais recebem requisições
+condicionais, de modo que um sitemap sem mudanças custa no máximo um 304.
+
+Os sitemaps são lidos em streaming (XMLPullParser), inclusive .xml.gz.
+"""
+
+import json
+import logging
+import threading
+import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from chaozao_http import create_session
+
+logger = logging.getLogger(__name__)
+
+ENTRY_TAGS = ('url', 'sitemap')
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+CHUNK_SIZE = 64 * 1024
+
+# Sub-sitemaps baixados em paralelo (e conexões no pool da sessão padrão)
+DEFAULT_WORKERS = 8
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def iter_decoded_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Repassa os blocos, descompactando gzip (.xml.gz) de forma transparente"""
+    decompressor = None
+    head = b''
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+
+        # Precisa dos dois primeiros bytes para reconhecer o cabeçalho gzip
+        if head is not None:
+            head += chunk
+            if len(head) < 2:
+                continue
+            chunk, head = head, None
+            if chunk[:2] == GZIP_MAGIC:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        if chunk:
+            yield chunk
+
+    if head:
+        yield head
+    if decompressor:
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+
+class SitemapReader:
+    """Lê um sitemap em blocos e gera as entradas (loc, lastmod) uma a uma
+
+    Usa XMLPullParser e descarta cada <url>/<sitemap> depois de lido, então
+    a memória não cresce com o tamanho do sitemap. O atributo `kind` passa a
+    valer 'index' ou 'urlset' assim que o elemento raiz é lido.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = chunks
+        self.kind: Optional[str] = None
+        self._root = None
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[str]]]:
+        parser = ET.XMLPullParser(events=('start', 'end'))
+
+        for chunk in iter_decoded_chunks(self.chunks):
+            parser.feed(chunk)
+            yield from self._read_events(parser)
+
+        parser.close()
+        yield from self._read_events(parser)
+
+    def _read_events(self, parser) -> Iterator[Tuple[str, Optional[str]]]:
+        for event, elem in parser.read_events():
+            name = _local_name(elem.tag)
+
+            if event == 'start':
+                if self._root is None:
+                    self._root = elem
+                    self.kind = 'index' if name == 'sitemapindex' else 'urlset'
+                continue
+
+            if elem is self._root or name not in ENTRY_TAGS:
+                continue
+
+            loc = lastmod = None
+            for child in elem:
+                child_name = _local_name(child.tag)
+                if child_name == 'loc':
+                    loc = child.text
+                elif child_name == 'lastmod':
+                    lastmod = child.text
+
+            # Descarta a entrada já lida (e a referência na raiz)
+            elem.clear()
+            self._root.clear()
+
+            if loc:
+                yield loc.strip(), lastmod.strip() if lastmod else None
+
+
+class SitemapDiscovery:
+    """Baixa o índice e os sub-sitemaps com requisições condicionais em paralelo"""
+
+    def __init__(self, base_url: str = "https://chaozao.com.br", session: Optional[requests.Session] = None,
+                 state_file: Optional[str] = 'chaozao_sitemap_state.json', max_workers: int = DEFAULT_WORKERS,
+                 timeout: float = 30):
+        self.base_url = base_url.rstrip('/')
+        self.session = session or create_session(pool_size=max_workers)
+        self.state_file = Path(state_file) if state_file else None
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.state: Dict[str, dict] = self._load_state()
+        self.stats = {'fetched': 0, 'not_modified': 0, 'unchanged': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    def _load_state(self) -> Dict[str, dict]:
+        if self.state_file and self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('sitemaps', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Estado de sitemaps ignorado ({self.state_file}): {e}")
+        return {}
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def save_state(self):
+        """Grava os validadores e entradas de cada sitemap"""
+        if not self.state_file:
+            return
+
+        tmp_file = self.state_file.with_suffix(self.state_file.suffix + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'sitemaps': self.state}, f, ensure_ascii=False)
+        tmp_file.replace(self.state_file)
+
+    def fetch_sitemap(self, sitemap_url: str, lastmod: Optional[str] = None) -> dict:
+        """Baixa um sitemap, reaproveitando o estado salvo quando o servidor responde 304"""
+        cached = self.state.get(sitemap_url)
+
+        # O índice informa o mesmo <lastmod> da última busca: nem faz a requisição
+        if cached and lastmod and cached.get('lastmod') == lastmod:
+            self._count('unchanged')
+            return cached
+
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            with self.session.get(sitemap_url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    self._count('not_modified')
+                    if lastmod:
+                        cached['lastmod'] = lastmod
+                    return cached
+
+                response.raise_for_status()
+                reader = SitemapReader(response.iter_content(chunk_size=CHUNK_SIZE))
+                entries = list(reader)
+                kind = reader.kind or 'urlset'
+
+        except Exception as e:
+            logger.error(f"Erro ao processar {sitemap_url}: {e}")
+            self._count('errors')
+            # Em caso de falha, mantém a última versão conhecida
+            return cached or {'kind': 'urlset', 'entries': []}
+
+        self._count('fetched')
+        record = {
+            'kind': kind,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'lastmod': lastmod,
+            'entries': entries,
+        }
+        self.state[sitemap_url] = record
+        return record
+
+    def discover(self) -> List[Tuple[str, Optional[str]]]:
+        """Retorna todas as entradas (loc, lastmod) alcançáveis a partir do sitemap índice"""
+        root_url = f"{self.base_url}/sitemap.xml"
+        pending = [self.fetch_sitemap(root_url)]
+        # Índices que se referenciam (ou repetem filhos) não geram novas buscas
+        seen = {root_url}
+        entries = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending:
+                children = []
+                for record in pending:
+                    if record['kind'] == 'index':
+                        for loc, lastmod in record['entries']:
+                            if loc not in seen:
+                                seen.add(loc)
+                                children.append((loc, lastmod))
+                    else:
+                        entries.extend(tuple(entry) for entry in record['entries'])
+
+                if children:
+                    for loc, _ in children:
+                        logger.info(f"Processando sitemap: {loc}")
+                    pending = list(executor.map(lambda child: self.fetch_sitemap(*child), children))
+                else:
+                    pending = []
+
+        self.save_state()
+        logger.info(
+            f"Sitemaps: {self.stats['fetched']} baixados, {self.stats['not_modified']} sem mudanças (304), "
+            f"{self.stats['unchanged']} com o mesmo <lastmod>, {self.stats['errors']} erros"
+        )
+        return entries
+
+    def property_urls(self) -> List[str]:
+        """Retorna apenas as URLs de propriedades (/imovel/)"""
+        return [loc for loc, _ in self.discover() if "/imovel/" in loc]
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Parser único dos slugs de URL do Chãozão
+
+Padrão: /imovel/{tipo}-em-{cidade}-{estado}-com-area-de-{area}-{unidade}-r-{preco}-cod-{codigo}/{ID}
+
+Os padrões são compilados uma vez e as tabelas de tipos e estados ficam no
+nível do módulo. O estado é resolvido pelo sufixo mais longo, então estados
+compostos (mato-grosso-do-sul, rio-grande-do-norte...) e cidades com vários
+nomes (sao-jose-dos-campos-sao-paulo) saem corretos.
+
+Cidade/estado, o trecho final (área e preço) e o preço formatado ficam em
+cache por valor distinto: num sitemap as mesmas cidades e preços se repetem
+e cada um é resolvido uma única vez.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote
+
+TIPOS = {
+    'fazenda': 'Fazenda',
+    'sitio': 'Sítio',
+    'chacara': 'Chácara',
+    'terreno': 'Terreno',
+    'casa': 'Casa Rural',
+    'haras': 'Haras',
+    'rancho': 'Rancho',
+}
+
+# slug do estado -> (UF, nome)
+ESTADOS = {
+    'acre': ('AC', 'Acre'),
+    'alagoas': ('AL', 'Alagoas'),
+    'amapa': ('AP', 'Amapá'),
+    'amazonas': ('AM', 'Amazonas'),
+    'bahia': ('BA', 'Bahia'),
+    'ceara': ('CE', 'Ceará'),
+    'distrito-federal': ('DF', 'Distrito Federal'),
+    'espirito-santo': ('ES', 'Espírito Santo'),
+    'goias': ('GO', 'Goiás'),
+    'maranhao': ('MA', 'Maranhão'),
+    'mato-grosso': ('MT', 'Mato Grosso'),
+    'mato-grosso-do-sul': ('MS', 'Mato Grosso do Sul'),
+    'minas-gerais': ('MG', 'Minas Gerais'),
+    'para': ('PA', 'Pará'),
+    'paraiba': ('PB', 'Paraíba'),
+    'parana': ('PR', 'Paraná'),
+    'pernambuco': ('PE', 'Pernambuco'),
+    'piaui': ('PI', 'Piauí'),
+    'rio-de-janeiro': ('RJ', 'Rio de Janeiro'),
+    'rio-grande-do-norte': ('RN', 'Rio Grande do Norte'),
+    'rio-grande-do-sul': ('RS', 'Rio Grande do Sul'),
+    'rondonia': ('RO', 'Rondônia'),
+    'roraima': ('RR', 'Roraima'),
+    'santa-catarina': ('SC', 'Santa Catarina'),
+    'sao-paulo': ('SP', 'São Paulo'),
+    'sergipe': ('SE', 'Sergipe'),
+    'tocantins': ('TO', 'Tocantins'),
+}
+
+NOME_POR_UF = {uf: nome for uf, nome in ESTADOS.values()}
+
+# Caminho rápido: o slug completo, como em todos os anúncios atuais, é
+# separado com str.partition e só o trecho final passa por regex
+FINAL_RE = re.compile(r'(\d+(?:\.\d+)?)-?(ha|m|hectares|metros)-r-(\d+)-cod-[^-]+$')
+
+# Slugs fora do padrão completo: cada parte é procurada separadamente
+LOCAL_RE = re.compile(r'-em-(.+?)(?:-com-area-de-|-r-\d|-cod-|$)')
+AREA_RE = re.compile(r'area-de-(\d+(?:\.\d+)?)-?(ha|m|hectares|metros)')
+PRECO_RE = re.compile(r'(?:^|-)r-(\d+)')
+
+# Alternância com os estados mais longos primeiro; o `.+?` preguiçoso faz a
+# cidade ser a menor possível, ou seja, o estado é o sufixo mais longo
+LOCAL_ESTADO_RE = re.compile(
+    r'(?P<cidade>.+?)-(?P<estado>'
+    + '|'.join(re.escape(slug) for slug in sorted(ESTADOS, key=len, reverse=True))
+    + r')$'
+)
+
+UNIDADES_HA = ('ha', 'hectares')
+
+_local_cache: Dict[bool, Dict[str, Tuple[str, str]]] = {False: {}, True: {}}
+# trecho final do slug -> (area_hectares, area_m2, preço, preço formatado), None fora do padrão
+_final_cache: Dict[str, Optional[Tuple]] = {}
+_price_cache: Dict[int, str] = {}
+
+
+def property_type(description: str, default: str = 'Não identificado') -> str:
+    """Tipo do imóvel pelo prefixo do slug (antes de '-em-')"""
+    tipo = TIPOS.get(description.partition('-')[0])
+    if tipo:
+        return tipo
+    for key, value in TIPOS.items():
+        if key in description:
+            return value
+    return default
+
+
+def resolve_location(local: str, state_names: bool = False) -> Tuple[str, str]:
+    """Separa '{cidade}-{estado}' em (Cidade, UF ou nome do estado)"""
+    cache = _local_cache[state_names]
+    cached = cache.get(local)
+    if cached is not None:
+        return cached
+
+    match = LOCAL_ESTADO_RE.match(local)
+    if match:
+        uf, nome = ESTADOS[match.group('estado')]
+        result = (match.group('cidade').replace('-', ' ').title(), nome if state_names else uf)
+    else:
+        # Estado desconhecido: última palavra como estado, o resto como cidade
+        cidade, _, estado = local.rpartition('-')
+        result = (cidade.replace('-', ' ').title(), estado.replace('-', ' ').title() if state_names else estado.upper())
+
+    cache[local] = result
+    return result
+
+
+def format_price(preco: int) -> str:
+    """R$ 1.234.567,00"""
+    formatted = _price_cache.get(preco)
+    if formatted is None:
+        formatted = f"R$ {preco:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+        _price_cache[preco] = formatted
+    return formatted
+
+
+def _area(valor: Optional[str], unidade: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """(area_hectares, area_m2) conforme a unidade do slug"""
+    if valor is None:
+        return None, None
+    if unidade in UNIDADES_HA:
+        return float(valor), None
+    return None, float(valor)
+
+
+def _parse_final(final: str) -> Optional[Tuple]:
+    """Área e preço do trecho '{area}-{unidade}-r-{preco}-cod-{codigo}', com cache"""
+    try:
+        return _final_cache[final]
+    except KeyError:
+        pass
+
+    slug = FINAL_RE.match(final)
+    result = None
+    if slug:
+        area_valor, area_unidade, preco_raw = slug.groups()
+        preco = int(preco_raw)
+        result = (*_area(area_valor, area_unidade), preco, format_price(preco))
+    _final_cache[final] = result
+    return result
+
+
+def parse_url_data(url: str, state_names: bool = False) -> Optional[Dict]:
+    """
+    Extrai informações da URL do Chãozão
+
+    `state` sai como UF (SP, GO...); com state_names=True, como nome completo.
+    """
+    # Equivale a /imovel/([^/]+)/([^/]+)$, sem regex
+    head, _, code = url.rpartition('/')
+    head, _, description = head.rpartition('/')
+    if not code or not description or not head.endswith('/imovel'):
+        return None
+
+    if '%' in description:
+        description = unquote(description)
+
+    tipo_slug, em, resto = description.partition('-em-')
+    local, com_area, final = resto.partition('-com-area-de-')
+    parsed = _parse_final(final) if em and com_area else None
+
+    if parsed:
+        tipo = TIPOS.get(tipo_slug) or property_type(description)
+        cidade, estado = resolve_location(local, state_names)
+        area_hectares, area_m2, preco, price_formatted = parsed
+    else:
+        tipo = property_type(description)
+        local = LOCAL_RE.search(description)
+        cidade, estado = resolve_location(local.group(1), state_names) if local else ('', '')
+        area = AREA_RE.search(description)
+        area_hectares, area_m2 = _area(*area.groups()) if area else (None, None)
+        preco = PRECO_RE.search(description)
+        preco = int(preco.group(1)) if preco else None
+        price_formatted = format_price(preco) if preco is not None else 'Consulte'
+
+    return {
+        'id': code,
+        'title': description.replace('-', ' ').title(),
+        'type': tipo,
+        'price': preco,
+        'price_formatted': price_formatted,
+        'area_hectares': area_hectares,
+        'area_m2': area_m2,
+        'city': cidade,
+        'state': estado,
+        'reference_code': code,
+        'url': url,
+        'description_raw': description
+    }
+
+
+def parse_urls(urls: Iterable[str], state_names: bool = False) -> List[Dict]:
+    """Analisa um lote de URLs, mantendo a ordem e descartando as fora do padrão"""
+    results = []
+    append = results.append
+    for url in urls:
+        parsed = parse_url_data(url, state_names)
+        if parsed is not None:
+            append(parsed)
+    return results
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Estado persistente de crawl do Chãozão (SQLite)
+
+Cada anúncio é identificado pelo código no final da URL (ex.: TN2W4S).
+Para cada etapa do pipeline ('page', 'images', ...) guarda quando o anúncio
+foi processado, o hash do conteúdo, os validadores HTTP e o <lastmod> do
+sitemap naquele momento. Com isso o modo --incremental busca apenas anúncios
+novos ou alterados e marca como removidos os que sumiram do sitemap.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = 'chaozao_crawl_state.db'
+
+# Sem <lastmod> no sitemap, o anúncio é revisitado depois deste intervalo
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    code TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    sitemap_lastmod TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    delisted_at REAL
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    code TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    sitemap_lastmod TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    PRIMARY KEY (code, stage)
+);
+"""
+
+
+def fetch_hash(content: Optional[bytes]) -> Optional[str]:
+    """Hash do conteúdo buscado (None para resposta 304)"""
+    return hashlib.sha1(content).hexdigest() if content is not None else None
+
+
+def property_code(url: str) -> str:
+    """Extrai o código do anúncio do último segmento da URL"""
+    return url.rstrip('/').rsplit('/', 1)[-1].upper()
+
+
+class CrawlStateStore:
+    """Armazena o estado de cada anúncio entre execuções"""
+
+    def __init__(self, db_path: str = DEFAULT_DB, max_age: float = DEFAULT_MAX_AGE):
+        self.db_path = db_path
+        self.max_age = max_age
+        # Compartilhado entre as threads dos downloaders; o lock serializa o acesso
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def sync_sitemap(self, entries: Iterable[Tuple[str, Optional[str]]], mark_delisted: bool = True) -> Dict[str, int]:
+        """Registra as entradas (url, lastmod) do sitemap e marca os anúncios que sumiram"""
+        now = time.time()
+        current = {property_code(url): (url, lastmod) for url, lastmod in entries}
+        counts = {'new': 0, 'changed': 0, 'relisted': 0, 'delisted': 0, 'total': len(current)}
+
+        with self._lock, self.conn:
+            known = {
+                code: (lastmod, delisted_at)
+                for code, lastmod, delisted_at in self.conn.execute(
+                    'SELECT code, sitemap_lastmod, delisted_at FROM listings'
+                )
+            }
+
+            for code, (url, lastmod) in current.items():
+                if code not in known:
+                    counts['new'] += 1
+                elif known[code][1] is not None:
+                    counts['relisted'] += 1
+                elif lastmod and lastmod != known[code][0]:
+                    counts['changed'] += 1
+
+            self.conn.executemany(
+                """
+                INSERT INTO listings (code, url, sitemap_lastmod, first_seen, last_seen, delisted_at)
+                VALUES (?, ?, ?, ?, ?, NULL)
+                ON CONFLICT(code) DO UPDATE SET
+                    url = excluded.url,
+                    sitemap_lastmod = COALESCE(excluded.sitemap_lastmod, listings.sitemap_lastmod),
+                    last_seen = excluded.last_seen,
+                    delisted_at = NULL
+                """,
+                [(code, url, lastmod, now, now) for code, (url, lastmod) in current.items()]
+            )
+
+            if mark_delisted:
+                vanished = [
+                    (now, code) for code, (_, delisted_at) in known.items()
+                    if code not in current and delisted_at is None
+                ]
+                self.conn.executemany('UPDATE listings SET delisted_at = ? WHERE code = ?', vanished)
+                counts['delisted'] = len(vanished)
+
+        logger.info(
+            f"Estado de crawl: {counts['total']} anúncios no sitemap, {counts['new']} novos, "
+            f"{counts['changed']} alterados, {counts['relisted']} relistados, {counts['delisted']} removidos"
+        )
+        return counts
+
+    def ensure_listings(self, urls: Iterable[str]):
+        """Registra URLs ainda desconhecidas sem alterar os anúncios existentes"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO listings (code, url, first_seen, last_seen) VALUES (?, ?, ?, ?)',
+                [(property_code(url), url, now, now) for url in urls]
+            )
+
+    def pending(self, stage: str, codes: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """Retorna (código, url) dos anúncios ativos que a etapa ainda precisa processar"""
+        query = """
+            SELECT l.code, l.url FROM listings l
+            LEFT JOIN fetches f ON f.code = l.code AND f.stage = ?
+            WHERE l.delisted_at IS NULL AND (
+                f.code IS NULL
+                OR (l.sitemap_lastmod IS NOT NULL AND f.sitemap_lastmod IS NOT l.sitemap_lastmod)
+                OR (l.sitemap_lastmod IS NULL AND f.fetched_at < ?)
+            )
+        """
+        with self._lock:
+            rows = self.conn.execute(query, (stage, time.time() - self.max_age)).fetchall()
+
+        if codes is not None:
+            wanted = set(codes)
+            rows = [row for row in rows if row[0] in wanted]
+        return rows
+
+    def delisted_codes(self) -> set:
+        with self._lock:
+            return {code for code, in self.conn.execute('SELECT code FROM listings WHERE delisted_at IS NOT NULL')}
+
+    def conditional_headers(self, stage: str, code: str) -> Dict[str, str]:
+        """Cabeçalhos If-None-Match/If-Modified-Since da última busca da etapa"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT etag, last_modified FROM fetches WHERE code = ? AND stage = ?', (code, stage)
+            ).fetchone()
+
+        headers = {}
+        if row:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def record_fetch(self, stage: str, code: str, content: Optional[bytes] = None,
+                     etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        """Registra o processamento de um anúncio; retorna True se o conteúdo mudou
+
+        `content=None` indica resposta 304: mantém hash e validadores anteriores.
+        """
+        content_hash = fetch_hash(content)
+
+        with self._lock, self.conn:
+            previous = self.conn.execute(
+                'SELECT content_hash FROM fetches WHERE code = ? AND stage = ?', (code, stage)
+            ).fetchone()
+            self._upsert_fetches(stage, [(code, content_hash, etag, last_modified)])
+
+        return content_hash is not None and (previous is None or previous[0] != content_hash)
+
+    def record_fetches(self, stage: str, fetches: Iterable[Tuple[str, Optional[str], Optional[str], Optional[str]]]):
+        """Registra de uma vez (code, content_hash, etag, last_modified) já processados"""
+        with self._lock, self.conn:
+            self._upsert_fetches(stage, list(fetches))
+
+    def _upsert_fetches(self, stage: str, rows: List[Tuple[str, Optional[str], Optional[str], Optional[str]]]):
+        now = time.time()
+        self.conn.executemany(
+            """
+            INSERT INTO fetches (code, stage, fetched_at, sitemap_lastmod, etag, last_modified, content_hash)
+            VALUES (?, ?, ?, (SELECT sitemap_lastmod FROM listings WHERE code = ?), ?, ?, ?)
+            ON CONFLICT(code, stage) DO UPDATE SET
+                fetched_at = excluded.fetched_at,
+                sitemap_lastmod = excluded.sitemap_lastmod,
+                etag = COALESCE(excluded.etag, fetches.etag),
+                last_modified = COALESCE(excluded.last_modified, fetches.last_modified),
+                content_hash = COALESCE(excluded.content_hash, fetches.content_hash)
+            """,
+            [(code, stage, now, code, etag, last_modified, content_hash)
+             for code, content_hash, etag, last_modified in rows]
+        )
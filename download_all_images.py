@@ -3,17 +3,23 @@
 Script otimizado para baixar todas as imagens das 7.459 propriedades
 """
 
-import json
-import requests
+import argparse
 import os
 import time
-from urllib.parse import urlparse
 from pathlib import Path
-import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from chaozao_blobs import ImageStore
+from chaozao_cache import PageCache, DEFAULT_CACHE_DIR
+from chaozao_extract import PageData, extract_image_urls
+from chaozao_fetch import PageFetcher
+from chaozao_http import create_session, pool_stats
+from chaozao_journal import CheckpointJournal, journal_path
+from chaozao_metrics import ConsoleReporter, ImageJobMetrics, serve_metrics, DEFAULT_METRICS_PORT
+from chaozao_ndjson import open_dataset, read_records, with_images_path, write_dataset
+from chaozao_ratelimit import HostRateLimiter
+from chaozao_scheduler import TwoLevelScheduler
+from chaozao_state import CrawlStateStore, DEFAULT_DB as DEFAULT_STATE_DB, property_code
 
 # Configurar logging
 logging.basicConfig(
@@ -26,266 +32,307 @@ logging.basicConfig(
 )
 
 class OptimizedImageDownloader:
-    def __init__(self, max_workers=20, max_images_per_property=50):
+    def __init__(self, max_workers=20, max_images_per_property=50, crawl_state=None,
+                 cache_dir=DEFAULT_CACHE_DIR, page_workers=4, rps=8.0, metrics=None, http2=False):
+        # max_workers: downloads de imagens simultâneos; page_workers: páginas
         self.max_workers = max_workers
+        self.page_workers = page_workers
         self.max_images_per_property = max_images_per_property
+        self.crawl_state = crawl_state
+        self.journal = None
+        self.rate_limiter = HostRateLimiter(rps)
+        
+        # Contadores/histogramas seguros entre threads (+ respostas HTTP por status)
+        self.metrics = metrics or ImageJobMetrics()
         
-        # Configurar session com retry strategy
-        self.session = requests.Session()
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=0.3,
-            status_forcelist=[429, 500, 502, 503, 504]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
-        
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # Uma conexão keep-alive por thread que faz requisições (retry em 429/5xx,
+        # com os status repetidos contados nas métricas)
+        self.session = create_session(pool_size=max_workers + page_workers, http2=http2,
+                                      on_status=self.metrics.observe_status)
+        self.session.hooks['response'].append(self.metrics.response_hook)
+        self.metrics.track_pool(self.session)
+        
+        # HTML das páginas compartilhado com o scraper (cache_dir=None desativa)
+        self.fetcher = PageFetcher(self.session, PageCache(cache_dir) if cache_dir else None,
+                                   rate_limiter=self.rate_limiter)
         
         # Criar diretório
         self.images_dir = Path('chaozao_images')
         self.images_dir.mkdir(exist_ok=True)
         
-        # Estatísticas
-        self.stats = {
-            'properties_processed': 0,
-            'images_downloaded': 0,
-            'images_skipped': 0,
-            'errors': 0
-        }
-    
-    def extract_image_urls_from_json(self, html_content):
-        """Extrai URLs de imagens do JSON-LD estruturado"""
-        image_urls = set()
-        
-        # Padrão para JSON-LD com imagens
-        json_ld_pattern = r'"image":\s*\[(.*?)\]'
-        matches = re.findall(json_ld_pattern, html_content, re.DOTALL)
-        
-        for match in matches:
-            # Extrair URLs individuais do array
-            url_pattern = r'"(https://[^"]+\.(?:jpg|jpeg|png|webp|gif))"'
-            urls = re.findall(url_pattern, match, re.IGNORECASE)
-            
-            for url in urls:
-                # Limpar URLs
-                clean_url = url.replace('\\"', '').strip()
-                if self.is_valid_image_url(clean_url):
-                    image_urls.add(clean_url)
-        
-        return list(image_urls)
+        # Blobs deduplicados por hash + manifesto (property_id, índice) -> hash
+        self.store = ImageStore(self.images_dir)
     
-    def is_valid_image_url(self, url):
-        """Verifica se é uma URL de imagem válida"""
-        try:
-            if not url or len(url) < 10:
-                return False
-            
-            parsed = urlparse(url)
-            if not parsed.scheme or not parsed.netloc:
-                return False
-            
-            # Verificar extensão
-            valid_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.gif']
-            if not any(url.lower().endswith(ext) for ext in valid_extensions):
-                return False
-            
-            # Filtrar URLs inválidas
-            invalid_patterns = ['placeholder', 'loading', 'icon', 'logo', 'avatar']
-            if any(pattern in url.lower() for pattern in invalid_patterns):
-                return False
-            
-            return True
-            
-        except Exception:
-            return False
+    @property
+    def stats(self):
+        """Totais da execução (lidos das métricas)"""
+        return self.metrics.count()
     
-    def download_image(self, image_url, save_path):
-        """Baixa uma imagem"""
+    def download_image(self, image_url):
+        """Baixa uma imagem para o repositório; retorna o blob ou None"""
         try:
-            if save_path.exists():
-                return True
-            
-            response = self.session.get(image_url, timeout=15)
-            response.raise_for_status()
+            self.rate_limiter.acquire(image_url)
             
-            # Verificar se é realmente uma imagem
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                return False
-            
-            save_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(save_path, 'wb') as f:
-                f.write(response.content)
-            
-            return True
+            # Streaming + hash do conteúdo; só aceita respostas image/*
+            with self.metrics.image_fetch.time():
+                return self.store.download(self.session, image_url, timeout=15, content_type='image/',
+                                           on_write=self.metrics.observe_write)
             
         except Exception as e:
             logging.error(f"Erro ao baixar {image_url}: {e}")
-            return False
+            self.metrics.observe_error(e)
+            return None
     
-    def process_property(self, property_data):
-        """Processa uma propriedade"""
+    def plan_property(self, property_data):
+        """Busca a página e monta as tarefas de download (nível 1 do escalonador)"""
         property_id = property_data['id']
-        property_url = property_data['url']
         
+        # Extrair HTML da página (do cache, se o scraper já a baixou)
         try:
-            # Extrair HTML da página
-            response = self.session.get(property_url, timeout=30)
-            response.raise_for_status()
-            
-            # Extrair URLs das imagens
-            image_urls = self.extract_image_urls_from_json(response.text)
-            
-            # Limitar número de imagens
-            if len(image_urls) > self.max_images_per_property:
-                image_urls = image_urls[:self.max_images_per_property]
-            
-            # Criar pasta da propriedade
-            property_dir = self.images_dir / property_id
-            
-            downloaded_images = []
-            
-            for i, image_url in enumerate(image_urls, 1):
-                try:
-                    # Determinar extensão
-                    extension = Path(urlparse(image_url).path).suffix or '.jpg'
-                    filename = f"image_{i:03d}{extension}"
-                    save_path = property_dir / filename
-                    
-                    if self.download_image(image_url, save_path):
-                        downloaded_images.append({
-                            'original_url': image_url,
-                            'local_path': str(save_path.relative_to(self.images_dir)),
-                            'filename': filename
-                        })
-                        self.stats['images_downloaded'] += 1
-                    else:
-                        self.stats['images_skipped'] += 1
-                
-                except Exception as e:
-                    logging.error(f"Erro na imagem {i} da propriedade {property_id}: {e}")
-                    self.stats['errors'] += 1
-            
-            self.stats['properties_processed'] += 1
+            with self.metrics.page_fetch.time():
+                page = self.fetcher.fetch(property_data['url'])
+        except Exception as e:
+            # O escalonador registra a falha; aqui só entra nas métricas
+            self.metrics.observe_error(e)
+            raise
+        if page.from_cache:
+            self.metrics.pages_cached.inc()
+        
+        # Galeria na ordem da página, a partir dos dados estruturados
+        image_urls = extract_image_urls(PageData(page.text), property_data['url'])
+        
+        # Limitar número de imagens
+        if len(image_urls) > self.max_images_per_property:
+            image_urls = image_urls[:self.max_images_per_property]
+        
+        tasks = [(property_id, i, image_url) for i, image_url in enumerate(image_urls, 1)]
+        return page, tasks
+    
+    def download_task(self, task):
+        """Baixa uma imagem da fila compartilhada (nível 2 do escalonador)"""
+        property_id, i, image_url = task
+        try:
+            # URL já baixada (por esta ou outra propriedade): reaproveita o blob
+            blob = self.store.find_url(image_url)
+            if blob is not None:
+                self.metrics.images.inc(outcome='reused')
+            else:
+                blob = self.download_image(image_url)
+                if blob is None:
+                    self.metrics.images.inc(outcome='skipped')
+                    return None
+                self.metrics.images.inc(outcome='downloaded')
             
+            self.store.record(property_id, i, image_url, blob)
             return {
-                'property_id': property_id,
-                'total_images': len(downloaded_images),
-                'images': downloaded_images
+                'original_url': image_url,
+                'local_path': blob.path,
+                'filename': Path(blob.path).name,
+                'index': i,
+                'sha256': blob.digest
             }
-            
         except Exception as e:
-            logging.error(f"Erro ao processar propriedade {property_id}: {e}")
-            self.stats['errors'] += 1
-            return {
-                'property_id': property_id,
-                'total_images': 0,
-                'images': []
-            }
+            logging.error(f"Erro na imagem {i} da propriedade {property_id}: {e}")
+            self.metrics.errors.inc()
+        return None
+    
+    def collect_property(self, property_data, page, tasks, downloaded):
+        """Consolida o resultado quando todas as imagens da propriedade terminaram"""
+        property_id = property_data['id']
+        
+        if page is None:
+            # A página não pôde ser buscada
+            self.metrics.errors.inc()
+            return {'property_id': property_id, 'total_images': 0, 'images': []}
+        
+        downloaded_images = [image for image in downloaded if image is not None]
+        self.metrics.properties.inc()
+        
+        if self.crawl_state is not None:
+            self.crawl_state.record_fetch(
+                'images', property_code(property_data['url']), content=page.content,
+                etag=page.headers.get('ETag'), last_modified=page.headers.get('Last-Modified')
+            )
+        
+        result = {
+            'property_id': property_id,
+            'total_images': len(downloaded_images),
+            'images': downloaded_images
+        }
+        # Checkpoint imediato: uma queda não perde o que já foi concluído
+        if self.journal is not None:
+            self.journal.record(result)
+        return result
     
-    def download_all_images(self, dataset_file='chaozao_complete_dataset.json'):
+    def select_pending(self, dataset_file):
+        """Registra no diário as propriedades sem mudanças desde a última execução; retorna seus ids"""
+        self.crawl_state.ensure_listings(prop['url'] for prop in read_records(dataset_file))
+        pending_codes = {code for code, _ in self.crawl_state.pending('images')}
+        
+        kept = set()
+        output_file = with_images_path(dataset_file)
+        if os.path.exists(output_file):
+            current = {prop['id'] for prop in read_records(dataset_file)}
+            batch = []
+            for prop in read_records(output_file):
+                if 'images' not in prop or prop['id'] not in current or property_code(prop['url']) in pending_codes:
+                    continue
+                kept.add(prop['id'])
+                batch.append({
+                    'property_id': prop['id'],
+                    'total_images': prop['images']['total_count'],
+                    'images': prop['images']['files']
+                })
+                if len(batch) >= 500:
+                    self.journal.record_many(batch)
+                    batch = []
+            self.journal.record_many(batch)
+        
+        logging.info(f"♻️  Modo incremental: {len(kept)} propriedades sem mudanças")
+        return kept
+    
+    def download_all_images(self, dataset_file='chaozao_complete_dataset.json', incremental=False, resume=False):
         """Baixa todas as imagens das propriedades"""
         
         logging.info("🚀 Iniciando download de todas as imagens...")
         
-        # Carregar dataset
-        with open(dataset_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        self.journal = CheckpointJournal(journal_path(dataset_file), 'download')
+        skip = set()
+        if resume:
+            skip = self.journal.done_ids()
+            logging.info(f"⏯️  Retomando: {len(skip)} propriedades já concluídas no diário")
+        else:
+            self.journal.reset()
+        
+        if incremental:
+            if self.crawl_state is None:
+                self.crawl_state = CrawlStateStore()
+            skip |= self.select_pending(dataset_file)
+        
+        # Dataset lido em fluxo (uma passada para contar, outra para baixar)
+        def pending_properties():
+            return (prop for prop in read_records(dataset_file) if prop['id'] not in skip)
         
-        properties = data['properties']
-        total_properties = len(properties)
+        total_properties = sum(1 for _ in pending_properties())
         
         logging.info(f"📊 Total de propriedades: {total_properties}")
         
         start_time = time.time()
-        results = []
-        
-        # Processar em lotes
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submeter tarefas
-            future_to_property = {
-                executor.submit(self.process_property, prop): prop 
-                for prop in properties
-            }
+        completed = 0
+        
+        # Páginas e imagens em filas separadas, cada uma com seus workers; cada
+        # resultado já foi gravado no diário, aqui só contamos o progresso
+        scheduler = TwoLevelScheduler(page_workers=self.page_workers, image_workers=self.max_workers)
+        for _ in scheduler.run(pending_properties(), self.plan_property, self.download_task, self.collect_property):
+            completed += 1
             
-            # Processar resultados
-            for future in as_completed(future_to_property):
-                try:
-                    result = future.result()
-                    results.append(result)
-                    
-                    # Log de progresso a cada 100 propriedades
-                    if len(results) % 100 == 0:
-                        elapsed = time.time() - start_time
-                        rate = len(results) / elapsed
-                        eta = (total_properties - len(results)) / rate if rate > 0 else 0
-                        
-                        logging.info(
-                            f"📈 Progresso: {len(results)}/{total_properties} "
-                            f"({len(results)/total_properties*100:.1f}%) - "
-                            f"⏱️ ETA: {eta/60:.1f} min - "
-                            f"📸 Imagens: {self.stats['images_downloaded']}"
-                        )
+            # Log de progresso a cada 100 propriedades
+            if completed % 100 == 0:
+                elapsed = time.time() - start_time
+                rate = completed / elapsed
+                eta = (total_properties - completed) / rate if rate > 0 else 0
                 
-                except Exception as e:
-                    logging.error(f"Erro no future: {e}")
+                logging.info(
+                    f"📈 Progresso: {completed}/{total_properties} "
+                    f"({completed/total_properties*100:.1f}%) - "
+                    f"⏱️ ETA: {eta/60:.1f} min - "
+                    f"📸 Imagens: {self.stats['images_downloaded']}"
+                )
         
-        # Atualizar dataset
-        self.update_dataset(data, results, dataset_file)
+        # Atualizar dataset a partir do diário (inclui execuções anteriores com --resume)
+        self.update_dataset(self.journal, dataset_file)
         
         elapsed_time = time.time() - start_time
         
         logging.info("✅ DOWNLOAD CONCLUÍDO!")
         logging.info(f"⏱️  Tempo total: {elapsed_time/60:.1f} minutos")
-        logging.info(f"📊 Propriedades processadas: {self.stats['properties_processed']}")
-        logging.info(f"📸 Imagens baixadas: {self.stats['images_downloaded']}")
-        logging.info(f"⚠️  Imagens puladas: {self.stats['images_skipped']}")
-        logging.info(f"❌ Erros: {self.stats['errors']}")
         
-        return results
+        stats = self.stats
+        logging.info(f"📊 Propriedades processadas: {stats['properties_processed']}")
+        logging.info(f"📸 Imagens baixadas: {stats['images_downloaded']}")
+        logging.info(f"♻️  Imagens reaproveitadas: {stats['images_reused']}")
+        logging.info(f"⚠️  Imagens puladas: {stats['images_skipped']}")
+        logging.info(f"❌ Erros: {stats['errors']}")
+        pool = pool_stats(self.session)
+        logging.info(f"🔌 Conexões: {pool['connections']} abertas para {pool['requests']} requisições "
+                     f"({pool['reuse_rate']*100:.0f}% reaproveitadas)")
+        
+        return self.journal.summary()
     
-    def update_dataset(self, original_data, results, dataset_file):
-        """Atualiza dataset com informações das imagens"""
-        
-        # Mapear resultados
-        result_map = {r['property_id']: r for r in results}
-        
-        # Atualizar propriedades
-        for prop in original_data['properties']:
-            prop_id = prop['id']
-            if prop_id in result_map:
-                result = result_map[prop_id]
-                prop['images'] = {
-                    'total_count': result['total_images'],
-                    'files': result['images']
-                }
-            else:
-                prop['images'] = {'total_count': 0, 'files': []}
+    def update_dataset(self, journal, dataset_file):
+        """Grava o dataset com as imagens registradas no diário, uma propriedade por vez"""
+        metadata, properties = open_dataset(dataset_file)
+        
+        def with_images():
+            for prop in properties:
+                result = journal.get(prop['id'])
+                if result is not None:
+                    prop['images'] = {
+                        'total_count': result['total_images'],
+                        'files': result['images']
+                    }
+                else:
+                    prop['images'] = {'total_count': 0, 'files': []}
+                yield prop
         
         # Adicionar metadados
-        original_data['image_download'] = {
+        metadata['image_download'] = {
             'date': time.strftime('%Y-%m-%d %H:%M:%S'),
             'stats': self.stats
         }
         
-        # Salvar
-        output_file = dataset_file.replace('.json', '_with_images.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(original_data, f, indent=2, ensure_ascii=False)
+        # Mesmo formato do dataset (NDJSON ou JSON), com escrita atômica
+        output_file = with_images_path(dataset_file)
+        write_dataset(with_images(), output_file, metadata)
         
         logging.info(f"💾 Dataset atualizado salvo: {output_file}")
 
 def main():
+    parser = argparse.ArgumentParser(description='Download de todas as imagens do Chãozão')
+    parser.add_argument('--dataset', default='chaozao_complete_dataset.json', help='Arquivo do dataset')
+    parser.add_argument('--incremental', action='store_true', help='Baixa apenas propriedades novas ou alteradas')
+    parser.add_argument('--resume', action='store_true',
+                        help='Retoma uma execução interrompida, pulando as propriedades já no diário')
+    parser.add_argument('--state-db', default=DEFAULT_STATE_DB, help=f'Banco do estado de crawl (padrão: {DEFAULT_STATE_DB})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Cache de páginas HTML (padrão: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Não usa o cache de páginas')
+    parser.add_argument('--workers', type=int, default=20, help='Downloads de imagens simultâneos (padrão: 20)')
+    parser.add_argument('--page-workers', type=int, default=4, help='Páginas buscadas simultaneamente (padrão: 4)')
+    parser.add_argument('--rps', type=float, default=8.0, help='Requisições por segundo por host (padrão: 8)')
+    parser.add_argument('--http2', action='store_true', help='Usa HTTP/2 multiplexado (requer httpx[http2])')
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=DEFAULT_METRICS_PORT,
+                        help=f'Expõe métricas Prometheus em 127.0.0.1:PORTA/metrics (padrão: {DEFAULT_METRICS_PORT})')
+    parser.add_argument('--report-interval', type=float, default=10.0,
+                        help='Segundos entre as linhas de resumo no console (0 desativa)')
+    parser.add_argument('--find-duplicates', action='store_true',
+                        help='Ao final, procura anúncios com fotos quase idênticas (requer numpy e Pillow)')
+    args = parser.parse_args()
+    
     print("🖼️  DOWNLOAD DE TODAS AS IMAGENS DO CHÃOZÃO")
     print("=" * 50)
     
-    downloader = OptimizedImageDownloader(max_workers=20, max_images_per_property=50)
-    downloader.download_all_images()
+    crawl_state = CrawlStateStore(args.state_db) if args.incremental else None
+    downloader = OptimizedImageDownloader(max_workers=args.workers, max_images_per_property=50, crawl_state=crawl_state,
+                                          cache_dir=None if args.no_cache else args.cache_dir,
+                                          page_workers=args.page_workers, rps=args.rps,
+                                          http2=args.http2)
+    
+    if args.metrics_port:
+        serve_metrics(downloader.metrics.registry, args.metrics_port)
+    reporter = None
+    if args.report_interval > 0:
+        reporter = ConsoleReporter(downloader.metrics.summary_line, args.report_interval).start()
+    
+    try:
+        downloader.download_all_images(dataset_file=args.dataset, incremental=args.incremental,
+                                       resume=args.resume)
+    finally:
+        if reporter is not None:
+            reporter.stop()
+    
+    if args.find_duplicates:
+        from chaozao_phash import find_duplicate_listings
+        find_duplicate_listings(str(downloader.images_dir))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
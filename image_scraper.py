@@ -3,16 +3,23 @@
 Script para extrair e baixar todas as imagens das propriedades do Chãozão
 """
 
-import json
-import requests
-import os
+import itertools
 import time
-from urllib.parse import urlparse, urljoin
 from pathlib import Path
-import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 
+from chaozao_archive import ArchiveReader, ArchiveWriter
+from chaozao_blobs import ImageStore
+from chaozao_cache import PageCache, DEFAULT_CACHE_DIR
+from chaozao_extract import PageData, extract_image_urls
+from chaozao_fetch import PageFetcher
+from chaozao_http import create_session, pool_stats
+from chaozao_journal import CheckpointJournal, journal_path
+from chaozao_metrics import ConsoleReporter, ImageJobMetrics, serve_metrics, DEFAULT_METRICS_PORT
+from chaozao_ndjson import open_dataset, read_records, with_images_path, write_dataset
+from chaozao_ratelimit import HostRateLimiter
+from chaozao_scheduler import TwoLevelScheduler
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,255 +31,219 @@ logging.basicConfig(
 )
 
 class ChaoImageScraper:
-    def __init__(self, max_workers=10, delay=0.5):
+    def __init__(self, max_workers=10, rps=4.0, cache_dir=DEFAULT_CACHE_DIR, archive=None, replay=None,
+                 page_workers=2, metrics=None, http2=False):
+        # max_workers: downloads de imagens simultâneos; page_workers: páginas
         self.max_workers = max_workers
-        self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.page_workers = page_workers
+        # Limite de requisições por segundo por host no lugar do sleep por imagem
+        self.rate_limiter = HostRateLimiter(rps)
+        # Pool do tamanho da concorrência: conexões keep-alive reaproveitadas
+        self.metrics = metrics or ImageJobMetrics()
+        self.session = create_session(pool_size=max_workers + page_workers, http2=http2,
+                                      on_status=self.metrics.observe_status)
+        self.session.hooks['response'].append(self.metrics.response_hook)
+        self.metrics.track_pool(self.session)
+        
+        # HTML das páginas compartilhado com o scraper (cache_dir=None desativa)
+        self.fetcher = PageFetcher(
+            self.session, PageCache(cache_dir) if cache_dir else None,
+            archive=ArchiveWriter(archive) if archive else None,
+            replay=ArchiveReader(replay) if replay else None,
+            rate_limiter=self.rate_limiter
+        )
         
         # Criar diretório base para imagens
         self.images_dir = Path('chaozao_images')
         self.images_dir.mkdir(exist_ok=True)
         
+        # Blobs deduplicados por hash + manifesto (property_id, índice) -> hash
+        self.store = ImageStore(self.images_dir)
+        self.journal = None
+        
     def extract_images_from_page(self, property_url, property_id):
-        """Extrai URLs das imagens de uma página de propriedade"""
+        """Extrai URLs das imagens de uma página de propriedade (None se a página falhar)"""
         try:
             logging.info(f"Extraindo imagens da propriedade {property_id}")
             
-            response = self.session.get(property_url, timeout=30)
-            response.raise_for_status()
-            
-            html_content = response.text
-            
-            # Padrões para encontrar imagens
-            image_patterns = [
-                # URLs de imagens diretas
-                r'<img[^>]+src=["\']([^"\']+)["\'][^>]*>',
-                # URLs em data attributes
-                r'data-src=["\']([^"\']+)["\']',
-                # URLs em background-image CSS
-                r'background-image:\s*url\(["\']?([^"\'()]+)["\']?\)',
-                # URLs específicas do Chãozão
-                r'https://[^"\']+\.(?:jpg|jpeg|png|webp|gif)',
-                # Carrossel de imagens
-                r'"image":\s*"([^"]+)"',
-                # Gallery data
-                r'"url":\s*"([^"]+\.(?:jpg|jpeg|png|webp))"'
-            ]
+            with self.metrics.page_fetch.time():
+                fetched = self.fetcher.fetch(property_url)
+            if fetched.from_cache:
+                self.metrics.pages_cached.inc()
             
-            image_urls = set()
+            # Parse único da página; a galeria sai dos dados estruturados, na ordem original
+            image_urls = extract_image_urls(PageData(fetched.text), property_url)
             
-            for pattern in image_patterns:
-                matches = re.findall(pattern, html_content, re.IGNORECASE)
-                for match in matches:
-                    # Limpar e validar URL
-                    clean_url = match.strip()
-                    if clean_url and any(ext in clean_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                        # Converter URLs relativas para absolutas
-                        if clean_url.startswith('//'):
-                            clean_url = 'https:' + clean_url
-                        elif clean_url.startswith('/'):
-                            clean_url = urljoin(property_url, clean_url)
-                        elif not clean_url.startswith('http'):
-                            clean_url = urljoin(property_url, clean_url)
-                        
-                        image_urls.add(clean_url)
-            
-            # Filtrar apenas URLs válidas de imagem
-            valid_images = []
-            for url in image_urls:
-                if self.is_valid_image_url(url):
-                    valid_images.append(url)
-            
-            logging.info(f"Encontradas {len(valid_images)} imagens para propriedade {property_id}")
-            return valid_images
+            logging.info(f"Encontradas {len(image_urls)} imagens para propriedade {property_id}")
+            return image_urls
             
         except Exception as e:
             logging.error(f"Erro ao extrair imagens da propriedade {property_id}: {e}")
-            return []
-    
-    def is_valid_image_url(self, url):
-        """Verifica se a URL é uma imagem válida"""
-        try:
-            parsed = urlparse(url)
-            if not parsed.scheme or not parsed.netloc:
-                return False
-            
-            # Verificar extensão
-            path = parsed.path.lower()
-            if not any(path.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                return False
-            
-            # Filtrar URLs inválidas comuns
-            invalid_patterns = [
-                'placeholder', 'loading', 'spinner', 'icon', 'logo',
-                'avatar', 'profile', 'thumbnail_', 'thumb_'
-            ]
-            
-            if any(pattern in url.lower() for pattern in invalid_patterns):
-                return False
-            
-            return True
-            
-        except Exception:
-            return False
+            self.metrics.errors.inc()
+            self.metrics.observe_error(e)
+            return None
     
-    def download_image(self, image_url, save_path):
-        """Baixa uma imagem individual"""
+    def download_image(self, image_url):
+        """Baixa uma imagem individual para o repositório; retorna o blob ou None"""
         try:
-            response = self.session.get(image_url, timeout=30)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                f.write(response.content)
+            self.rate_limiter.acquire(image_url)
             
-            return True
+            # Streaming + hash do conteúdo: sem arquivos truncados nem duplicados
+            with self.metrics.image_fetch.time():
+                return self.store.download(self.session, image_url, timeout=30,
+                                           on_write=self.metrics.observe_write)
             
         except Exception as e:
             logging.error(f"Erro ao baixar imagem {image_url}: {e}")
-            return False
+            self.metrics.errors.inc()
+            self.metrics.observe_error(e)
+            return None
     
-    def process_property(self, property_data):
-        """Processa uma propriedade: extrai e baixa todas as imagens"""
+    def plan_property(self, property_data):
+        """Extrai as URLs das imagens e monta as tarefas de download"""
         property_id = property_data['id']
-        property_url = property_data['url']
-        
-        # Criar pasta para a propriedade
-        property_dir = self.images_dir / property_id
-        property_dir.mkdir(exist_ok=True)
         
         # Extrair URLs das imagens
-        image_urls = self.extract_images_from_page(property_url, property_id)
+        image_urls = self.extract_images_from_page(property_data['url'], property_id)
+        if image_urls is None:
+            return False, []
         
-        downloaded_images = []
+        tasks = [(property_id, i, image_url) for i, image_url in enumerate(image_urls, 1)]
+        return True, tasks
+    
+    def download_task(self, task):
+        """Baixa uma imagem (a cortesia com o host fica com o rate limiter)"""
+        property_id, i, image_url = task
         
-        for i, image_url in enumerate(image_urls, 1):
-            try:
-                # Determinar extensão da imagem
-                parsed_url = urlparse(image_url)
-                file_extension = Path(parsed_url.path).suffix or '.jpg'
-                
-                # Nome do arquivo
-                filename = f"image_{i:03d}{file_extension}"
-                save_path = property_dir / filename
-                
-                # Pular se já existe
-                if save_path.exists():
-                    downloaded_images.append({
-                        'original_url': image_url,
-                        'local_path': str(save_path.relative_to(self.images_dir)),
-                        'filename': filename,
-                        'index': i
-                    })
-                    continue
+        try:
+            # Pular se a URL já foi baixada (por esta ou outra propriedade)
+            blob = self.store.find_url(image_url)
+            
+            if blob is None:
+                # Modo replay roda offline: só as imagens já baixadas entram no resultado
+                if self.fetcher.replay is not None:
+                    self.metrics.images.inc(outcome='skipped')
+                    return None
                 
                 # Baixar imagem
-                if self.download_image(image_url, save_path):
-                    downloaded_images.append({
-                        'original_url': image_url,
-                        'local_path': str(save_path.relative_to(self.images_dir)),
-                        'filename': filename,
-                        'index': i
-                    })
-                    logging.info(f"✓ Baixada: {property_id}/image_{i:03d}")
-                
-                # Delay entre downloads
-                time.sleep(self.delay)
-                
-            except Exception as e:
-                logging.error(f"Erro ao processar imagem {i} da propriedade {property_id}: {e}")
-        
-        return {
-            'property_id': property_id,
+                blob = self.download_image(image_url)
+                if blob is None:
+                    self.metrics.images.inc(outcome='skipped')
+                    return None
+                self.metrics.images.inc(outcome='downloaded')
+                logging.info(f"✓ Baixada: {property_id}/image_{i:03d}")
+            else:
+                self.metrics.images.inc(outcome='reused')
+            
+            self.store.record(property_id, i, image_url, blob)
+            return {
+                'original_url': image_url,
+                'local_path': blob.path,
+                'filename': Path(blob.path).name,
+                'index': i,
+                'sha256': blob.digest
+            }
+            
+        except Exception as e:
+            logging.error(f"Erro ao processar imagem {i} da propriedade {property_id}: {e}")
+            self.metrics.errors.inc()
+        return None
+    
+    def collect_property(self, property_data, page_ok, tasks, downloaded):
+        """Resultado da propriedade quando todas as suas imagens terminaram"""
+        downloaded_images = [image for image in downloaded if image is not None]
+        self.metrics.properties.inc()
+        result = {
+            'property_id': property_data['id'],
             'total_images': len(downloaded_images),
             'images': downloaded_images
         }
+        # Página com erro fica fora do diário para ser tentada de novo no --resume
+        if page_ok and self.journal is not None:
+            self.journal.record(result)
+        return result
     
-    def scrape_all_images(self, dataset_file='chaozao_complete_dataset.json', sample_size=None):
+    def scrape_all_images(self, dataset_file='chaozao_complete_dataset.json', sample_size=None, resume=False):
         """Extrai e baixa todas as imagens das propriedades"""
         
-        # Carregar dataset
-        with open(dataset_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        self.journal = CheckpointJournal(journal_path(dataset_file), 'scrape')
+        done = set()
+        if resume:
+            done = self.journal.done_ids()
+        else:
+            self.journal.reset()
         
-        properties = data['properties']
+        # Dataset lido em fluxo (uma passada para contar, outra para baixar)
+        def pending_properties():
+            properties = itertools.islice(read_records(dataset_file), sample_size)
+            return (prop for prop in properties if prop['id'] not in done)
         
+        total_properties = sum(1 for _ in pending_properties())
         if sample_size:
-            properties = properties[:sample_size]
             logging.info(f"Processando amostra de {sample_size} propriedades")
-        else:
-            logging.info(f"Processando todas as {len(properties)} propriedades")
+        elif not resume:
+            logging.info(f"Processando todas as {total_properties} propriedades")
+        if resume:
+            logging.info(f"Retomando: {len(done)} propriedades já concluídas, {total_properties} restantes")
         
-        results = []
+        completed = 0
         total_images = 0
         
-        # Processar propriedades em paralelo
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submeter tarefas
-            future_to_property = {
-                executor.submit(self.process_property, prop): prop 
-                for prop in properties
-            }
+        # Páginas e imagens em filas separadas, cada uma com seus workers; os
+        # resultados vão direto para o diário, sem acumular em memória
+        scheduler = TwoLevelScheduler(page_workers=self.page_workers, image_workers=self.max_workers)
+        for i, result in enumerate(
+                scheduler.run(pending_properties(), self.plan_property, self.download_task, self.collect_property), 1):
+            completed = i
+            total_images += result['total_images']
             
-            # Processar resultados
-            for i, future in enumerate(as_completed(future_to_property), 1):
-                try:
-                    result = future.result()
-                    results.append(result)
-                    total_images += result['total_images']
-                    
-                    # Log de progresso
-                    if i % 100 == 0 or i == len(properties):
-                        logging.info(f"Progresso: {i}/{len(properties)} propriedades ({i/len(properties)*100:.1f}%) - {total_images} imagens")
-                
-                except Exception as e:
-                    property_data = future_to_property[future]
-                    logging.error(f"Erro ao processar propriedade {property_data['id']}: {e}")
+            # Log de progresso
+            if i % 100 == 0 or i == total_properties:
+                logging.info(f"Progresso: {i}/{total_properties} propriedades ({i/total_properties*100:.1f}%) - {total_images} imagens")
         
-        # Atualizar dataset com informações das imagens
-        self.update_dataset_with_images(data, results, dataset_file)
+        # Atualizar dataset a partir do diário (inclui execuções anteriores com --resume)
+        self.update_dataset_with_images(self.journal, dataset_file)
         
         logging.info(f"✅ Scraping concluído!")
-        logging.info(f"📊 Total de propriedades processadas: {len(results)}")
+        logging.info(f"📊 Total de propriedades processadas: {completed}")
         logging.info(f"📸 Total de imagens baixadas: {total_images}")
+        pool = pool_stats(self.session)
+        logging.info(f"🔌 {pool['connections']} conexões para {pool['requests']} requisições "
+                     f"({pool['reuse_rate']*100:.0f}% reaproveitadas)")
         
-        return results
+        return self.journal.summary()
     
-    def update_dataset_with_images(self, original_data, image_results, dataset_file):
-        """Atualiza o dataset original com informações das imagens"""
-        
-        # Criar mapeamento de resultados por property_id
-        image_map = {result['property_id']: result for result in image_results}
+    def update_dataset_with_images(self, journal, dataset_file):
+        """Grava o dataset com as imagens registradas no diário, uma propriedade por vez"""
+        metadata, properties = open_dataset(dataset_file)
         
-        # Atualizar propriedades
-        for property_data in original_data['properties']:
-            property_id = property_data['id']
-            
-            if property_id in image_map:
-                image_info = image_map[property_id]
-                property_data['images'] = {
-                    'total_count': image_info['total_images'],
-                    'files': image_info['images']
-                }
-            else:
-                property_data['images'] = {
-                    'total_count': 0,
-                    'files': []
-                }
+        def with_images():
+            for property_data in properties:
+                image_info = journal.get(property_data['id'])
+                
+                if image_info is not None:
+                    property_data['images'] = {
+                        'total_count': image_info['total_images'],
+                        'files': image_info['images']
+                    }
+                else:
+                    property_data['images'] = {
+                        'total_count': 0,
+                        'files': []
+                    }
+                yield property_data
         
         # Adicionar metadados
-        original_data['image_scraping'] = {
+        summary = journal.summary()
+        metadata['image_scraping'] = {
             'date': time.strftime('%Y-%m-%d %H:%M:%S'),
-            'total_properties_processed': len(image_results),
-            'total_images_downloaded': sum(r['total_images'] for r in image_results)
+            'total_properties_processed': summary['properties'],
+            'total_images_downloaded': summary['images']
         }
         
-        # Salvar dataset atualizado
-        output_file = dataset_file.replace('.json', '_with_images.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(original_data, f, indent=2, ensure_ascii=False)
+        # Mesmo formato do dataset (NDJSON ou JSON), com escrita atômica
+        output_file = with_images_path(dataset_file)
+        write_dataset(with_images(), output_file, metadata)
         
         logging.info(f"💾 Dataset atualizado salvo em: {output_file}")
 
@@ -281,30 +252,54 @@ def main():
     
     parser = argparse.ArgumentParser(description='Scraper de imagens do Chãozão')
     parser.add_argument('--sample', type=int, help='Processar apenas uma amostra de N propriedades')
-    parser.add_argument('--workers', type=int, default=5, help='Número de workers paralelos')
-    parser.add_argument('--delay', type=float, default=0.5, help='Delay entre downloads (segundos)')
+    parser.add_argument('--workers', type=int, default=5, help='Downloads de imagens simultâneos')
+    parser.add_argument('--page-workers', type=int, default=2, help='Páginas buscadas simultaneamente')
+    parser.add_argument('--rps', type=float, default=4.0, help='Requisições por segundo por host')
+    parser.add_argument('--resume', action='store_true', help='Retoma uma execução interrompida (diário de checkpoints)')
     parser.add_argument('--dataset', default='chaozao_complete_dataset.json', help='Arquivo do dataset')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Cache de páginas HTML')
+    parser.add_argument('--no-cache', action='store_true', help='Não usa o cache de páginas')
+    parser.add_argument('--archive', help='Grava as páginas brutas neste arquivo WARC')
+    parser.add_argument('--replay', help='Lê as páginas de um arquivo WARC, sem acessar o site')
+    parser.add_argument('--http2', action='store_true', help='Usa HTTP/2 multiplexado (requer httpx[http2])')
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=DEFAULT_METRICS_PORT,
+                        help='Expõe métricas Prometheus em 127.0.0.1:PORTA/metrics')
+    parser.add_argument('--report-interval', type=float, default=10.0,
+                        help='Segundos entre as linhas de resumo no console (0 desativa)')
     
     args = parser.parse_args()
     
-    scraper = ChaoImageScraper(max_workers=args.workers, delay=args.delay)
+    scraper = ChaoImageScraper(max_workers=args.workers, rps=args.rps, page_workers=args.page_workers,
+                               cache_dir=None if args.no_cache else args.cache_dir,
+                               archive=args.archive, replay=args.replay, http2=args.http2)
     
     print("🖼️  INICIANDO SCRAPING DE IMAGENS DO CHÃOZÃO")
     print(f"📁 Imagens serão salvas em: {scraper.images_dir}")
-    print(f"⚙️  Workers: {args.workers}, Delay: {args.delay}s")
+    print(f"⚙️  Workers: {args.page_workers} páginas / {args.workers} imagens, {args.rps} req/s por host")
     
     if args.sample:
         print(f"📊 Processando amostra de {args.sample} propriedades")
     else:
         print("📊 Processando TODAS as propriedades")
     
-    results = scraper.scrape_all_images(
-        dataset_file=args.dataset,
-        sample_size=args.sample
-    )
+    if args.metrics_port:
+        serve_metrics(scraper.metrics.registry, args.metrics_port)
+    reporter = None
+    if args.report_interval > 0:
+        reporter = ConsoleReporter(scraper.metrics.summary_line, args.report_interval).start()
+    
+    try:
+        summary = scraper.scrape_all_images(
+            dataset_file=args.dataset,
+            sample_size=args.sample,
+            resume=args.resume
+        )
+    finally:
+        if reporter is not None:
+            reporter.stop()
     
     print("\n✅ SCRAPING CONCLUÍDO!")
-    print(f"📸 Total de imagens baixadas: {sum(r['total_images'] for r in results)}")
+    print(f"📸 Total de imagens baixadas: {summary['images']}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
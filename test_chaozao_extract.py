@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Testes offline da extração de campos das páginas (chaozao_extract)
+
+Uso:
+    python -m pytest test_chaozao_extract.py
+"""
+
+import json
+
+from chaozao_extract import PageData, extract_page
+from chaozao_scraper import ChaozaoScraper
+
+URL = "https://chaozao.com.br/imovel/fazenda-em-cristalandia-tocantins-com-area-de-803-ha-r-22400000-cod-tn2w4s/TN2W4S"
+
+
+def next_page(page_props):
+    data = json.dumps({'props': {'pageProps': page_props}})
+    return f'<html><head><script id="__NEXT_DATA__" type="application/json">{data}</script></head><body></body></html>'
+
+
+def test_next_data_ignores_sibling_objects():
+    html = next_page({
+        'property': {'title': 'Fazenda Boa Vista', 'price': 22400000},
+        'user': {'name': 'Corretor', 'city': 'Goiânia', 'state': 'GO'},
+    })
+    fields = extract_page(html)
+    assert fields['title'] == 'Fazenda Boa Vista'
+    assert fields['city'] is None
+    assert fields['state'] is None
+
+
+def test_next_data_listing_found_by_code():
+    html = next_page({
+        'related': [{'title': 'Outro anúncio', 'code': 'ZZZZZZ', 'price': 1}],
+        'item': {'code': 'TN2W4S', 'title': 'Fazenda Certa', 'price': 22400000},
+    })
+    fields = extract_page(html, code='TN2W4S')
+    assert fields['title'] == 'Fazenda Certa'
+    assert fields['price'] == 22400000
+    assert fields['reference_code'] == 'TN2W4S'
+
+
+def test_numeric_text_fields_keep_the_listing():
+    html = next_page({
+        'property': {'title': 'Fazenda Boa Vista', 'city': 5208707, 'state': 52, 'code': 1234},
+        'user': {'name': 'Corretor'},
+    })
+    fields = extract_page(html, PageData(html))
+    assert fields['city'] is None and fields['state'] is None
+    assert fields['reference_code'] == '1234'
+
+    # O slug completa cidade/estado e a propriedade não se perde
+    scraper = ChaozaoScraper(sitemap_state_file=None, cache_dir=None)
+    prop = scraper.parse_property_page(URL, html)
+    assert prop is not None
+    assert prop.title == 'Fazenda Boa Vista'
+    assert prop.city == 'Cristalandia'
+    assert prop.state == 'TO'
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Testes offline dos backends de serialização (chaozao_json)
+
+Uso:
+    python -m pytest test_chaozao_json.py
+"""
+
+import pytest
+
+import chaozao_json
+from chaozao_json import PropertyRecord, available_backends, get_backend
+
+DOCUMENTS = [
+    {'id': 'TN2W4S', 'title': 'Fazenda em Cristalândia', 'price': 22400000, 'area_hectares': 803.0,
+     'area_m2': 8030000.0, 'latitude': -10.598, 'longitude': -49.193, 'features': ['Rio', 'Sede'],
+     'description': 'Área "aberta" com açude\n', 'photos_count': 0, 'city': None},
+    {'tiny': 1e-05, 'small': 1.5e-7, 'big': 1e16, 'huge': -2.5e300, 'zero': 0.0, 'neg': -0.0},
+    {'images': {'files': [{'url': f'https://chaozao.com.br/img/{i}.jpg', 'size': i * 1024} for i in range(50)]}},
+    [],
+]
+
+
+@pytest.mark.parametrize('name', available_backends())
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_backends_round_trip_the_same_content(name, document):
+    backend = get_backend(name)
+    for other in available_backends():
+        reader = get_backend(other)
+        # Os bytes podem diferir (ex.: 1e+16 x 1e16); o conteúdo decodificado não
+        assert reader.loads(backend.dumps(document)) == document
+        assert reader.loads(backend.dumps_pretty(document)) == document
+
+
+@pytest.mark.parametrize('name', available_backends())
+def test_decode_with_schema(name):
+    previous = chaozao_json.set_backend(name)
+    try:
+        record = dict(DOCUMENTS[0], type='Fazenda', price_formatted='R$ 22.400.000', area_alqueires=165.9,
+                      city='Cristalândia', state='TO', reference_code='TN2W4S',
+                      url='https://chaozao.com.br/imovel/x/TN2W4S')
+        assert chaozao_json.decode(chaozao_json.dumps(record), PropertyRecord) == record
+    finally:
+        chaozao_json.set_backend(previous)
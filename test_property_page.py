@@ -41,7 +41,8 @@ def test_property_page():
             r'whatsapp.*?(\d{2})\s*\d{8,9}'
         ]
         
-        html_content = str(soup)
+        # Regex over the raw response; re-serializing the soup costs a full extra pass
+        html_content = response.text
         
         for pattern in whatsapp_patterns:
             matches = re.findall(pattern, html_content, re.IGNORECASE)